@@ -186,11 +186,7 @@ class AgentGenerator:
             "                \"note\": \"OPENAI_API_KEY missing; cannot generate code diffs.\",\n"
             "                \"context_used\": context_pack,\n"
             "            }}\n"
-            "        adapter = OpenAICompatibleAdapter(\n"
-            "            api_key=os.getenv(\"OPENAI_API_KEY\"),\n"
-            "            base_url=os.getenv(\"OPENAI_BASE_URL\", \"https://api.openai.com/v1\"),\n"
-            "            model=os.getenv(\"OPENAI_MODEL\", \"gpt-4o-mini\"),\n"
-            "        )\n"
+            "        adapter = OpenAICompatibleAdapter.from_env()\n"
             "        result = adapter.generate_text(system, json.dumps(payload, ensure_ascii=False))\n"
             "        return {{\"status\": \"proposed\", \"agent\": \"{agent_name}\", \"output\": result, \"context_used\": context_pack}}\n"
         )
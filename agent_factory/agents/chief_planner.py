@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import json
-import os
 from pathlib import Path
 
 from agent_factory.orchestrator.state_store import StateStore
@@ -28,11 +27,7 @@ class ChiefPlanner:
         reason = "default"
 
         try:
-            adapter = OpenAICompatibleAdapter(
-                api_key=os.getenv("OPENAI_API_KEY"),
-                base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
-                model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            )
+            adapter = OpenAICompatibleAdapter.from_env()
 
             system_prompt_path = (
                 Path(__file__).resolve().parents[2] / "orchestrator" / "llm" / "prompts" / "planner.system.txt"
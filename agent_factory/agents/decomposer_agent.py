@@ -92,11 +92,7 @@ class DecomposerAgent:
         source = "deterministic"
 
         if os.getenv("OPENAI_API_KEY"):
-            adapter = OpenAICompatibleAdapter(
-                api_key=os.getenv("OPENAI_API_KEY"),
-                base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
-                model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            )
+            adapter = OpenAICompatibleAdapter.from_env()
             system_prompt = (repo_root / "orchestrator/prompts/decomposer.system.txt").read_text(encoding="utf-8")
             user = json.dumps({"prd": prd, "specs": specs}, indent=2)
             try:
@@ -4,7 +4,7 @@ import json
 import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
 
 from agent_factory.orchestrator.llm.adapter import OpenAICompatibleAdapter
 from agent_factory.orchestrator.state_store import StateStore
@@ -17,7 +17,31 @@ class DirectorAgent:
     store: StateStore
 
     def run(self, prd: Dict[str, Any], spec: Dict[str, Any]) -> Dict[str, Any]:
-        out = {
+        return self.run_many(prd, [spec])[0]
+
+    def run_many(self, prd: Dict[str, Any], specs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Direct every spec, fanning the LLM calls out concurrently; results keep spec order."""
+        outs = [self._default(spec) for spec in specs]
+
+        if os.getenv("OPENAI_API_KEY") and specs:
+            adapter = OpenAICompatibleAdapter.from_env()
+            sys = (self.repo_root / "orchestrator/prompts/director.system.txt").read_text(encoding="utf-8")
+            requests = [(sys, json.dumps({"prd": prd, "spec": spec}, indent=2)) for spec in specs]
+            for i, cand in enumerate(adapter.generate_json_many(requests)):
+                if isinstance(cand, dict) and cand.get("domain") and cand.get("module"):
+                    outs[i] = cand
+
+        for out in outs:
+            self.store.append_jsonl(
+                self.run_dir,
+                "logs/director.jsonl",
+                {"event": "director_output", "domain": out.get("domain"), "module": out.get("module")},
+            )
+        return outs
+
+    @staticmethod
+    def _default(spec: Dict[str, Any]) -> Dict[str, Any]:
+        return {
             "domain": spec.get("domain"),
             "module": spec.get("module"),
             "boundaries": [f"{spec.get('domain')}/", f"{spec.get('module')}/"],
@@ -25,25 +49,3 @@ class DirectorAgent:
             "risks": ["scope creep", "missing acceptance tests"],
             "recommended_capabilities": [spec.get("domain"), spec.get("module")],
         }
-
-        if os.getenv("OPENAI_API_KEY"):
-            adapter = OpenAICompatibleAdapter(
-                api_key=os.getenv("OPENAI_API_KEY"),
-                base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
-                model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            )
-            sys = (self.repo_root / "orchestrator/prompts/director.system.txt").read_text(encoding="utf-8")
-            user = json.dumps({"prd": prd, "spec": spec}, indent=2)
-            try:
-                cand = adapter.generate_json(sys, user)
-                if isinstance(cand, dict) and cand.get("domain") and cand.get("module"):
-                    out = cand
-            except Exception:
-                pass
-
-        self.store.append_jsonl(
-            self.run_dir,
-            "logs/director.jsonl",
-            {"event": "director_output", "domain": out.get("domain"), "module": out.get("module")},
-        )
-        return out
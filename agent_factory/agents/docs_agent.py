@@ -31,6 +31,4 @@ class DocsAgent:
         quickstart = docs_dir / "QUICKSTART.md"
         quickstart.write_text(content + "\n", encoding="utf-8")
         self.state_store.append_log(self.run_dir, f"Quickstart generated at {quickstart}")
-        state = self.state_store.read_state(self.run_dir)
-        state["current_gate"] = "release"
-        self.state_store.save_state(self.run_dir, state)
+        self.state_store.update_state(self.run_dir, current_gate="release")
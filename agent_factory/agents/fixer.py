@@ -7,7 +7,7 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List
 
-from agent_factory.orchestrator.patching import PatchError, apply_patch, rollback, snapshot
+from agent_factory.orchestrator.patching import PatchError, apply_patch, discard, rollback, snapshot
 from agent_factory.orchestrator.state_store import StateStore
 from agent_factory.orchestrator.llm.adapter import OpenAICompatibleAdapter
 from orchestrator.vault.vault import Vault
@@ -40,11 +40,7 @@ class FixerAgent:
         hits = retrieve(vault, query=query, tags=None, top_k=6)
         context_pack = [{"id": h.id, "title": h.title, "path": h.path, "snippet": h.snippet} for h in hits]
 
-        adapter = OpenAICompatibleAdapter(
-            api_key=os.getenv("OPENAI_API_KEY"),
-            base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-        )
+        adapter = OpenAICompatibleAdapter.from_env()
 
         system_prompt = (
             self.repo_root
@@ -60,7 +56,9 @@ class FixerAgent:
         if not diff.strip():
             return
 
-        snap = snapshot(self.repo_root)
+        cfg = self.state_store.read_state(self.run_dir).get("config", {})
+        backend = (cfg.get("sandbox") or {}).get("backend", "copy")
+        snap = snapshot(self.repo_root, backend)
         try:
             apply_patch(self.repo_root, diff)
             self.state_store.append_jsonl(
@@ -72,7 +70,7 @@ class FixerAgent:
                 },
             )
         except PatchError as e:
-            rollback(snap, self.repo_root)
+            rollback(snap, self.repo_root, backend)
             self.state_store.append_jsonl(
                 self.run_dir,
                 "logs/fixer.jsonl",
@@ -82,6 +80,8 @@ class FixerAgent:
                     "error": str(e),
                 },
             )
+        finally:
+            discard(snap, backend)
 
     def _rule_based(self, failing_gates: List[Dict[str, Any]]) -> None:
         applied: List[str] = []
@@ -2,24 +2,27 @@ from __future__ import annotations
 
 import json
 import os
-import subprocess
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, Optional
 
 from agent_factory.orchestrator.sandbox import create_sandbox
-from agent_factory.orchestrator.patching import PatchError, apply_patch, rollback, snapshot
+from agent_factory.orchestrator.patching import PatchError, apply_patch, discard, rollback, snapshot
 from agent_factory.orchestrator.state_store import StateStore
 from agent_factory.orchestrator.task_graph import iter_plan_tasks
 from agent_factory.orchestrator.llm.adapter import OpenAICompatibleAdapter
-from agent_factory.orchestrator.changes import diff_hashes, snapshot_hashes
+from agent_factory.orchestrator.llm.cache import default_cache
+from agent_factory.orchestrator.changes import HashCache, diff_hashes, snapshot_hashes
+from agent_factory.orchestrator.impact import ImpactMap, run_impacted_tests
 from orchestrator.vault.vault import Vault
+from orchestrator.vault.cache import retrieval_cache
 from orchestrator.vault.retrieval import retrieve
+from orchestrator.vault.segments import IndexReader
 
-
-def run_pytest(path: Path) -> bool:
-    result = subprocess.run(["pytest", "-q"], cwd=str(path))
-    return result.returncode == 0
+PROMPT_FILES = {
+    "tests": "implementer.tests.system.txt",
+    "code": "implementer.code.system.txt",
+}
 
 
 @dataclass
@@ -29,30 +32,77 @@ class ImplementerAgent:
     state_store: StateStore
     repo_root: Path = Path(".").resolve()
 
-    def run(self, task: Optional[Dict[str, Any]] = None) -> None:
+    def __post_init__(self) -> None:
+        self._warm = False
+        self._prompts: Dict[str, str] = {}
+
+    def warm_up(self) -> "ImplementerAgent":
+        """
+        Load everything that does not change between tasks: run config and
+        project (one state.json read), the LLM adapter, the sandbox hash cache,
+        the test impact map and the vault index. Pool workers call this once from their initializer.
+        """
+        state = self.state_store.read_state(self.run_dir)
+        cfg = state.get("config", {})
+        self._project = state["project"]
+        self._backend = (cfg.get("sandbox") or {}).get("backend", "copy")
+        self._hash_workers = int((cfg.get("sandbox") or {}).get("hash_workers", 1))
+        self._hash_cache = HashCache(self.repo_root / "runs" / self._project / "cache" / "hashes.json")
+        self._impact = ImpactMap(self.repo_root / "runs" / self._project / "cache" / "test_impact.json")
+        self._adapter: Optional[OpenAICompatibleAdapter] = None
+        if os.getenv("OPENAI_API_KEY"):
+            self._adapter = OpenAICompatibleAdapter.from_env()
+            for kind in PROMPT_FILES:
+                try:
+                    self._prompt(kind)
+                except OSError:
+                    pass  # reported when a task needs it
+        self._vault = Vault(self.repo_root / "knowledge")
+        if self._vault.inverted_path.exists():
+            IndexReader.open(self._vault)
+        self._warm = True
+        return self
+
+    def _prompt(self, kind: str) -> str:
+        if kind not in self._prompts:
+            path = self.repo_root / "orchestrator" / "llm" / "prompts" / PROMPT_FILES[kind]
+            self._prompts[kind] = path.read_text(encoding="utf-8")
+        return self._prompts[kind]
+
+    def _cache_counters(self) -> Dict[str, Dict[str, int]]:
+        llm = default_cache()
+        return {
+            "llm": dict(llm.stats) if llm is not None else {},
+            "retrieval": dict(retrieval_cache(self._vault).stats),
+        }
+
+    def run(self, task: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        plan: Dict[str, Any] = {}
         plan_path = self.run_dir / "plan.json"
-        if not plan_path.exists():
-            raise FileNotFoundError(plan_path)
-        plan = json.loads(plan_path.read_text(encoding="utf-8"))
-
-        api_key = os.getenv("OPENAI_API_KEY")
-        adapter: Optional[OpenAICompatibleAdapter] = None
-        if api_key:
-            adapter = OpenAICompatibleAdapter(
-                api_key=api_key,
-                base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
-                model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            )
+        if task is None:
+            if not plan_path.exists():
+                raise FileNotFoundError(plan_path)
+            plan = json.loads(plan_path.read_text(encoding="utf-8"))
+        if not self._warm:
+            self.warm_up()
+        counters_before = self._cache_counters()
+
+        adapter = self._adapter
+        backend = self._backend
+        hash_workers = self._hash_workers
+        project = self._project
+        hash_cache = self._hash_cache
 
         tasks_iter = [task] if task else [t for _, _, t in iter_plan_tasks(plan)]
+        # Rollback snapshots sit next to the sandboxes (same filesystem for links).
+        snap_base = self.repo_root / "runs" / project / "snapshots"
         last_result: Optional[Dict[str, Any]] = None
 
         for t in tasks_iter:
             task_id = t.get("id")
-            sandbox = create_sandbox(self.repo_root, self.state_store.read_state(self.run_dir)["project"], task_id)
-            before = snapshot_hashes(sandbox)
-            vault = Vault(self.repo_root / "knowledge")
-            hits = retrieve(vault, query=t.get("description", ""), tags=None, top_k=6)
+            sandbox = create_sandbox(self.repo_root, project, task_id, backend=backend)
+            before = snapshot_hashes(sandbox, cache=hash_cache, workers=hash_workers)
+            hits = retrieve(self._vault, query=t.get("description", ""), tags=None, top_k=6)
             context_pack = [{"id": h.id, "title": h.title, "path": h.path, "snippet": h.snippet} for h in hits]
 
             if adapter is None:
@@ -64,49 +114,51 @@ class ImplementerAgent:
             ctx = json.dumps({"task": t, "vault_context": context_pack}, indent=2)
 
             # 1) Generate tests
-            tests_prompt = (
-                self.repo_root / "orchestrator" / "llm" / "prompts" / "implementer.tests.system.txt"
-            ).read_text(encoding="utf-8")
-            diff_tests = adapter.generate_text(tests_prompt, ctx)
+            diff_tests = adapter.generate_text(self._prompt("tests"), ctx)
 
-            snap_tests = snapshot(sandbox)
+            snap_tests = snapshot(sandbox, backend, base=snap_base)
             try:
                 apply_patch(sandbox, diff_tests)
-                run_pytest(sandbox)
+                after = snapshot_hashes(sandbox, cache=hash_cache, workers=hash_workers)
+                self._gate(task_id, sandbox, diff_hashes(before, after), "tests")
             except Exception:
-                rollback(snap_tests, sandbox)
+                rollback(snap_tests, sandbox, backend)
+                adapter.forget(self._prompt("tests"), ctx)  # a rerun must not replay the failed patch
                 t["status"] = "failed"
                 self._log(task_id, sandbox, "failed", "tests")
                 last_result = {"task": task_id, "status": "failed", "sandbox": str(sandbox), "stage": "tests"}
                 continue
+            finally:
+                discard(snap_tests, backend)
 
             # 2) Generate code
-            code_prompt = (
-                self.repo_root / "orchestrator" / "llm" / "prompts" / "implementer.code.system.txt"
-            ).read_text(encoding="utf-8")
-            diff_code = adapter.generate_text(code_prompt, ctx)
+            diff_code = adapter.generate_text(self._prompt("code"), ctx)
 
-            art_dir = sandbox / "runs" / self.state_store.read_state(self.run_dir)["project"] / "artifacts"
+            art_dir = sandbox / "runs" / project / "artifacts"
             art_dir.mkdir(parents=True, exist_ok=True)
             (art_dir / f"{task_id}_tests.diff").write_text(diff_tests, encoding="utf-8")
             (art_dir / f"{task_id}_code.diff").write_text(diff_code, encoding="utf-8")
 
-            snap_code = snapshot(sandbox)
+            snap_code = snapshot(sandbox, backend, base=snap_base)
             try:
                 apply_patch(sandbox, diff_code)
-                if not run_pytest(sandbox):
+                after = snapshot_hashes(sandbox, cache=hash_cache, workers=hash_workers)
+                if not self._gate(task_id, sandbox, diff_hashes(before, after), "code"):
                     raise RuntimeError("Tests still failing after code patch")
             except Exception:
-                rollback(snap_code, sandbox)
+                rollback(snap_code, sandbox, backend)
+                adapter.forget(self._prompt("code"), ctx)
                 t["status"] = "failed"
                 self._log(task_id, sandbox, "failed", "code")
                 last_result = {"task": task_id, "status": "failed", "sandbox": str(sandbox), "stage": "code"}
                 continue
+            finally:
+                discard(snap_code, backend)
 
-            after = snapshot_hashes(sandbox)
+            hash_cache.save()
             changes = diff_hashes(before, after)
 
-            manifest_path = sandbox / "runs" / self.state_store.read_state(self.run_dir)["project"] / "artifacts"
+            manifest_path = sandbox / "runs" / project / "artifacts"
             manifest_path.mkdir(parents=True, exist_ok=True)
             (manifest_path / f"changes_{task_id}.json").write_text(
                 json.dumps(changes, indent=2),
@@ -126,11 +178,37 @@ class ImplementerAgent:
                 },
             }
 
-        plan_path.write_text(json.dumps(plan, indent=2), encoding="utf-8")
-        state = self.state_store.read_state(self.run_dir)
-        state["tasks"] = plan.get("milestones", [])
-        self.state_store.save_state(self.run_dir, state)
-        return last_result or {"task": task.get("id") if task else None, "status": "skipped"}
+        # Single-task runs come from the fan-out pool; the orchestrator owns plan/state there.
+        if task is None:
+            plan_path.write_text(json.dumps(plan, indent=2), encoding="utf-8")
+            self.state_store.update_state(self.run_dir, tasks=plan.get("milestones", []))
+        result = last_result or {"task": task.get("id") if task else None, "status": "skipped"}
+        if task is not None:
+            # Pool workers keep their own cache counters; hand this task's share
+            # back so the orchestrator can report run-wide hit rates.
+            after = self._cache_counters()
+            result["cache_stats"] = {
+                kind: {k: v - counters_before[kind].get(k, 0) for k, v in after[kind].items()} for kind in after
+            }
+        return result
+
+    def _gate(self, task_id: str, sandbox: Path, changes: Dict[str, Any], stage: str) -> bool:
+        """Run only the tests affected by `changes` (full suite on an impact-map miss)."""
+        gate = run_impacted_tests(sandbox, changes, self._impact)
+        self.state_store.append_jsonl(
+            self.run_dir,
+            "logs/implementer.jsonl",
+            {
+                "ts": self.state_store.utc_now(),
+                "event": "test_selection",
+                "task": task_id,
+                "stage": stage,
+                "mode": gate["mode"],
+                "tests": gate["tests"],
+                "ok": gate["ok"],
+            },
+        )
+        return gate["ok"]
 
     def _log(self, task_id: str, sandbox: Path, status: str, detail: str) -> None:
         self.state_store.append_jsonl(
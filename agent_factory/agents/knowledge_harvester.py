@@ -1,12 +1,59 @@
 from __future__ import annotations
 
+import fnmatch
+import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Sequence, Tuple
 
+from agent_factory.orchestrator.changes import HashCache
 from agent_factory.orchestrator.state_store import StateStore
 from orchestrator.vault.vault import Vault
-from orchestrator.vault.ingest import add_local_file
+from orchestrator.vault.ingest import add_local_files
+
+HARVEST_SUFFIXES = {".md", ".txt", ".json", ".yaml", ".yml"}
+DEFAULT_EXCLUDE = ["runs/*/sandboxes/*", "runs/*/snapshots/*", "runs/*/cache/*", "runs/.llm_cache/*"]
+_SKIP_DIRS = {".git", ".venv", "__pycache__", "node_modules"}
+
+
+def _excluded(rel: str, patterns: Sequence[str]) -> bool:
+    return any(fnmatch.fnmatch(rel, pat) for pat in patterns)
+
+
+def iter_harvest_files(
+    repo_root: Path,
+    base: Path,
+    exclude: Sequence[str],
+    max_file_bytes: int,
+    skipped: List[str],
+) -> Iterator[Path]:
+    """
+    scandir walk of base yielding harvestable files. Directories matching an
+    exclude glob (tested as "<rel>/") are pruned without being listed; files
+    larger than max_file_bytes (0 = no limit) are recorded in `skipped`.
+    """
+    stack = [base]
+    while stack:
+        d = stack.pop()
+        try:
+            it = os.scandir(d)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                rel = Path(entry.path).relative_to(repo_root).as_posix()
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in _SKIP_DIRS and not _excluded(rel + "/", exclude):
+                        stack.append(Path(entry.path))
+                    continue
+                if not entry.is_file() or os.path.splitext(entry.name)[1].lower() not in HARVEST_SUFFIXES:
+                    continue
+                if _excluded(rel, exclude):
+                    continue
+                if max_file_bytes and entry.stat().st_size > max_file_bytes:
+                    skipped.append(rel)
+                    continue
+                yield Path(entry.path)
 
 
 @dataclass
@@ -19,6 +66,10 @@ class KnowledgeHarvester:
     def run(self) -> None:
         vault = Vault(self.repo_root / "knowledge")
         vault.ensure()
+        cfg = (self.state_store.read_state(self.run_dir).get("config", {}).get("vault") or {}).get("harvest") or {}
+        exclude = list(cfg.get("exclude") or DEFAULT_EXCLUDE)
+        max_file_bytes = int(cfg.get("max_file_bytes", 0) or 0)
+        workers = int(cfg.get("workers", 1) or 1)
 
         targets: List[Path] = []
         for rel in ["docs", "orchestrator", "stacks", "runs"]:
@@ -26,21 +77,29 @@ class KnowledgeHarvester:
             if p.exists():
                 targets.append(p)
 
-        ingested = 0
+        batch: List[Tuple[Path, str, List[str]]] = []
+        skipped: List[str] = []
         for base in targets:
             base_name = base.name
-            for f in base.rglob("*"):
-                if f.is_file() and f.suffix.lower() in [".md", ".txt", ".json", ".yaml", ".yml"]:
-                    add_local_file(
-                        vault=vault,
-                        file_path=f,
-                        title=f"repo:{f.relative_to(self.repo_root)}",
-                        tags=["repo_file", base_name or "repo"],
-                    )
-                    ingested += 1
+            for f in iter_harvest_files(self.repo_root, base, exclude, max_file_bytes, skipped):
+                batch.append((f, f"repo:{f.relative_to(self.repo_root)}", ["repo_file", base_name or "repo"]))
+
+        hash_cache = HashCache(vault.root / "cache" / "harvest_hashes.json")
+        add_local_files(vault, batch, workers=workers, hash_cache=hash_cache)
+        seen = {str(f.resolve()) for f, _, _ in batch}
+        hash_cache.entries = {k: v for k, v in hash_cache.entries.items() if k in seen}
+        hash_cache.save()
+        ingested = len(batch)
 
         self.state_store.append_jsonl(
             self.run_dir,
             "logs/vault.jsonl",
-            {"ts": self.state_store.utc_now(), "event": "harvest_complete", "files_ingested": ingested},
+            {
+                "ts": self.state_store.utc_now(),
+                "event": "harvest_complete",
+                "files_ingested": ingested,
+                "skipped_too_large": len(skipped),
+                "hash_cache_hits": hash_cache.hits,
+                "hash_cache_misses": hash_cache.misses,
+            },
         )
@@ -5,11 +5,16 @@ import os
 import shlex
 import subprocess
 import shutil
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Dict, List, Sequence
+from typing import Callable, Dict, List, Optional, Sequence
 
 import yaml  # type: ignore
 
+from agent_factory.orchestrator.dag import topo_sort
+from agent_factory.orchestrator.impact import ImpactMap
 from agent_factory.orchestrator.state_store import StateStore
 from agent_factory.tools.test_runner import TestRunner
 from agent_factory.tools.docker_tool import DockerTool
@@ -29,6 +34,7 @@ class QAAgent:
         if allowlist:
             self.runner.runner.allowlist = list(allowlist)
         self.repo_root = Path(".").resolve()
+        self._lock = threading.Lock()
 
     def run_suite(self) -> None:
         checks = self._load_checks()
@@ -46,31 +52,180 @@ class QAAgent:
             image=runner_image,
         )
 
-        for check in checks:
+        max_workers = int((cfg.get("qa") or {}).get("max_workers", 4))
+        impact = ImpactMap(self.run_dir / "cache" / "test_impact.json")
+
+        def run_one(check: Dict) -> Dict:
             cmd = self._prepare_command(check, run_reports)
             if self.dry_run:
-                results.append(
-                    {
-                        "name": check.get("name"),
-                        "status": "skipped",
-                        "command": " ".join(cmd) if cmd else "",
-                        "attempts": 0,
-                        "details": "Dry-run: command not executed",
-                    }
-                )
-                continue
-            result = self._run_check(check, cmd, use_docker=use_docker, docker_runner=docker_runner)
-            results.append(result)
+                return {
+                    "name": check.get("name"),
+                    "status": "skipped",
+                    "command": " ".join(cmd) if cmd else "",
+                    "attempts": 0,
+                    "details": "Dry-run: command not executed",
+                }
+            return self._run_check(check, cmd, use_docker=use_docker, docker_runner=docker_runner)
+
+        gates: List[Dict] = []
+        shard_groups: Dict[str, List[Dict]] = {}
+        for i, check in enumerate(checks, start=1):
+            check.setdefault("name", f"check-{i}")
+            shards = self._shard_checks(check, run_reports, impact)
+            if shards:
+                shard_groups[check["name"]] = shards
+                gates.extend(shards)
+            else:
+                gates.append(check)
+        # Gates depending on a sharded gate wait for all of its shards.
+        for gate in gates:
+            deps: List[str] = []
+            for d in gate.get("depends_on") or []:
+                deps.extend([sh["name"] for sh in shard_groups[d]] if d in shard_groups else [d])
+            gate["depends_on"] = deps
+
+        by_name = self._run_gates(gates, run_one, max_workers)
+        for check in checks:
+            name = check.get("name")
+            if name in shard_groups:
+                results.append(self._merge_shards(check, shard_groups[name], by_name, run_reports, impact))
+            else:
+                results.append(by_name[name])
 
         report = {"stack": self.stack, "results": results, "dry_run": self.dry_run}
         report_path = self.run_dir / "reports" / "qa_report.json"
         report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
         self.state_store.append_log(self.run_dir, f"QA report written to {report_path}")
-        state = self.state_store.read_state(self.run_dir)
-        state["current_gate"] = "docs"
-        state["test_results"] = results
-        state["gates"] = results
-        self.state_store.save_state(self.run_dir, state)
+        self.state_store.update_state(self.run_dir, current_gate="docs", test_results=results, gates=results)
+
+    def _run_gates(self, gates: List[Dict], run_one: Callable[[Dict], Dict], max_workers: int) -> Dict[str, Dict]:
+        """
+        Run gates on a bounded thread pool. A gate starts once everything in its
+        `depends_on` has finished; gates without dependencies are independent.
+        If a dependency did not pass (or was skipped) the gate is skipped.
+        """
+        topo_sort([{"id": g["name"], "depends_on": g.get("depends_on") or []} for g in gates])
+        pending = list(gates)
+        done: Dict[str, Dict] = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as ex:
+            inflight: Dict[Future, Dict] = {}
+            while pending or inflight:
+                for gate in list(pending):
+                    deps = gate.get("depends_on") or []
+                    if not all(d in done for d in deps):
+                        continue
+                    pending.remove(gate)
+                    blocked = [d for d in deps if done[d].get("status") != "pass" and not self.dry_run]
+                    if blocked:
+                        done[gate["name"]] = {
+                            "name": gate["name"],
+                            "status": "skipped",
+                            "command": "",
+                            "attempts": 0,
+                            "details": f"Dependency not passed: {', '.join(blocked)}",
+                        }
+                        continue
+                    inflight[ex.submit(run_one, gate)] = gate
+                if not inflight:
+                    continue
+                finished, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    done[inflight.pop(fut)["name"]] = fut.result()
+        return done
+
+    def _shard_checks(self, check: Dict, run_reports: str, impact: ImpactMap) -> List[Dict]:
+        """
+        Split a pytest gate with `shards: N` into N gates over disjoint sets of
+        test files, balanced by recorded durations (longest first onto the
+        least loaded shard). Each shard writes a junit report. [] = no sharding.
+
+        Files come from `pytest --collect-only`, so the shards together run
+        exactly what the unsharded command would. If collection fails, the gate
+        runs unsharded.
+        """
+        shards = int(check.get("shards", 1) or 1)
+        cmd = self._prepare_command(check, run_reports)
+        if self.dry_run or shards < 2 or not cmd or os.path.basename(cmd[0]) != "pytest":
+            return []
+        root = Path(check["cwd"]) if check.get("cwd") else self.repo_root
+        impact.refresh(root)
+        tests = impact.order(self._collect_test_files(cmd, root))
+        if len(tests) < 2:
+            return []
+        buckets: List[List[str]] = [[] for _ in range(min(shards, len(tests)))]
+        loads = [0.0] * len(buckets)
+        for rel in tests:
+            i = loads.index(min(loads))
+            buckets[i].append(rel)
+            loads[i] += impact.durations.get(rel, 1.0)
+        out = []
+        for i, files in enumerate(buckets, start=1):
+            junit = str(Path(run_reports) / f"{check['name']}-shard{i}.xml")
+            out.append(
+                {
+                    **check,
+                    "name": f"{check['name']}[{i}/{len(buckets)}]",
+                    "cmd": cmd + [f"--junitxml={junit}"] + files,
+                    "junit": junit,
+                    "files": files,
+                }
+            )
+            out[-1].pop("command", None)
+        return out
+
+    def _collect_test_files(self, cmd: List[str], root: Path) -> List[str]:
+        """Test files (relative to root) holding the tests `cmd --collect-only` reports; [] on failure."""
+        with self._lock:
+            self.runner.runner.extend_allowlist([cmd[0]])
+        result = self.runner.runner.run(cmd + ["--collect-only", "-q"], cwd=str(root))
+        if result.returncode != 0:
+            return []
+        files: Dict[str, None] = {}
+        for line in (result.stdout or "").splitlines():
+            # -q prints node ids ("path::test"); -qq (cmd already has -q) prints "path: count".
+            path = line.split("::")[0] if "::" in line else line.rpartition(": ")[0]
+            if path.endswith(".py"):
+                files[path] = None
+        if not all((root / rel).is_file() for rel in files):
+            return []  # node ids relative to a different rootdir
+        return list(files)
+
+    def _merge_shards(
+        self, check: Dict, gates: List[Dict], by_name: Dict[str, Dict], run_reports: str, impact: ImpactMap
+    ) -> Dict:
+        """Fold shard results into one gate result and one merged junit report."""
+        shards = [by_name[g["name"]] for g in gates]
+        statuses = {sh.get("status") for sh in shards}
+        status = "failed" if "failed" in statuses else ("pass" if statuses == {"pass"} else "skipped")
+        merged = ET.Element("testsuites")
+        for gate in gates:
+            try:
+                root = ET.parse(gate["junit"]).getroot()
+            except (OSError, ET.ParseError):
+                continue
+            merged.extend(root.iter("testsuite"))
+            impact.record_junit(Path(gate["junit"]), gate["files"])
+            Path(gate["junit"]).unlink(missing_ok=True)
+        report: Optional[str] = None
+        if len(merged):
+            report = str(Path(run_reports) / f"{check['name']}.xml")
+            ET.ElementTree(merged).write(report, encoding="utf-8", xml_declaration=True)
+            impact.save()
+        result = {
+            "name": check.get("name"),
+            "status": status,
+            "command": " ".join(self._prepare_command(check, run_reports)),
+            "attempts": max(sh.get("attempts", 0) for sh in shards),
+            "stdout": "".join(sh.get("stdout") or "" for sh in shards),
+            "stderr": "".join(sh.get("stderr") or "" for sh in shards),
+            "shards": shards,
+        }
+        if report:
+            result["junit"] = report
+        incidents = [sh["incident"] for sh in shards if sh.get("incident")]
+        if incidents:
+            result["incident"] = incidents[0]
+        return result
 
     def _prepare_command(self, check: Dict, run_reports: str) -> List[str]:
         raw_cmd: Sequence[str] | str | None = check.get("cmd") or check.get("command")
@@ -109,7 +264,8 @@ class QAAgent:
                 "attempts": 0,
                 "details": "No command specified",
             }
-        self.runner.runner.extend_allowlist([command[0]])
+        with self._lock:
+            self.runner.runner.extend_allowlist([command[0]])
         if not use_docker and shutil.which(command[0]) is None:
             return {
                 "name": check.get("name"),
@@ -158,11 +314,12 @@ class QAAgent:
                     "stderr": result.stderr,
                 },
             )
-        incident_path = self.state_store.create_incident(
-            self.run_dir,
-            title=f"Check failed: {check.get('name')}",
-            body=f"Command `{' '.join(command)}` failed after {max_attempts} attempts.",
-        )
+        with self._lock:  # incident ids are numbered from the files already present
+            incident_path = self.state_store.create_incident(
+                self.run_dir,
+                title=f"Check failed: {check.get('name')}",
+                body=f"Command `{' '.join(command)}` failed after {max_attempts} attempts.",
+            )
         return {
             "name": check.get("name"),
             "status": "failed",
@@ -55,9 +55,7 @@ class ReleaseAgent:
             self.run_dir,
             f"Final report saved to {report_path} and {json_path}",
         )
-        state = self.state_store.read_state(self.run_dir)
-        state["current_gate"] = "completed"
-        self.state_store.save_state(self.run_dir, state)
+        self.state_store.update_state(self.run_dir, current_gate="completed")
 
     def _build_markdown(self, artifacts: List[str], status: str) -> str:
         lines = [
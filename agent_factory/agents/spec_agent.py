@@ -36,14 +36,18 @@ class SpecAgent:
 
         adapter = None
         if os.getenv("OPENAI_API_KEY"):
-            adapter = OpenAICompatibleAdapter(
-                api_key=os.getenv("OPENAI_API_KEY"),
-                base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
-                model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            )
+            adapter = OpenAICompatibleAdapter.from_env()
         system_prompt = (repo_root / "orchestrator/prompts/spec.system.txt").read_text(encoding="utf-8")
 
-        for domain, module in modules:
+        llm_results: List[Any] = [None] * len(modules)
+        if adapter:
+            requests = [
+                (system_prompt, json.dumps({"prd": prd, "domain": domain, "module": module}, indent=2))
+                for domain, module in modules
+            ]
+            llm_results = adapter.generate_json_many(requests)
+
+        for (domain, module), candidate in zip(modules, llm_results):
             spec = {
                 "domain": domain,
                 "module": module,
@@ -55,18 +59,15 @@ class SpecAgent:
             }
             source = "deterministic"
 
-            if adapter:
-                user = json.dumps({"prd": prd, "domain": domain, "module": module}, indent=2)
-                try:
-                    candidate = adapter.generate_json(system_prompt, user)
-                    ok, msg = _validate(schema, candidate)
-                    if ok:
-                        spec = candidate
-                        source = "llm"
-                    else:
-                        source = f"fallback(schema): {msg}"
-                except Exception as e:  # pragma: no cover - safety fallback
-                    source = f"fallback(error): {type(e).__name__}"
+            if isinstance(candidate, Exception):
+                source = f"fallback(error): {type(candidate).__name__}"
+            elif candidate is not None:
+                ok, msg = _validate(schema, candidate)
+                if ok:
+                    spec = candidate
+                    source = "llm"
+                else:
+                    source = f"fallback(schema): {msg}"
 
             out.append(spec)
             write_json(run_root / f"specs/{domain}/{module}.json", spec)
@@ -1,27 +1,126 @@
 from __future__ import annotations
 
 import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set, Tuple
+
+DEFAULT_IGNORE_DIRS = {".git", ".venv", "__pycache__", "runs"}
+_CHUNK = 1 << 20
 
 
 def _hash_file(p: Path) -> str:
     h = hashlib.sha256()
-    h.update(p.read_bytes())
+    with open(p, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
     return h.hexdigest()
 
 
-def snapshot_hashes(root: Path, ignore_dirs: Set[str] | None = None) -> Dict[str, str]:
-    ignore_dirs = ignore_dirs or {".git", ".venv", "__pycache__", "runs"}
-    out: Dict[str, str] = {}
-    for p in root.rglob("*"):
-        if p.is_dir():
-            continue
-        parts = set(p.parts)
-        if any(d in parts for d in ignore_dirs):
+class HashCache:
+    """
+    Stat cache for snapshot_hashes: rel path -> (size, mtime_ns, inode, sha256).
+
+    A digest is reused only when size, mtime_ns and inode all match. Files whose
+    mtime is not older than the scan that hashed them are "racily clean" (they may
+    change again within the same timestamp tick) and are never cached.
+    Persisted as JSON when a path is given; safe to share between sandboxes since
+    hardlinked files share inodes and anything else simply misses.
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path
+        self.entries: Dict[str, Tuple[int, int, int, str]] = {}
+        self.hits = 0
+        self.misses = 0
+        if path is not None and path.exists():
+            try:
+                raw = json.loads(path.read_text(encoding="utf-8"))
+                self.entries = {k: tuple(v) for k, v in raw.get("entries", {}).items()}
+            except (ValueError, TypeError, AttributeError):
+                self.entries = {}
+
+    def lookup(self, rel: str, st: os.stat_result) -> Optional[str]:
+        entry = self.entries.get(rel)
+        if entry is None:
+            return None
+        size, mtime_ns, inode, digest = entry
+        if size == st.st_size and mtime_ns == st.st_mtime_ns and inode == st.st_ino:
+            return digest
+        return None
+
+    def store(self, rel: str, st: os.stat_result, digest: str) -> None:
+        self.entries[rel] = (st.st_size, st.st_mtime_ns, st.st_ino, digest)
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"entries": self.entries}), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def _walk(root: Path, ignore_dirs: Set[str]) -> List[Tuple[str, str, os.stat_result]]:
+    """scandir walk that prunes ignored names before descending."""
+    out: List[Tuple[str, str, os.stat_result]] = []
+    stack = [(str(root), "")]
+    while stack:
+        abs_dir, rel_dir = stack.pop()
+        try:
+            it = os.scandir(abs_dir)
+        except OSError:
             continue
-        rel = str(p.relative_to(root))
-        out[rel] = _hash_file(p)
+        with it:
+            for entry in it:
+                if entry.name in ignore_dirs:
+                    continue
+                rel = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, rel))
+                elif entry.is_file():
+                    out.append((rel, entry.path, entry.stat()))
+    return out
+
+
+def snapshot_hashes(
+    root: Path,
+    ignore_dirs: Set[str] | None = None,
+    cache: Optional[HashCache] = None,
+    workers: int = 1,
+) -> Dict[str, str]:
+    """
+    sha256 per file under root (relative paths). With a HashCache only files whose
+    stat changed are re-read; workers > 1 hashes the misses in a thread pool.
+    """
+    ignore_dirs = ignore_dirs or DEFAULT_IGNORE_DIRS
+    cache = cache if cache is not None else HashCache()
+    scan_started = time.time_ns()
+
+    out: Dict[str, str] = {}
+    todo: List[Tuple[str, str, os.stat_result]] = []
+    for rel, abs_path, st in _walk(root, ignore_dirs):
+        digest = cache.lookup(rel, st)
+        if digest is None:
+            todo.append((rel, abs_path, st))
+        else:
+            out[rel] = digest
+    cache.hits += len(out)
+    cache.misses += len(todo)
+
+    if workers > 1 and len(todo) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            digests = list(ex.map(lambda item: _hash_file(Path(item[1])), todo))
+    else:
+        digests = [_hash_file(Path(abs_path)) for _, abs_path, _ in todo]
+
+    for (rel, _, st), digest in zip(todo, digests):
+        out[rel] = digest
+        if st.st_mtime_ns < scan_started:
+            cache.store(rel, st, digest)
     return out
 
 
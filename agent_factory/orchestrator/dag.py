@@ -1,38 +1,129 @@
 from __future__ import annotations
 
-from typing import Dict, List, Set
+import heapq
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 
 class DagError(Exception):
-    pass
+    def __init__(self, message: str, cycle: Optional[List[str]] = None) -> None:
+        super().__init__(message)
+        self.cycle = cycle or []
 
 
-def topo_sort(tasks: List[Dict]) -> List[Dict]:
-    by_id = {t["id"]: t for t in tasks}
-    deps = {t["id"]: set(t.get("depends_on") or []) for t in tasks}
-
-    # validate
+def _graph(tasks: List[Dict]) -> Tuple[Dict[str, Dict], Dict[str, Set[str]], Dict[str, List[str]]]:
+    """
+    Index tasks by id and build forward (deps) and reverse (dependents)
+    adjacency. Raises DagError on duplicate ids or missing dependencies.
+    """
+    by_id: Dict[str, Dict] = {}
+    for t in tasks:
+        if t["id"] in by_id:
+            raise DagError(f"Duplicate task id {t['id']}")
+        by_id[t["id"]] = t
+    deps = {tid: set(t.get("depends_on") or []) for tid, t in by_id.items()}
+    dependents: Dict[str, List[str]] = {tid: [] for tid in by_id}
     for tid, d in deps.items():
-        for x in d:
+        for x in sorted(d):
             if x not in by_id:
                 raise DagError(f"Task {tid} depends on missing task {x}")
+            dependents[x].append(tid)
+    return by_id, deps, dependents
+
+
+def find_cycle(tasks: List[Dict]) -> List[str]:
+    """
+    Return one dependency cycle as a list of ids [a, b, ..., a] where each
+    task depends on the next, or [] if the graph is acyclic.
+    """
+    _, deps, _ = _graph(tasks)
+    return _cycle_in(deps)
+
+
+def _cycle_in(deps: Dict[str, Set[str]]) -> List[str]:
+    state: Dict[str, int] = {}  # 1 = on stack, 2 = done
+    for root in sorted(deps):
+        if root in state:
+            continue
+        path: List[str] = [root]
+        stack = [iter(sorted(deps[root]))]
+        state[root] = 1
+        while stack:
+            nxt = next(stack[-1], None)
+            if nxt is None:
+                state[path.pop()] = 2
+                stack.pop()
+                continue
+            if nxt not in deps:
+                continue  # outside the subgraph being searched
+            if state.get(nxt) == 1:
+                return path[path.index(nxt):] + [nxt]
+            if nxt not in state:
+                state[nxt] = 1
+                path.append(nxt)
+                stack.append(iter(sorted(deps[nxt])))
+    return []
 
-    out: List[Dict] = []
-    ready = [tid for tid, d in deps.items() if not d]
-    ready.sort()
 
+def topo_sort(tasks: List[Dict]) -> List[Dict]:
+    """
+    Kahn's algorithm over reverse adjacency lists, O((V + E) log V). Ready
+    tasks are taken smallest id first, so the order is deterministic. On a
+    cycle, DagError.cycle holds the offending path.
+    """
+    by_id, deps, dependents = _graph(tasks)
+    indegree = {tid: len(d) for tid, d in deps.items()}
+    ready = [tid for tid, n in indegree.items() if n == 0]
+    heapq.heapify(ready)
+
+    out: List[Dict] = []
     while ready:
-        tid = ready.pop(0)
+        tid = heapq.heappop(ready)
         out.append(by_id[tid])
+        for other in dependents[tid]:
+            indegree[other] -= 1
+            if indegree[other] == 0:
+                heapq.heappush(ready, other)
 
-        for other, d in deps.items():
-            if tid in d:
-                d.remove(tid)
-                already_scheduled = any(t["id"] == other for t in out)
-                if not d and other not in ready and not already_scheduled:
-                    ready.append(other)
-                    ready.sort()
+    if len(out) != len(by_id):
+        cycle = _cycle_in({tid: d for tid, d in deps.items() if indegree[tid] > 0})
+        raise DagError(f"Cycle detected in task dependencies: {' -> '.join(cycle)}", cycle=cycle)
+    return out
 
-    if len(out) != len(tasks):
-        raise DagError("Cycle detected in task dependencies")
+
+def levels(tasks: List[Dict]) -> Dict[str, int]:
+    """
+    Depth of each task: 0 for tasks without dependencies, otherwise one more
+    than the deepest dependency. Tasks on the same level can run together.
+    """
+    out: Dict[str, int] = {}
+    for t in topo_sort(tasks):
+        out[t["id"]] = max((out[d] + 1 for d in t.get("depends_on") or []), default=0)
     return out
+
+
+def critical_path(
+    tasks: List[Dict], weight: Optional[Callable[[Dict], float]] = None
+) -> Tuple[float, List[str]]:
+    """
+    Longest weighted dependency chain (default weight 1 per task).
+    Returns (length, [first_id, ..., last_id]); (0, []) for no tasks.
+    """
+    cost = weight or (lambda _t: 1.0)
+    finish: Dict[str, float] = {}
+    prev: Dict[str, Optional[str]] = {}
+    for t in topo_sort(tasks):
+        best: Optional[str] = None
+        for d in sorted(t.get("depends_on") or []):
+            if best is None or finish[d] > finish[best]:
+                best = d
+        finish[t["id"]] = (finish[best] if best is not None else 0.0) + cost(t)
+        prev[t["id"]] = best
+    if not finish:
+        return 0.0, []
+    end = max(sorted(finish), key=lambda tid: finish[tid])
+    path: List[str] = []
+    node: Optional[str] = end
+    while node is not None:
+        path.append(node)
+        node = prev[node]
+    return finish[end], path[::-1]
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import ast
+import configparser
+import fnmatch
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import tomllib
+import xml.etree.ElementTree as ET
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from agent_factory.orchestrator.changes import DEFAULT_IGNORE_DIRS, _walk, changed_files
+
+TEST_PATTERNS = ("test_*.py", "*_test.py")
+# Changes that cannot be traced through imports and may affect any test.
+GLOBAL_FILES = {"conftest.py", "pyproject.toml", "pytest.ini", "setup.cfg", "setup.py", "tox.ini"}
+# Changes that never affect tests.
+INERT_SUFFIXES = {".md", ".rst"}
+SOURCE_ROOTS = ("", "src")
+# pytest's own default for norecursedirs.
+DEFAULT_NORECURSE = ("*.egg", ".*", "_darcs", "build", "CVS", "dist", "node_modules", "venv", "{arch}")
+# (file, ini section) in pytest's lookup order; pyproject uses [tool.pytest.ini_options].
+PYTEST_CONFIGS = (("pytest.ini", "pytest"), ("pyproject.toml", ""), ("tox.ini", "pytest"), ("setup.cfg", "tool:pytest"))
+# pytest exit code when nothing was collected.
+NO_TESTS_COLLECTED = 5
+
+
+def is_test_file(rel: str, patterns: Iterable[str] = TEST_PATTERNS) -> bool:
+    name = os.path.basename(rel)
+    return any(fnmatch.fnmatch(name, pat) for pat in patterns)
+
+
+def pytest_settings(root: Path) -> Dict[str, List[str]]:
+    """
+    testpaths, python_files and norecursedirs from the first pytest config
+    under root (pytest.ini, pyproject.toml, tox.ini, setup.cfg, in pytest's
+    order), with pytest's defaults for whatever is not set.
+    """
+    raw: Dict[str, object] = {}
+    for name, section in PYTEST_CONFIGS:
+        path = root / name
+        if not path.is_file():
+            continue
+        try:
+            if section:
+                parser = configparser.ConfigParser(interpolation=None)
+                parser.read(path, encoding="utf-8")
+                if not parser.has_section(section):
+                    continue
+                raw = dict(parser.items(section))
+            else:
+                opts = tomllib.loads(path.read_text(encoding="utf-8")).get("tool", {}).get("pytest", {})
+                if "ini_options" not in opts:
+                    continue
+                raw = dict(opts["ini_options"])
+        except (OSError, UnicodeDecodeError, configparser.Error, tomllib.TOMLDecodeError):
+            continue
+        break
+
+    def _list(key: str, default: Tuple[str, ...]) -> List[str]:
+        value = raw.get(key)
+        if value is None:
+            return list(default)
+        return value.split() if isinstance(value, str) else [str(v) for v in value]
+
+    return {
+        "testpaths": [p.strip("/") for p in _list("testpaths", ())],
+        "python_files": _list("python_files", TEST_PATTERNS),
+        "norecursedirs": _list("norecursedirs", DEFAULT_NORECURSE),
+    }
+
+
+def module_name(rel: str) -> str:
+    parts = rel[:-3].replace(os.sep, "/").split("/")
+    if parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def parse_imports(source: str, module: str, is_package: bool) -> List[str]:
+    """
+    Dotted names a module imports, including parent packages (importing
+    a.b.c runs a/__init__ and a/b/__init__). "from a import b" yields both a
+    and a.b since b may be a submodule. Relative imports are resolved.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+    package = module if is_package else module.rpartition(".")[0]
+    names: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base_parts = package.split(".") if package else []
+                if node.level - 1 > len(base_parts):
+                    continue
+                base_parts = base_parts[: len(base_parts) - (node.level - 1)]
+                base = ".".join(base_parts + ([node.module] if node.module else []))
+            else:
+                base = node.module or ""
+            if not base:
+                continue
+            names.add(base)
+            names.update(f"{base}.{alias.name}" for alias in node.names if alias.name != "*")
+    out: Set[str] = set()
+    for name in names:
+        parts = name.split(".")
+        out.update(".".join(parts[:i]) for i in range(1, len(parts) + 1))
+    return sorted(out)
+
+
+class ImpactMap:
+    """
+    Persisted test impact data for one source tree.
+
+    - files: rel path -> {"stat": [size, mtime_ns], "imports": [...]}; a file
+      is re-parsed only when its size or mtime changed.
+    - durations: test file -> seconds of its last run, for slowest-first order.
+
+    select() maps a change set (diff_hashes output) to the test files that
+    import a changed module, directly or transitively. It returns None when a
+    change cannot be traced (conftest, config, data files, deleted modules) and
+    the full suite must run.
+
+    Test files are the ones pytest would collect: python_files names, not
+    under norecursedirs, and inside testpaths when set. Names alone cannot tell
+    a helper such as tools/test_runner.py from a test module, so it may be
+    selected; run_impacted_tests passes a selection that collects nothing.
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path
+        self.files: Dict[str, Dict] = {}
+        self.durations: Dict[str, float] = {}
+        if path is not None and path.exists():
+            try:
+                raw = json.loads(path.read_text(encoding="utf-8"))
+                self.files = dict(raw.get("files", {}))
+                self.durations = {k: float(v) for k, v in raw.get("durations", {}).items()}
+            except (ValueError, TypeError, AttributeError):
+                self.files, self.durations = {}, {}
+        self._importers: Dict[str, Set[str]] = {}
+        self._settings: Dict[str, List[str]] = {
+            "testpaths": [],
+            "python_files": list(TEST_PATTERNS),
+            "norecursedirs": list(DEFAULT_NORECURSE),
+        }
+
+    def refresh(self, root: Path) -> None:
+        self._settings = pytest_settings(root)
+        seen: Dict[str, Dict] = {}
+        for rel, abs_path, st in _walk(root, DEFAULT_IGNORE_DIRS):
+            if not rel.endswith(".py"):
+                continue
+            rel = rel.replace(os.sep, "/")
+            stat = [st.st_size, st.st_mtime_ns]
+            entry = self.files.get(rel)
+            if entry is None or entry.get("stat") != stat:
+                try:
+                    source = Path(abs_path).read_text(encoding="utf-8")
+                except (OSError, UnicodeDecodeError):
+                    source = ""
+                is_pkg = rel.endswith("__init__.py")
+                entry = {"stat": stat, "imports": parse_imports(source, module_name(rel), is_pkg)}
+            seen[rel] = entry
+        self.files = seen
+        self._build_importers()
+
+    def is_test(self, rel: str) -> bool:
+        parts = rel.split("/")
+        if not is_test_file(rel, self._settings["python_files"]):
+            return False
+        if any(fnmatch.fnmatch(d, pat) for d in parts[:-1] for pat in self._settings["norecursedirs"]):
+            return False
+        testpaths = self._settings["testpaths"]
+        return not testpaths or any(rel == tp or rel.startswith(tp + "/") for tp in testpaths)
+
+    def _build_importers(self) -> None:
+        by_module: Dict[str, str] = {}
+        for rel in self.files:
+            for root in SOURCE_ROOTS:
+                if root and not rel.startswith(root + "/"):
+                    continue
+                by_module.setdefault(module_name(rel[len(root) + 1 :] if root else rel), rel)
+        self._importers = {rel: set() for rel in self.files}
+        for rel, entry in self.files.items():
+            for name in entry.get("imports", []):
+                target = by_module.get(name)
+                if target is not None and target != rel:
+                    self._importers[target].add(rel)
+
+    @property
+    def tests(self) -> List[str]:
+        return sorted(rel for rel in self.files if self.is_test(rel))
+
+    def select(self, changes: Dict[str, List[str]]) -> Optional[List[str]]:
+        if not self._importers and self.files:
+            self._build_importers()
+        deleted = set(changes.get("deleted", []))
+        start: Set[str] = set()
+        for rel in sorted(changed_files(changes)):
+            rel = rel.replace(os.sep, "/")
+            if os.path.splitext(rel)[1] in INERT_SUFFIXES:
+                continue
+            if os.path.basename(rel) in GLOBAL_FILES or not rel.endswith(".py"):
+                return None
+            if rel in deleted or rel not in self.files:
+                return None
+            start.add(rel)
+
+        affected: Set[str] = set(start)
+        queue = deque(start)
+        while queue:
+            for importer in self._importers.get(queue.popleft(), ()):
+                if importer not in affected:
+                    affected.add(importer)
+                    queue.append(importer)
+        return self.order(rel for rel in affected if self.is_test(rel))
+
+    def order(self, tests: Iterable[str]) -> List[str]:
+        """Slowest first; tests without a recorded duration (usually new) go first of all."""
+        return sorted(tests, key=lambda rel: (-self.durations.get(rel, float("inf")), rel))
+
+    def record_junit(self, junit_path: Path, tests: Iterable[str]) -> None:
+        """Sum junit testcase times per test file (matched by module prefix of classname)."""
+        by_module = {module_name(rel): rel for rel in tests}
+        totals: Dict[str, float] = {}
+        try:
+            root = ET.parse(str(junit_path)).getroot()
+        except (OSError, ET.ParseError):
+            return
+        for case in root.iter("testcase"):
+            classname = case.get("classname", "")
+            parts = classname.split(".")
+            for i in range(len(parts), 0, -1):
+                rel = by_module.get(".".join(parts[:i]))
+                if rel is not None:
+                    totals[rel] = totals.get(rel, 0.0) + float(case.get("time", 0) or 0)
+                    break
+        self.durations.update(totals)
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # QA and the fan-out may save the same map from different threads.
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps({"files": self.files, "durations": self.durations}), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def run_impacted_tests(
+    root: Path,
+    changes: Optional[Dict[str, List[str]]] = None,
+    impact: Optional[ImpactMap] = None,
+) -> Dict:
+    """
+    Run the tests affected by `changes` under root, slowest first; the whole
+    suite when there is no change set, no map, or select() misses. Returns
+    {"ok", "mode": "full" | "selected" | "none", "tests"}. Durations are
+    recorded in the map, which is saved. A selection in which pytest collects
+    nothing (exit code 5) passes: the files were chosen by name, not by pytest.
+    """
+    selected: Optional[List[str]] = None
+    if impact is not None:
+        impact.refresh(root)
+        if changes is not None:
+            selected = impact.select(changes)
+    if selected is not None and not selected:
+        return {"ok": True, "mode": "none", "tests": []}
+
+    fd, junit = tempfile.mkstemp(prefix="agent-factory-junit-", suffix=".xml")
+    os.close(fd)
+    try:
+        cmd = ["pytest", "-q", f"--junitxml={junit}"] + (selected or [])
+        code = subprocess.run(cmd, cwd=str(root)).returncode
+        ok = code == 0 or (code == NO_TESTS_COLLECTED and bool(selected))
+        if impact is not None:
+            impact.record_junit(Path(junit), selected if selected is not None else impact.tests)
+            impact.save()
+    finally:
+        Path(junit).unlink(missing_ok=True)
+    return {"ok": ok, "mode": "full" if selected is None else "selected", "tests": selected or []}
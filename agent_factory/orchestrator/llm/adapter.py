@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import os
-import urllib.request
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from agent_factory.orchestrator.llm.cache import ResponseCache, default_cache
+from agent_factory.orchestrator.llm.transport import CallTiming, HTTPTransport, TransportError, default_transport
 
 
 class LLMError(Exception):
@@ -11,70 +14,144 @@ class LLMError(Exception):
 
 
 class OpenAICompatibleAdapter:
-    def __init__(self, api_key: Optional[str], base_url: str, model: str):
+    def __init__(
+        self,
+        api_key: Optional[str],
+        base_url: str,
+        model: str,
+        *,
+        transport: Optional[HTTPTransport] = None,
+        temperature: float = 0.2,
+        cache: Optional[ResponseCache] = None,
+    ):
         if not api_key:
             raise LLMError("Missing API key")
         self.api_key = api_key
         self.base_url = base_url.rstrip("/")
         self.model = model
+        self.temperature = temperature
+        self.transport = transport or default_transport()
+        self.cache = cache
+        self.timings: List[CallTiming] = []
 
-    def generate_json(self, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
-        payload = {
-            "model": self.model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            "temperature": 0.2,
-        }
-
-        req = urllib.request.Request(
-            f"{self.base_url}/chat/completions",
-            data=json.dumps(payload).encode("utf-8"),
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}",
-            },
+    @classmethod
+    def from_env(cls) -> "OpenAICompatibleAdapter":
+        """Adapter from OPENAI_* variables, backed by the process-wide response cache."""
+        return cls(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1"),
+            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+            cache=default_cache(),
         )
 
-        try:
-            with urllib.request.urlopen(req, timeout=60) as r:
-                data = json.loads(r.read().decode("utf-8"))
-        except Exception as e:  # pragma: no cover - network errors handled in runtime
-            raise LLMError(str(e))
+    @property
+    def last_timing(self) -> Optional[CallTiming]:
+        return self.timings[-1] if self.timings else None
 
+    def generate_json(self, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+        key = self._cache_key(system_prompt, user_prompt)
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            try:
+                return json.loads(cached)
+            except ValueError:
+                pass
+        content = self._chat(system_prompt, user_prompt)
         try:
-            content = data["choices"][0]["message"]["content"]
-            return json.loads(content)
+            result = json.loads(content)
         except Exception:
             raise LLMError("Model did not return valid JSON")
+        if key:
+            self.cache.put(key, content)
+        return result
 
     def generate_text(self, system_prompt: str, user_prompt: str) -> str:
-        payload = {
+        key = self._cache_key(system_prompt, user_prompt)
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            return cached
+        content = self._chat(system_prompt, user_prompt)
+        if key:
+            self.cache.put(key, content)
+        return content
+
+    def forget(self, system_prompt: str, user_prompt: str) -> None:
+        """Drop the cached response for a prompt pair, e.g. a patch that failed its gate."""
+        key = self._cache_key(system_prompt, user_prompt)
+        if key:
+            self.cache.delete(key)
+
+    async def agenerate_json(
+        self, system_prompt: str, user_prompt: str, semaphore: Optional[asyncio.Semaphore] = None
+    ) -> Dict[str, Any]:
+        """Async generate_json; the blocking call runs in a worker thread, bounded by semaphore."""
+        if semaphore is None:
+            return await asyncio.to_thread(self.generate_json, system_prompt, user_prompt)
+        async with semaphore:
+            return await asyncio.to_thread(self.generate_json, system_prompt, user_prompt)
+
+    async def agenerate_text(
+        self, system_prompt: str, user_prompt: str, semaphore: Optional[asyncio.Semaphore] = None
+    ) -> str:
+        if semaphore is None:
+            return await asyncio.to_thread(self.generate_text, system_prompt, user_prompt)
+        async with semaphore:
+            return await asyncio.to_thread(self.generate_text, system_prompt, user_prompt)
+
+    def generate_json_many(
+        self, requests: Sequence[Tuple[str, str]], max_concurrency: Optional[int] = None
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Fan out (system_prompt, user_prompt) pairs concurrently and return results in
+        request order. Failures are returned in place as exceptions so callers can
+        fall back per item. For synchronous callers; inside a running event loop
+        use agenerate_json with a shared semaphore instead.
+        """
+        return asyncio.run(self._gather(self.agenerate_json, requests, max_concurrency))
+
+    def generate_text_many(
+        self, requests: Sequence[Tuple[str, str]], max_concurrency: Optional[int] = None
+    ) -> List[Union[str, Exception]]:
+        return asyncio.run(self._gather(self.agenerate_text, requests, max_concurrency))
+
+    async def _gather(self, fn: Any, requests: Sequence[Tuple[str, str]], max_concurrency: Optional[int]) -> List[Any]:
+        limit = max_concurrency or int(os.getenv("OPENAI_MAX_CONCURRENCY", "0")) or self.transport.max_connections
+        semaphore = asyncio.Semaphore(max(1, limit))
+        return await asyncio.gather(*(fn(sp, up, semaphore) for sp, up in requests), return_exceptions=True)
+
+    def _cache_key(self, system_prompt: str, user_prompt: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self.cache.key(self.base_url, self.model, system_prompt, user_prompt, {"temperature": self.temperature})
+
+    def _payload(self, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+        return {
             "model": self.model,
             "messages": [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt},
             ],
-            "temperature": 0.2,
+            "temperature": self.temperature,
         }
 
-        req = urllib.request.Request(
-            f"{self.base_url}/chat/completions",
-            data=json.dumps(payload).encode("utf-8"),
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}",
-            },
-        )
-
+    def _chat(self, system_prompt: str, user_prompt: str) -> str:
         try:
-            with urllib.request.urlopen(req, timeout=60) as r:
-                data = json.loads(r.read().decode("utf-8"))
-        except Exception as e:  # pragma: no cover - network errors handled in runtime
+            status, body, timing = self.transport.post(
+                f"{self.base_url}/chat/completions",
+                json.dumps(self._payload(system_prompt, user_prompt)).encode("utf-8"),
+                {
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {self.api_key}",
+                },
+            )
+        except TransportError as e:  # pragma: no cover - network errors handled in runtime
             raise LLMError(str(e))
+        self.timings.append(timing)
 
+        if status >= 400:
+            raise LLMError(f"HTTP {status}: {body[:500].decode('utf-8', errors='replace')}")
         try:
+            data = json.loads(body.decode("utf-8"))
             return data["choices"][0]["message"]["content"]
         except Exception:
             raise LLMError("Model did not return text content")
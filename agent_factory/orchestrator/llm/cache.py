@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_TTL_S = 7 * 24 * 3600
+DEFAULT_MAX_MB = 512
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of LLM responses.
+
+    Key: sha256 over (base_url, model, sha256(system), sha256(user), params).
+    Entries live in <root>/<key[:2]>/<key>.json. Entries older than ttl_s
+    (counted from their stored created_at, hits do not extend it) are dropped
+    on read; when max_bytes is exceeded the least recently used entries are
+    evicted. Recency and sizes are kept in an in-memory index, seeded once from
+    the directory (by mtime, which hits refresh); entries written by other
+    processes afterwards are only counted from their next start.
+    """
+
+    def __init__(self, root: Path, ttl_s: Optional[float] = None, max_bytes: Optional[int] = None) -> None:
+        self.root = root
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._index: Optional["OrderedDict[str, int]"] = None  # path -> bytes, least recently used first
+        self._size = 0
+
+    @staticmethod
+    def key(base_url: str, model: str, system_prompt: str, user_prompt: str, params: Dict[str, Any]) -> str:
+        parts = {
+            "base_url": base_url,
+            "model": model,
+            "system": hashlib.sha256(system_prompt.encode("utf-8")).hexdigest(),
+            "user": hashlib.sha256(user_prompt.encode("utf-8")).hexdigest(),
+            "params": params,
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            st = path.stat()
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            created = float(entry.get("created_at", st.st_mtime))
+            if self.ttl_s is not None and time.time() - created > self.ttl_s:
+                self._drop(path, st.st_size)
+                raise FileNotFoundError(path)
+            content = entry["content"]
+            os.utime(path)  # recency for LRU eviction only; TTL runs from created_at
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        with self._lock:
+            self.stats["hits"] += 1
+            if self._index is not None and str(path) in self._index:
+                self._index.move_to_end(str(path))
+        return content
+
+    def delete(self, key: str) -> None:
+        """Forget one entry, e.g. a response that turned out to be unusable."""
+        path = self._path(key)
+        path.unlink(missing_ok=True)
+        with self._lock:
+            self._unindex(str(path))
+
+    def put(self, key: str, content: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"created_at": time.time(), "content": content}, ensure_ascii=False).encode("utf-8")
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self.stats["writes"] += 1
+            if self.max_bytes is None:
+                return
+            index = self._load_index()
+            self._size += len(data) - index.pop(str(path), 0)
+            index[str(path)] = len(data)
+            while self._size > self.max_bytes and index:
+                victim, size = index.popitem(last=False)
+                Path(victim).unlink(missing_ok=True)
+                self._size -= size
+                self.stats["evictions"] += 1
+
+    def clear(self) -> None:
+        for path in self.root.glob("*/*.json"):
+            path.unlink(missing_ok=True)
+        with self._lock:
+            if self._index is not None:
+                self._index.clear()
+            self._size = 0
+
+    def _drop(self, path: Path, size: int) -> None:
+        path.unlink(missing_ok=True)
+        with self._lock:
+            self.stats["evictions"] += 1
+            self._unindex(str(path))
+
+    def _unindex(self, path: str) -> None:
+        # Called with the lock held.
+        if self._index is not None and path in self._index:
+            self._size -= self._index.pop(path)
+
+    def _load_index(self) -> "OrderedDict[str, int]":
+        # Called with the lock held; scans the directory once per process.
+        if self._index is not None:
+            return self._index
+        entries = []
+        for p in self.root.glob("*/*.json"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, str(p), st.st_size))
+        entries.sort()
+        self._index = OrderedDict((p, size) for _, p, size in entries)
+        self._size = sum(self._index.values())
+        return self._index
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> Optional[ResponseCache]:
+    """
+    Process-wide response cache configured from the environment:
+    LLM_CACHE_BYPASS=1 disables it, LLM_CACHE_DIR (default runs/.llm_cache),
+    LLM_CACHE_TTL_S (default 7 days) and LLM_CACHE_MAX_MB (default 512) bound
+    it; 0 lifts a bound.
+    """
+    global _default_cache
+    if os.getenv("LLM_CACHE_BYPASS", "").lower() in ("1", "true", "yes"):
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            ttl = float(os.getenv("LLM_CACHE_TTL_S") or DEFAULT_TTL_S)
+            max_mb = float(os.getenv("LLM_CACHE_MAX_MB") or DEFAULT_MAX_MB)
+            _default_cache = ResponseCache(
+                Path(os.getenv("LLM_CACHE_DIR", "runs/.llm_cache")),
+                ttl_s=ttl or None,
+                max_bytes=int(max_mb * 1024 * 1024) or None,
+            )
+        return _default_cache
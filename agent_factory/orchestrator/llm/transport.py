@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import email.utils
+import http.client
+import os
+import random
+import socket
+import threading
+import time
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+_CONN_ERRORS = (http.client.HTTPException, ConnectionError, socket.timeout, OSError)
+# Errors meaning a pooled keep-alive socket was already closed by the server.
+_STALE_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class TransportError(Exception):
+    pass
+
+
+@dataclass
+class CallTiming:
+    url: str
+    status: Optional[int] = None
+    attempts: int = 0
+    reused_connection: bool = False
+    elapsed_s: float = 0.0
+    backoff_s: float = 0.0
+
+
+class _HostPool:
+    def __init__(self, max_connections: int) -> None:
+        self.slots = threading.BoundedSemaphore(max_connections)
+        self.idle: List[http.client.HTTPConnection] = []
+        self.lock = threading.Lock()
+
+
+def retry_after_s(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class HTTPTransport:
+    """
+    Keep-alive HTTP/1.1 client for LLM endpoints.
+
+    - One pool of persistent http.client connections per (scheme, host, port);
+      at most max_connections requests per host are in flight at once.
+    - 429/5xx and connection errors are retried with full-jitter exponential
+      backoff; a Retry-After header takes precedence over the computed delay.
+    - A reused idle connection the server already closed (disconnect, reset or
+      broken pipe before any response byte) is retried immediately on a fresh
+      connection without counting as an attempt. Anything else, timeouts
+      included, may mean the POST was processed and takes the counted,
+      backed-off path.
+    - HTTPS proxies from the environment are honoured via CONNECT tunnels.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 8,
+        timeout_s: float = 60,
+        max_retries: int = 4,
+        backoff_base_s: float = 0.5,
+        backoff_max_s: float = 30.0,
+    ) -> None:
+        self.max_connections = max(1, int(max_connections))
+        self.timeout_s = timeout_s
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self._pools: Dict[Tuple[str, str, int], _HostPool] = {}
+        self._pools_lock = threading.Lock()
+
+    def post(self, url: str, body: bytes, headers: Dict[str, str]) -> Tuple[int, bytes, CallTiming]:
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme or "https"
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname or "", port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        send_headers = {"Connection": "keep-alive", **headers}
+
+        pool = self._pool(key)
+        timing = CallTiming(url=url)
+        start = time.monotonic()
+        attempt = 0
+        with pool.slots:
+            while True:
+                attempt += 1
+                timing.attempts = attempt
+                conn, reused = self._checkout(pool, key)
+                timing.reused_connection = reused
+                responded = False
+                try:
+                    conn.request("POST", self._request_target(conn, key, path), body=body, headers=send_headers)
+                    resp = conn.getresponse()
+                    responded = True
+                    data = resp.read()
+                except _CONN_ERRORS as e:
+                    conn.close()
+                    if reused and not responded and isinstance(e, _STALE_ERRORS):
+                        attempt -= 1
+                        continue
+                    if attempt > self.max_retries:
+                        timing.elapsed_s = time.monotonic() - start
+                        raise TransportError(f"{type(e).__name__}: {e}") from e
+                    timing.backoff_s += self._sleep(attempt, None)
+                    continue
+
+                if resp.will_close:
+                    conn.close()
+                else:
+                    self._checkin(pool, conn)
+                timing.status = resp.status
+                if resp.status in RETRY_STATUSES and attempt <= self.max_retries:
+                    timing.backoff_s += self._sleep(attempt, retry_after_s(resp.getheader("Retry-After")))
+                    continue
+                timing.elapsed_s = time.monotonic() - start
+                return resp.status, data, timing
+
+    def close(self) -> None:
+        with self._pools_lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            with pool.lock:
+                for conn in pool.idle:
+                    conn.close()
+                pool.idle.clear()
+
+    def _pool(self, key: Tuple[str, str, int]) -> _HostPool:
+        with self._pools_lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = _HostPool(self.max_connections)
+            return pool
+
+    def _checkout(self, pool: _HostPool, key: Tuple[str, str, int]) -> Tuple[http.client.HTTPConnection, bool]:
+        with pool.lock:
+            if pool.idle:
+                return pool.idle.pop(), True
+        return self._connect(key), False
+
+    def _checkin(self, pool: _HostPool, conn: http.client.HTTPConnection) -> None:
+        with pool.lock:
+            pool.idle.append(conn)
+
+    def _connect(self, key: Tuple[str, str, int]) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        proxy = self._proxy_for(scheme, host)
+        if scheme == "https":
+            if proxy:
+                conn = http.client.HTTPSConnection(proxy.hostname, proxy.port or 80, timeout=self.timeout_s)
+                conn.set_tunnel(host, port)
+                return conn
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout_s)
+        if proxy:
+            conn = http.client.HTTPConnection(proxy.hostname, proxy.port or 80, timeout=self.timeout_s)
+            conn._af_proxied = True  # type: ignore[attr-defined]
+            return conn
+        return http.client.HTTPConnection(host, port, timeout=self.timeout_s)
+
+    @staticmethod
+    def _request_target(conn: http.client.HTTPConnection, key: Tuple[str, str, int], path: str) -> str:
+        if getattr(conn, "_af_proxied", False):
+            scheme, host, port = key
+            return f"{scheme}://{host}:{port}{path}"
+        return path
+
+    @staticmethod
+    def _proxy_for(scheme: str, host: str) -> Optional[urllib.parse.SplitResult]:
+        proxy = urllib.request.getproxies().get(scheme)
+        if not proxy or urllib.request.proxy_bypass(host):
+            return None
+        return urllib.parse.urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+
+    def _sleep(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            delay = min(retry_after, self.backoff_max_s)
+        else:
+            delay = random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * (2 ** (attempt - 1))))
+        time.sleep(delay)
+        return delay
+
+
+_default_transport: Optional[HTTPTransport] = None
+_default_lock = threading.Lock()
+
+
+def default_transport() -> HTTPTransport:
+    """Process-wide transport shared by all adapters, configured from the environment."""
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = HTTPTransport(
+                max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "8")),
+                timeout_s=float(os.getenv("OPENAI_TIMEOUT_S", "60")),
+                max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "4")),
+            )
+        return _default_transport
+
+
+def _reset_after_fork() -> None:
+    # Sockets must not be shared between a parent and forked pool workers.
+    global _default_transport, _default_lock
+    _default_transport = None
+    _default_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
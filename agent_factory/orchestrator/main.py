@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 import sys
 from pathlib import Path
 from typing import Any, Dict, List, Optional
@@ -28,12 +29,13 @@ from agent_factory.agents.fsm_agent import FSMAgent
 from agent_factory.agents.scene_graph_agent import SceneGraphAgent
 from agent_factory.agents.protocol_agent import ProtocolAgent
 from agent_factory.agents.undo_agent import UndoAgent
-from agent_factory.orchestrator.pool_process import run_process_pool, schedule_batches
+from agent_factory.orchestrator.pool_process import run_batches, schedule_batches
 from agent_factory.orchestrator.merge_lock import MergeLock
 from agent_factory.orchestrator.sandbox import merge_sandbox
-from agent_factory.orchestrator.worker import implement_task_worker
-from agent_factory.orchestrator.dag import topo_sort
-from agent_factory.orchestrator.conflicts import has_conflict
+from agent_factory.orchestrator.worker import implement_task_worker, init_implementer_worker
+from agent_factory.orchestrator.dag import critical_path, levels, topo_sort
+from agent_factory.orchestrator.merge_queue import MergeQueue
+from agent_factory.orchestrator.impact import ImpactMap
 from agent_factory.orchestrator.rebase import rebase_and_reapply
 from agent_factory.agents.prd_agent import PRDAgent
 from agent_factory.agents.spec_agent import SpecAgent
@@ -42,13 +44,15 @@ from agent_factory.orchestrator.spec_pipeline import backlog_to_plan
 from agent_factory.orchestrator.marketplace.router import load_capabilities, pick_capability
 from agent_factory.orchestrator.marketplace.budget import BudgetManager
 from agent_factory.orchestrator.marketplace.scheduler import CapabilityScheduler
+from agent_factory.orchestrator.llm.cache import default_cache
 from orchestrator.integrator.gates import run_integration_gates
 from orchestrator.integrator.matrix import build_matrix
 from orchestrator.integrator.lock import read_lock, write_lock, update_module
 from orchestrator.multirepo.planner import derive_modules, write_multirepo_plan
 from orchestrator.multirepo.publisher import MultiRepoPublisher
+from orchestrator.vault.cache import retrieval_cache
 from orchestrator.vault.vault import Vault
-from orchestrator.vault.indexer import rebuild_index
+from orchestrator.vault.indexer import compact_in_background, update_index
 
 
 def run_pipeline(
@@ -63,7 +67,7 @@ def run_pipeline(
     resolved_stack = stack or config.get("default_stack", "web_fullstack")
     run_root = Path(config.get("run_root", "runs"))
 
-    state_store = StateStore(base_path=run_root)
+    state_store = StateStore.from_config(run_root, config)
     run_dir = state_store.init_run(
         project_name=project_name,
         prompt=prompt,
@@ -74,12 +78,38 @@ def run_pipeline(
     tasks = build_default_tasks(project_name)
 
     agents = _build_agents(run_dir, resolved_stack, state_store, config, dry_run, prompt)
-    router = TaskRouter(tasks)
+    router_cfg = config.get("router", {}) or {}
+    router = TaskRouter(
+        tasks,
+        max_workers=int(router_cfg.get("max_workers", 2)),
+        on_error=router_cfg.get("on_error", "fail_fast"),
+    )
 
     def _runner(task: Task) -> None:
         agents[task.id]()
 
-    router.run(_runner)
+    try:
+        router.run(_runner)
+    finally:
+        llm_cache = default_cache()
+        if llm_cache is not None:
+            state_store.append_jsonl(
+                run_dir,
+                "logs/llm_cache.jsonl",
+                {"ts": state_store.utc_now(), "event": "llm_cache_stats", **llm_cache.stats},
+            )
+        vault_cache = retrieval_cache(Vault(Path(__file__).resolve().parents[2] / "knowledge"))
+        state_store.append_jsonl(
+            run_dir,
+            "logs/vault.jsonl",
+            {
+                "ts": state_store.utc_now(),
+                "event": "retrieval_cache_stats",
+                "hit_rate": round(vault_cache.hit_rate, 4),
+                **vault_cache.stats,
+            },
+        )
+        state_store.close()
     return run_dir
 
 
@@ -190,7 +220,12 @@ def _build_agents(
     def run_knowledge_harvest() -> None:
         knowledge_harvester.run()
         vault = Vault(repo_root / "knowledge")
-        rebuild_index(vault)
+        stats = update_index(vault, compact=False)
+        state_store.append_jsonl(
+            run_dir, "logs/vault.jsonl", {"ts": state_store.utc_now(), "event": "index_updated", **stats}
+        )
+        # Segment merging does not block the pipeline; retrieval reads through it.
+        compact_in_background(vault)
 
     def run_knowledge_curator() -> None:
         knowledge_curator.run()
@@ -277,6 +312,42 @@ def _build_agents(
         "release": run_release,
     }
 
+def _fold_cache_stats(worker_stats: Dict[str, Dict[str, int]]) -> None:
+    """Add a pool worker's cache counters to this process's caches so the run logs cover both."""
+    llm_cache = default_cache()
+    if llm_cache is not None:
+        for k, v in (worker_stats.get("llm") or {}).items():
+            llm_cache.stats[k] = llm_cache.stats.get(k, 0) + v
+    vault_cache = retrieval_cache(Vault(Path(__file__).resolve().parents[2] / "knowledge"))
+    for k, v in (worker_stats.get("retrieval") or {}).items():
+        vault_cache.stats[k] = vault_cache.stats.get(k, 0) + v
+
+
+def _skip_failed_dependents(tasks: List[Dict[str, Any]], status_by_id: Dict[str, str]) -> List[Dict[str, Any]]:
+    """
+    Mark tasks that never ran because a dependency failed or was blocked.
+
+    tasks must be in dependency order so failures propagate transitively.
+    Each such task gets status "dependency_failed"; returns the log records
+    ({"task", "failed_dependencies"}) for them.
+    """
+    ids = {t["id"] for t in tasks}
+    records: List[Dict[str, Any]] = []
+    for task in tasks:
+        if task["id"] in status_by_id:
+            continue
+        failed = [
+            dep
+            for dep in task.get("depends_on") or []
+            if dep in ids and status_by_id.get(dep) not in (None, "done", "skipped")
+        ]
+        if failed:
+            task["status"] = "dependency_failed"
+            status_by_id[task["id"]] = task["status"]
+            records.append({"task": task["id"], "failed_dependencies": failed})
+    return records
+
+
 def _fan_out(run_dir: Path, implementer: ImplementerAgent, state_store: StateStore, config: Dict) -> None:
     plan_path = run_dir / "plan.json"
     if not plan_path.exists():
@@ -303,33 +374,36 @@ def _fan_out(run_dir: Path, implementer: ImplementerAgent, state_store: StateSto
             t["touch_hints"] = t.get("touch_hints") or []
 
     batches = schedule_batches(todo_tasks)
+    task_levels = levels(todo_tasks)
+    crit_len, crit_path = critical_path(todo_tasks)
     state_store.append_jsonl(
         run_dir,
         "logs/pool.jsonl",
-        {"ts": state_store.utc_now(), "event": "batches_scheduled", "batches": [[t["id"] for t in b] for b in batches]},
+        {
+            "ts": state_store.utc_now(),
+            "event": "batches_scheduled",
+            "batches": [[t["id"] for t in b] for b in batches],
+            "dag_levels": max(task_levels.values(), default=-1) + 1,
+            "critical_path": crit_path,
+            "critical_path_length": crit_len,
+        },
     )
 
     max_workers = int(config.get("implementer_pool", {}).get("max_workers", 2))
-    lock = MergeLock(lockfile=run_dir / "locks" / "merge.lock")
-    merged: Dict[str, list] = {"created": [], "deleted": [], "modified": []}
+    sandbox_backend = (config.get("sandbox", {}) or {}).get("backend", "copy")
+    lock_cfg = config.get("merge_lock", {}) or {}
+    lock = MergeLock(
+        lockfile=run_dir / "locks" / "merge.lock",
+        timeout_s=float(lock_cfg.get("timeout_s") or 0) or None,
+        fair=bool(lock_cfg.get("fair", False)),
+        on_metrics=lambda m: state_store.append_jsonl(run_dir, "logs/locks.jsonl", {"ts": state_store.utc_now(), **m}),
+    )
     repo_root = Path(__file__).resolve().parents[2]
 
-    def merge_union(base: Dict[str, list], inc: Dict[str, list]) -> Dict[str, list]:
-        for k in ["created", "deleted", "modified"]:
-            base[k] = sorted(list(set(base[k]) | set(inc.get(k, []))))
-        return base
-
-    def _work(t: Dict[str, Any]) -> Dict[str, Any]:
-        args = {
-            "repo_root": str(Path(".").resolve()),
-            "runs_dir": str(run_dir.parent),
-            "project": run_dir.name,
-            "stack": t.get("owner", "web_fullstack"),
-            "task": t,
-        }
-        return implement_task_worker(args)
+    def _args(t: Dict[str, Any]) -> Dict[str, Any]:
+        # Workers hold a warm implementer (see init_implementer_worker); only the task travels.
+        return {"stack": t.get("owner", "web_fullstack"), "task": t}
 
-    repo_root = Path(__file__).resolve().parents[2]
     caps = load_capabilities(repo_root)
     budgets = BudgetManager({c.name: c.budget for c in caps.values()})
     sched = CapabilityScheduler({c.name: c.concurrency for c in caps.values()})
@@ -337,90 +411,115 @@ def _fan_out(run_dir: Path, implementer: ImplementerAgent, state_store: StateSto
     for _, _, task in iter_plan_tasks(plan):
         task["capability"] = pick_capability(caps, task).name
 
-    queue = [t for _, _, t in iter_plan_tasks(plan) if t.get("status") == "todo"]
-    while queue:
-        progressed = False
-        for task in list(queue):
-            cap = task.get("capability")
-            if not budgets.can_start(cap) or not sched.can_run(cap):
-                continue
-            budgets.started(cap)
-            sched.start(cap)
-            state_store.append_jsonl(
-                run_dir,
-                "logs/dispatch.jsonl",
-                {"ts": state_store.utc_now(), "task": task["id"], "capability": cap},
-            )
-            queue.remove(task)
-            res = _work(task)
-
-            status = res.get("status")
-            if status == "ready_to_merge":
-                if has_conflict(merged, res.get("changes", {})):
-                    patches = res.get("patches") or {}
-                    tests_diff = patches.get("tests")
-                    code_diff = patches.get("code")
-
-                    if tests_diff and code_diff:
-                        ok = rebase_and_reapply(repo_root, Path(res["sandbox"]), tests_diff, code_diff)
-                        state_store.append_jsonl(
-                            run_dir,
-                            "logs/conflicts.jsonl",
-                            {
-                                "ts": state_store.utc_now(),
-                                "task": task["id"],
-                                "event": "rebase_attempt",
-                                "result": "ok" if ok else "fail",
-                            },
-                        )
-                        if ok:
-                            lock.acquire()
-                            try:
-                                merge_sandbox(repo_root, Path(res["sandbox"]))
-                                merged = merge_union(merged, res.get("changes", {}))
-                                task["status"] = "done"
-                            finally:
-                                lock.release()
-                            sched.finish(cap)
-                            budgets.finished(cap)
-                            progressed = True
-                            continue
-
-                    task["status"] = "blocked"
-                    state_store.append_jsonl(
-                        run_dir,
-                        "logs/conflicts.jsonl",
-                        {
-                            "ts": state_store.utc_now(),
-                            "task": task["id"],
-                            "event": "merge_blocked_overlap",
-                            "changes": res.get("changes", {}),
-                            "note": "Rebase failed or missing patches",
-                        },
-                    )
-                else:
-                    lock.acquire()
-                    try:
-                        merge_sandbox(repo_root, Path(res["sandbox"]))
-                        merged = merge_union(merged, res.get("changes", {}))
-                        task["status"] = "done"
-                    finally:
-                        lock.release()
-            elif status == "skipped":
-                task["status"] = "skipped"
-            else:
-                task["status"] = status or "failed"
-
-            sched.finish(cap)
-            budgets.finished(cap)
-            progressed = True
-        if not progressed:
-            break
+    todo_ids = {t["id"] for t in todo_tasks}
+    status_by_id: Dict[str, str] = {}
+
+    def _admit(task: Dict[str, Any]) -> bool:
+        for dep in task.get("depends_on") or []:
+            if dep in todo_ids and status_by_id.get(dep) not in ("done", "skipped"):
+                return False
+        cap = task.get("capability")
+        return budgets.can_start(cap) and sched.can_run(cap)
+
+    def _submit(task: Dict[str, Any]) -> None:
+        cap = task.get("capability")
+        budgets.started(cap)
+        sched.start(cap)
+        state_store.append_jsonl(
+            run_dir,
+            "logs/dispatch.jsonl",
+            {"ts": state_store.utc_now(), "task": task["id"], "capability": cap},
+        )
+        queue.begin(task["id"])
+
+    def _merge(task: Dict[str, Any], res: Dict[str, Any]) -> None:
+        with lock:
+            stats = merge_sandbox(repo_root, Path(res["sandbox"]), res.get("changes"))
+        state_store.append_jsonl(
+            run_dir,
+            "logs/merge.jsonl",
+            {"ts": state_store.utc_now(), "task": task["id"], **stats},
+        )
+
+    impact = ImpactMap(run_dir / "cache" / "test_impact.json")
+
+    def _rebase(task: Dict[str, Any], res: Dict[str, Any]) -> bool:
+        patches = res.get("patches") or {}
+        if not (patches.get("tests") and patches.get("code")):
+            raise ValueError("missing patches")
+        return rebase_and_reapply(
+            repo_root,
+            Path(res["sandbox"]),
+            patches["tests"],
+            patches["code"],
+            backend=sandbox_backend,
+            changes=res.get("changes"),
+            impact=impact,
+            lock=lock,
+        )
+
+    def _merged(task: Dict[str, Any], outcome: str) -> None:
+        task["status"] = "done" if outcome == "merged" else "blocked"
+        status_by_id[task["id"]] = task["status"]
+
+    # Tasks run optimistically against the tree at submission; overlapping
+    # results are rebased onto the latest merged tree in the background.
+    queue = MergeQueue(
+        _merge,
+        _rebase,
+        max_retries=int((config.get("merge_queue", {}) or {}).get("max_retries", 2)),
+        on_done=_merged,
+        on_event=lambda rec: state_store.append_jsonl(
+            run_dir, "logs/conflicts.jsonl", {"ts": state_store.utc_now(), **rec}
+        ),
+    )
+
+    def _complete(task: Dict[str, Any], res: Dict[str, Any]) -> None:
+        cap = task.get("capability")
+        _fold_cache_stats(res.get("cache_stats") or {})
+        status = res.get("status")
+        if status == "ready_to_merge":
+            queue.offer(task, res)
+        else:
+            task["status"] = "skipped" if status == "skipped" else (status or "failed")
+            status_by_id[task["id"]] = task["status"]
+        sched.finish(cap)
+        budgets.finished(cap)
+
+    try:
+        run_batches(
+            batches,
+            implement_task_worker,
+            _args,
+            max_workers=max_workers,
+            admit=_admit,
+            on_submit=_submit,
+            on_result=_complete,
+            initializer=init_implementer_worker,
+            initargs=(str(Path(".").resolve()), str(run_dir.parent), run_dir.name, implementer.stack),
+            on_idle=queue.wait_progress,
+        )
+    finally:
+        queue.close()
+    state_store.append_jsonl(
+        run_dir,
+        "logs/pool.jsonl",
+        {"ts": state_store.utc_now(), "event": "merge_queue_stats", **queue.stats},
+    )
+    state_store.append_jsonl(
+        run_dir,
+        "logs/pool.jsonl",
+        {"ts": state_store.utc_now(), "event": "merge_lock_stats", **lock.stats},
+    )
+    for rec in _skip_failed_dependents(todo_tasks, status_by_id):
+        state_store.append_jsonl(
+            run_dir,
+            "logs/pool.jsonl",
+            {"ts": state_store.utc_now(), "event": "skipped_dependency_failed", **rec},
+        )
 
     plan_path.write_text(json.dumps(plan, indent=2), encoding="utf-8")
-    state = state_store.read_state(run_dir)
-    state["tasks"] = plan.get("milestones", [])
-    state_store.save_state(run_dir, state)
+    state_store.update_state(run_dir, tasks=plan.get("milestones", []))
 
 
 def parse_args() -> argparse.Namespace:
@@ -434,11 +533,15 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument("--config", type=Path, help="Path to a custom config.yaml")
     parser.add_argument("--dry-run", action="store_true", help="Run without executing external commands.")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Bypass the LLM response cache.")
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
+    if args.no_llm_cache:
+        # Set in the environment so implementer pool workers inherit it.
+        os.environ["LLM_CACHE_BYPASS"] = "1"
     if args.prompt_file:
         prompt = args.prompt_file.read_text(encoding="utf-8")
     else:
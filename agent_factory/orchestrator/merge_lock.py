@@ -1,28 +1,218 @@
 from __future__ import annotations
 
+import os
+import socket
+import threading
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":  # os.kill(pid, 0) would terminate the process on Windows
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
 
 
 @dataclass
 class MergeLock:
+    """
+    Cross-process merge lock.
+
+    - POSIX: fcntl.flock on the lockfile. The kernel drops the lock when the
+      holder exits, so a crashed worker can never deadlock the run. With
+      timeout_s=None acquire() blocks in the kernel without polling. A
+      deadline cannot interrupt a blocking flock from any thread (SIGALRM only
+      reaches the main thread), so with timeout_s set it polls LOCK_NB with a
+      1-50 ms backoff instead, trading wake-up latency for the timeout.
+    - Elsewhere: exclusive create of the lockfile; a lock whose holder PID is
+      gone or which is older than stale_after_s is broken.
+    - fair=True: waiters take a ticket in <lockfile>.queue/ and only the oldest
+      live ticket may take the lock (FIFO across processes).
+
+    The holder PID/host/time is written into the lockfile. After every release
+    on_metrics (if set) receives wait_s/hold_s for the run logs; totals are
+    kept in `stats`, which threads sharing the lock update under a lock.
+    """
+
     lockfile: Path
-    timeout_s: int = 60
+    timeout_s: Optional[float] = 60
+    fair: bool = False
+    stale_after_s: float = 600
+    on_metrics: Optional[Callable[[Dict[str, Any]], None]] = None
+    stats: Dict[str, float] = field(
+        default_factory=lambda: {"acquisitions": 0, "total_wait_s": 0.0, "max_wait_s": 0.0, "total_hold_s": 0.0}
+    )
+
+    def __post_init__(self) -> None:
+        self._fd: Optional[int] = None
+        self._thread_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._acquired_at = 0.0
+        self._wait_s = 0.0
+
+    @property
+    def queue_dir(self) -> Path:
+        return self.lockfile.with_name(self.lockfile.name + ".queue")
 
     def acquire(self) -> None:
-        start = time.time()
+        start = time.monotonic()
+        deadline = None if self.timeout_s is None else start + float(self.timeout_s)
+        if not self._thread_lock.acquire(timeout=-1 if deadline is None else max(0.0, deadline - start)):
+            raise TimeoutError(f"Merge lock timeout: {self.describe_holder()}")
+        try:
+            self.lockfile.parent.mkdir(parents=True, exist_ok=True)
+            ticket = self._take_ticket() if self.fair else None
+            try:
+                if ticket is not None:
+                    self._wait_for_turn(ticket, deadline)
+                if fcntl is not None:
+                    self._acquire_flock(deadline)
+                else:
+                    self._acquire_exclusive(deadline)
+            finally:
+                if ticket is not None:
+                    ticket.unlink(missing_ok=True)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+        self._acquired_at = time.monotonic()
+        self._wait_s = self._acquired_at - start
+        self._write_holder()
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        hold_s = time.monotonic() - self._acquired_at
+        fd, self._fd = self._fd, None
+        try:
+            if fcntl is not None:
+                os.ftruncate(fd, 0)
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+            else:
+                os.close(fd)
+                self.lockfile.unlink(missing_ok=True)
+        finally:
+            self._thread_lock.release()
+        self._record(self._wait_s, hold_s)
+
+    def __enter__(self) -> "MergeLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.release()
+
+    def holder(self) -> Dict[str, Any]:
+        try:
+            raw = self.lockfile.read_text(encoding="utf-8").split()
+        except OSError:
+            return {}
+        if len(raw) < 3:
+            return {}
+        return {"pid": int(raw[0]), "host": raw[1], "since": float(raw[2])}
+
+    def describe_holder(self) -> str:
+        h = self.holder()
+        if not h:
+            return "holder unknown"
+        alive = "alive" if _pid_alive(h["pid"]) else "dead"
+        return f"held by pid {h['pid']} on {h['host']} ({alive}) for {time.time() - h['since']:.1f}s"
+
+    def _acquire_flock(self, deadline: Optional[float]) -> None:
+        fd = os.open(self.lockfile, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if deadline is None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                delay = 0.001
+                while True:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if time.monotonic() >= deadline:
+                            raise TimeoutError(f"Merge lock timeout: {self.describe_holder()}")
+                        time.sleep(delay)
+                        delay = min(delay * 2, 0.05)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+    def _acquire_exclusive(self, deadline: Optional[float]) -> None:
+        delay = 0.001
         while True:
             try:
-                self.lockfile.parent.mkdir(parents=True, exist_ok=True)
-                fd = self.lockfile.open("x")
-                fd.write("locked")
-                fd.close()
+                self._fd = os.open(self.lockfile, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
                 return
             except FileExistsError:
-                if time.time() - start > self.timeout_s:
-                    raise TimeoutError("Merge lock timeout")
-                time.sleep(0.2)
+                if self._break_if_stale():
+                    continue
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"Merge lock timeout: {self.describe_holder()}")
+                time.sleep(delay)
+                delay = min(delay * 2, 0.05)
 
-    def release(self) -> None:
-        self.lockfile.unlink(missing_ok=True)
+    def _break_if_stale(self) -> bool:
+        h = self.holder()
+        try:
+            age = time.time() - self.lockfile.stat().st_mtime
+        except OSError:
+            return True
+        stale = (h and not _pid_alive(h["pid"])) or age > self.stale_after_s
+        if stale:
+            self.lockfile.unlink(missing_ok=True)
+        return bool(stale)
+
+    def _write_holder(self) -> None:
+        payload = f"{os.getpid()} {socket.gethostname()} {time.time():.3f}\n".encode("utf-8")
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        os.write(self._fd, payload)
+
+    def _take_ticket(self) -> Path:
+        self.queue_dir.mkdir(parents=True, exist_ok=True)
+        ticket = self.queue_dir / f"{time.time_ns():020d}-{os.getpid()}-{threading.get_ident()}"
+        ticket.touch()
+        return ticket
+
+    def _wait_for_turn(self, ticket: Path, deadline: Optional[float]) -> None:
+        delay = 0.001
+        while True:
+            head = None
+            for entry in sorted(os.listdir(self.queue_dir)):
+                pid = int(entry.split("-")[1])
+                if pid != os.getpid() and not _pid_alive(pid):
+                    (self.queue_dir / entry).unlink(missing_ok=True)
+                    continue
+                head = entry
+                break
+            if head == ticket.name:
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Merge lock timeout waiting in queue: {self.describe_holder()}")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    def _record(self, wait_s: float, hold_s: float) -> None:
+        with self._stats_lock:
+            self.stats["acquisitions"] += 1
+            self.stats["total_wait_s"] += wait_s
+            self.stats["max_wait_s"] = max(self.stats["max_wait_s"], wait_s)
+            self.stats["total_hold_s"] += hold_s
+        if self.on_metrics is not None:
+            self.on_metrics({"event": "merge_lock_released", "wait_s": round(wait_s, 6), "hold_s": round(hold_s, 6)})
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from agent_factory.orchestrator.conflicts import changed_set
+
+
+@dataclass
+class MergeItem:
+    task: Dict[str, Any]
+    res: Dict[str, Any]
+    attempts: int = 0
+    tried_at: int = -1  # merge generation of the last rebase attempt
+
+
+class MergeQueue:
+    """
+    Optimistic merge queue for fan-out results.
+
+    - begin(task_id) records the merge generation a task starts from.
+    - offer(task, res) merges at once unless a file it changed was merged by
+      another task since that generation; conflicting results are queued.
+    - A background worker rebases queued results onto the latest merged tree
+      (rebase(task, res) -> bool) and merges them. A failed rebase, or a new
+      overlap merged meanwhile, re-enqueues the result; it is retried once the
+      tree has moved on, up to max_retries rebases.
+    - Results that cannot be retried any more (retries used up, or nothing left
+      that could change the tree) are reported as "blocked".
+
+    merge(task, res) runs with the queue lock held, so merges are serialized.
+    on_done(task, "merged" | "blocked") is called once per offered task;
+    on_event(record) receives rebase/requeue records for the run logs.
+    Exceptions from either callback are counted in stats and swallowed so
+    they cannot stop the worker thread.
+    """
+
+    def __init__(
+        self,
+        merge: Callable[[Dict[str, Any], Dict[str, Any]], None],
+        rebase: Callable[[Dict[str, Any], Dict[str, Any]], bool],
+        max_retries: int = 2,
+        on_done: Optional[Callable[[Dict[str, Any], str], None]] = None,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> None:
+        self.merge = merge
+        self.rebase = rebase
+        self.max_retries = max_retries
+        self.on_done = on_done
+        self.on_event = on_event
+        self.stats: Dict[str, int] = {"merged": 0, "rebased": 0, "requeued": 0, "blocked": 0, "callback_errors": 0}
+        self._merged: List[Set[str]] = []  # changed paths per merge generation
+        self._bases: Dict[str, int] = {}
+        self._items: List[MergeItem] = []
+        self._busy = False
+        self._closed = False
+        self._flush = False
+        self._finished = 0
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="merge-queue", daemon=True)
+        self._thread.start()
+
+    @property
+    def generation(self) -> int:
+        return len(self._merged)
+
+    def begin(self, task_id: str) -> None:
+        with self._cond:
+            self._bases[task_id] = self.generation
+
+    def offer(self, task: Dict[str, Any], res: Dict[str, Any]) -> bool:
+        """
+        Merge now if optimistic execution held; otherwise queue a rebase. True
+        if merged; a merge that raises is reported as "blocked", like one from
+        the background worker.
+        """
+        with self._cond:
+            base = self._bases.pop(task["id"], 0)
+            if not self._overlaps(res, base):
+                return self._try_merge(MergeItem(task, res))
+            self._items.append(MergeItem(task, res))
+            self._cond.notify_all()
+            return False
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._items) + int(self._busy)
+
+    def wait_progress(self) -> bool:
+        """
+        Block until a queued result is merged or blocked. Call it when nothing
+        else can change the tree; results that could only be retried after
+        another merge are then blocked. False if the queue is empty.
+        """
+        with self._cond:
+            if not self._items and not self._busy:
+                return False
+            finished = self._finished
+            self._flush = True
+            self._cond.notify_all()
+            while self._finished == finished:
+                self._cond.wait()
+            self._flush = False
+            return True
+
+    def close(self) -> None:
+        """Drain the queue and stop the worker."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _overlaps(self, res: Dict[str, Any], since: int) -> bool:
+        changed = changed_set(res.get("changes") or {})
+        return any(not changed.isdisjoint(paths) for paths in self._merged[since:])
+
+    def _merge(self, task: Dict[str, Any], res: Dict[str, Any]) -> None:
+        self.merge(task, res)
+        self._merged.append(changed_set(res.get("changes") or {}))
+        self.stats["merged"] += 1
+        self._done(task, "merged")
+
+    def _try_merge(self, item: MergeItem) -> bool:
+        try:
+            self._merge(item.task, item.res)
+        except Exception as e:
+            self._event(item, "merge_blocked_overlap", note=f"Merge failed: {e}")
+            self._done(item.task, "blocked")
+            return False
+        return True
+
+    def _done(self, task: Dict[str, Any], status: str) -> None:
+        if status == "blocked":
+            self.stats["blocked"] += 1
+        self._finished += 1
+        try:
+            if self.on_done is not None:
+                self.on_done(task, status)
+        except Exception:
+            self.stats["callback_errors"] += 1
+        finally:
+            self._cond.notify_all()
+
+    def _event(self, item: MergeItem, event: str, **extra: Any) -> None:
+        if self.on_event is None:
+            return
+        try:
+            self.on_event({"task": item.task["id"], "event": event, "attempt": item.attempts, **extra})
+        except Exception:
+            self.stats["callback_errors"] += 1
+
+    def _next(self) -> Optional[MergeItem]:
+        # Called with the lock held. Waits for an item worth rebasing; None on shutdown.
+        while True:
+            for item in self._items:
+                if item.tried_at < self.generation:
+                    self._items.remove(item)
+                    return item
+            if self._items and (self._flush or self._closed):
+                for item in self._items:
+                    self._event(item, "merge_blocked_overlap", note="No newer tree to rebase onto")
+                    self._done(item.task, "blocked")
+                self._items.clear()
+                continue
+            if self._closed and not self._items:
+                return None
+            self._cond.wait()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                item = self._next()
+                if item is None:
+                    return
+                self._busy = True
+                start = self.generation
+
+            error = ""
+            try:
+                ok = self.rebase(item.task, item.res)
+            except Exception as e:  # rebase failures (patch, copy, gates) all mean "retry later"
+                ok, error = False, str(e)
+
+            with self._cond:
+                self._busy = False
+                item.attempts += 1
+                item.tried_at = start
+                self.stats["rebased"] += 1
+                self._event(item, "rebase_attempt", result="ok" if ok else "fail", **({"error": error} if error else {}))
+                if ok and not self._overlaps(item.res, start):
+                    self._try_merge(item)
+                elif item.attempts >= self.max_retries:
+                    self._event(item, "merge_blocked_overlap", note="Rebase retries exhausted")
+                    self._done(item.task, "blocked")
+                else:
+                    self.stats["requeued"] += 1
+                    self._event(item, "merge_requeued")
+                    self._items.append(item)
+                self._cond.notify_all()
@@ -2,8 +2,10 @@ from __future__ import annotations
 
 import shutil
 import subprocess
-import tempfile
 from pathlib import Path
+from typing import Optional, Union
+
+from agent_factory.orchestrator.sandbox import SandboxBackend, get_backend, make_snapshot_dir
 
 
 class PatchError(Exception):
@@ -30,16 +32,27 @@ def apply_patch(repo_root: Path, diff_text: str) -> None:
         raise PatchError(result.stderr or result.stdout)
 
 
-def snapshot(repo_root: Path) -> Path:
+def snapshot(
+    repo_root: Path, backend: Union[str, SandboxBackend, None] = None, base: Optional[Path] = None
+) -> Path:
     """
-    Create a full snapshot copy for rollback.
+    Create a full snapshot of repo_root for rollback, using the sandbox backend
+    (hardlinks/reflinks avoid duplicating file contents). base is the parent
+    dir for the snapshot and must lie outside repo_root. Callers remove the
+    snapshot with discard() once it is no longer needed.
     """
-    tmp = Path(tempfile.mkdtemp(prefix="agent-factory-snap-"))
-    shutil.copytree(repo_root, tmp / "repo", dirs_exist_ok=True)
+    impl = get_backend(backend).snapshot_backend()
+    tmp = make_snapshot_dir(repo_root, impl, base)
+    impl.materialize(repo_root, tmp / "repo", ignore=())
     return tmp
 
 
-def rollback(snapshot_dir: Path, repo_root: Path) -> None:
+def rollback(snapshot_dir: Path, repo_root: Path, backend: Union[str, SandboxBackend, None] = None) -> None:
+    impl = get_backend(backend).snapshot_backend()
     if repo_root.exists():
         shutil.rmtree(repo_root)
-    shutil.copytree(snapshot_dir / "repo", repo_root, dirs_exist_ok=True)
+    impl.materialize(snapshot_dir / "repo", repo_root, ignore=())
+
+
+def discard(snapshot_dir: Path, backend: Union[str, SandboxBackend, None] = None) -> None:
+    get_backend(backend).snapshot_backend().remove(snapshot_dir)
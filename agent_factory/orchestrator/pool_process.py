@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, as_completed, wait
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Set
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 
 @dataclass
@@ -16,25 +16,68 @@ def _changed_set(res: Dict[str, Any]) -> Set[str]:
     return set(ch.get("created", [])) | set(ch.get("deleted", [])) | set(ch.get("modified", []))
 
 
+def _path_parts(hint: str) -> Tuple[str, ...]:
+    return tuple(p for p in hint.replace("\\", "/").split("/") if p and p != ".")
+
+
+class PathTrie:
+    """
+    Set of repo paths where a path conflicts with every path it is a prefix
+    of, and with every prefix of itself: "tests/" overlaps "tests/unit/x.py".
+    Hints are split on "/", so "docs" and "docs/" are the same entry and "."
+    covers the whole tree.
+    """
+
+    _END = ""  # child key marking a stored path; real segments are never empty
+
+    def __init__(self) -> None:
+        self.root: Dict[str, Any] = {}
+
+    def add(self, hint: str) -> None:
+        node = self.root
+        for part in _path_parts(hint):
+            node = node.setdefault(part, {})
+        node[self._END] = {}
+
+    def overlaps(self, hint: str) -> bool:
+        node = self.root
+        for part in _path_parts(hint):
+            if self._END in node:
+                return True
+            nxt = node.get(part)
+            if nxt is None:
+                return False
+            node = nxt
+        return bool(node)
+
+
 def schedule_batches(tasks: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
     """
-    Greedy batching: tasks in same batch must have disjoint 'touch_hints' sets if present.
-    If no hints, they can run together.
+    Greedy conflict batching, O(n * depth) per batch tried.
+
+    - Tasks in the same batch must not touch overlapping paths: each batch keeps
+      a PathTrie of its 'touch_hints', so prefixes count as conflicts.
+    - A task is placed after every batch holding one of its 'depends_on' tasks
+      seen earlier in `tasks`; pass them topologically sorted (dag.topo_sort).
+    - Tasks without hints only wait for their dependencies.
     """
     batches: List[List[Dict[str, Any]]] = []
+    occupied: List[PathTrie] = []
+    batch_of: Dict[str, int] = {}
     for t in tasks:
-        hint = set(t.get("touch_hints") or [])
-        placed = False
-        for b in batches:
-            used = set()
-            for x in b:
-                used |= set(x.get("touch_hints") or [])
-            if used.isdisjoint(hint):
-                b.append(t)
-                placed = True
-                break
-        if not placed:
-            batches.append([t])
+        hints = list(t.get("touch_hints") or [])
+        first = 1 + max((batch_of[d] for d in t.get("depends_on") or [] if d in batch_of), default=-1)
+        idx = first
+        while idx < len(batches) and any(occupied[idx].overlaps(h) for h in hints):
+            idx += 1
+        if idx == len(batches):
+            batches.append([])
+            occupied.append(PathTrie())
+        batches[idx].append(t)
+        for h in hints:
+            occupied[idx].add(h)
+        if "id" in t:
+            batch_of[t["id"]] = idx
     return batches
 
 
@@ -54,3 +97,77 @@ def run_process_pool(
                 res = {"task": task["id"], "status": "failed", "error": str(e)}
             results.append(PoolResult(task_id=task["id"], result=res))
     return results
+
+
+def run_batches(
+    batches: List[List[Dict[str, Any]]],
+    worker_fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+    make_args: Callable[[Dict[str, Any]], Dict[str, Any]],
+    max_workers: int = 2,
+    admit: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    on_submit: Optional[Callable[[Dict[str, Any]], None]] = None,
+    on_result: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+    initializer: Optional[Callable[..., None]] = None,
+    initargs: Tuple[Any, ...] = (),
+    on_idle: Optional[Callable[[], bool]] = None,
+) -> List[PoolResult]:
+    """
+    Runs conflict-free batches on a single process pool, one batch at a time.
+
+    - admit(task) gates submission (capacity, budgets, dependencies); tasks that
+      cannot be admitted while nothing is in flight carry over. They were only
+      checked against their own batch, so they are partitioned again
+      (schedule_batches) together with the batches still to run. A batch in
+      which nothing could be submitted moves to the back of the queue; the run
+      stops once every remaining batch has stalled in a row.
+    - on_submit / on_result run in the calling process, so fan-in work such as
+      merging is serialized in completion order.
+    - initializer(*initargs) runs once per worker process; use it to load
+      long-lived state so make_args can return lightweight messages.
+    - on_idle() is called when tasks are pending but none is admitted and none
+      is in flight (e.g. dependencies still in a merge queue); returning True
+      retries admission, False carries the tasks over.
+    Tasks still not admitted at the end are left untouched.
+    """
+    results: List[PoolResult] = []
+    queue = [list(batch) for batch in batches]
+    stalled = 0
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=initializer, initargs=initargs) as ex:
+        while queue and stalled < len(queue):
+            pending = queue.pop(0)
+            submitted = False
+            inflight: Dict[Future, Dict[str, Any]] = {}
+            while pending or inflight:
+                for task in list(pending):
+                    if len(inflight) >= max_workers:
+                        break
+                    if admit is not None and not admit(task):
+                        continue
+                    pending.remove(task)
+                    submitted = True
+                    if on_submit is not None:
+                        on_submit(task)
+                    inflight[ex.submit(worker_fn, make_args(task))] = task
+                if not inflight:
+                    if pending and on_idle is not None and on_idle():
+                        continue
+                    break
+                done, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    task = inflight.pop(fut)
+                    try:
+                        res = fut.result()
+                    except Exception as e:
+                        res = {"task": task["id"], "status": "failed", "error": str(e)}
+                    if on_result is not None:
+                        on_result(task, res)
+                    results.append(PoolResult(task_id=task["id"], result=res))
+            if not pending:
+                stalled = 0
+            elif submitted:
+                queue = schedule_batches(pending + [t for batch in queue for t in batch])
+                stalled = 0
+            else:
+                queue.append(pending)
+                stalled += 1
+    return results
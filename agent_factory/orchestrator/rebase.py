@@ -1,35 +1,65 @@
 from __future__ import annotations
 
-import shutil
 import subprocess
+from contextlib import nullcontext
 from pathlib import Path
+from typing import ContextManager, Dict, List, Optional, Union
 
+from agent_factory.orchestrator.impact import ImpactMap, run_impacted_tests
 from agent_factory.orchestrator.patching import apply_patch
+from agent_factory.orchestrator.sandbox import SandboxBackend, get_backend
 
 
-def recreate_sandbox_from_repo(repo_root: Path, sandbox_path: Path) -> None:
+def recreate_sandbox_from_repo(
+    repo_root: Path, sandbox_path: Path, backend: Union[str, SandboxBackend, None] = None
+) -> None:
     """
-    Replace sandbox content with a fresh copy of repo_root (current state).
+    Replace sandbox content with a fresh view of repo_root (current state).
     Keeps sandbox folder path stable.
     """
-    if sandbox_path.exists():
-        shutil.rmtree(sandbox_path)
-    shutil.copytree(
-        repo_root,
-        sandbox_path,
-        ignore=shutil.ignore_patterns(".git", ".venv", "__pycache__", "runs"),
-    )
+    impl = get_backend(backend)
+    impl.remove(sandbox_path)
+    impl.materialize(repo_root, sandbox_path)
 
 
-def rerun_gates_in_sandbox(sandbox: Path) -> bool:
-    r = subprocess.run(["pytest", "-q"], cwd=str(sandbox))
-    return r.returncode == 0
+def rerun_gates_in_sandbox(
+    sandbox: Path,
+    changes: Optional[Dict[str, List[str]]] = None,
+    impact: Optional[ImpactMap] = None,
+) -> bool:
+    """
+    Rerun the test gates after a rebase. With the task's change set and an
+    impact map only the affected tests run; otherwise the full suite.
+    """
+    if changes is None or impact is None:
+        r = subprocess.run(["pytest", "-q"], cwd=str(sandbox))
+        return r.returncode == 0
+    return run_impacted_tests(sandbox, changes, impact)["ok"]
+
 
+def rebase_and_reapply(
+    repo_root: Path,
+    sandbox: Path,
+    tests_diff: str,
+    code_diff: str,
+    backend: Union[str, SandboxBackend, None] = None,
+    changes: Optional[Dict[str, List[str]]] = None,
+    impact: Optional[ImpactMap] = None,
+    lock: Optional[ContextManager] = None,
+) -> bool:
+    """
+    Rebuild the sandbox from the current repo_root, reapply the task's
+    patches and rerun the gates. Pass the merge lock as `lock` so the copy
+    never sees a half-merged tree; it is released before the gates run.
+    """
+    # The patch files usually live inside the sandbox, so read them before it is recreated.
+    tests_patch = Path(tests_diff).read_text(encoding="utf-8")
+    code_patch = Path(code_diff).read_text(encoding="utf-8")
 
-def rebase_and_reapply(repo_root: Path, sandbox: Path, tests_diff: str, code_diff: str) -> bool:
-    recreate_sandbox_from_repo(repo_root, sandbox)
+    with lock if lock is not None else nullcontext():
+        recreate_sandbox_from_repo(repo_root, sandbox, backend)
 
-    apply_patch(sandbox, Path(tests_diff).read_text(encoding="utf-8"))
-    apply_patch(sandbox, Path(code_diff).read_text(encoding="utf-8"))
+    apply_patch(sandbox, tests_patch)
+    apply_patch(sandbox, code_patch)
 
-    return rerun_gates_in_sandbox(sandbox)
+    return rerun_gates_in_sandbox(sandbox, changes, impact)
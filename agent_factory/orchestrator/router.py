@@ -1,31 +1,123 @@
 from __future__ import annotations
 
-from typing import Callable, Iterable, List
+import heapq
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Literal, Optional, Set
 
 from agent_factory.orchestrator.task_graph import Task
 
+ErrorPolicy = Literal["fail_fast", "continue"]
+
 
 class TaskRouter:
-    """Executes tasks sequentially, respecting dependency ordering."""
+    """
+    Executes tasks respecting dependency ordering.
+
+    Uses in-degree counters and a ready queue (ordered by declaration) instead of
+    rescanning pending tasks. With max_workers > 1 independent stages run
+    concurrently in a thread pool, so wall-clock time follows the critical path.
+
+    on_error:
+      - "fail_fast": stop dispatching after the first failure, wait for in-flight
+        tasks, then re-raise the original exception.
+      - "continue": keep running independent tasks, skip dependents of failed
+        tasks, and raise a RuntimeError summarizing failures at the end.
+    """
 
-    def __init__(self, tasks: Iterable[Task]):
+    def __init__(self, tasks: Iterable[Task], max_workers: int = 1, on_error: ErrorPolicy = "fail_fast"):
+        if on_error not in ("fail_fast", "continue"):
+            raise ValueError(f"Unknown on_error policy: {on_error}")
         self.tasks: List[Task] = list(tasks)
+        self.max_workers = max(1, int(max_workers))
+        self.on_error = on_error
 
     def run(self, runner: Callable[[Task], None]) -> None:
-        completed = set()
-        pending = {task.id for task in self.tasks}
         task_map = {task.id: task for task in self.tasks}
+        order = {task.id: i for i, task in enumerate(self.tasks)}
+        indegree: Dict[str, int] = {}
+        dependents: Dict[str, List[str]] = {task.id: [] for task in self.tasks}
+        unsatisfied: Set[str] = set()
+
+        for task in self.tasks:
+            deps = set(task.depends_on)
+            indegree[task.id] = len(deps)
+            for dep in deps:
+                if dep in dependents:
+                    dependents[dep].append(task.id)
+                else:
+                    unsatisfied.add(task.id)
+
+        ready: List[tuple[int, str]] = [(order[tid], tid) for tid, n in indegree.items() if n == 0]
+        heapq.heapify(ready)
+
+        completed: Set[str] = set()
+        failed: Dict[str, BaseException] = {}
+        skipped: Set[str] = set()
+        first_error: Optional[BaseException] = None
+
+        def release(task_id: str) -> None:
+            for child in dependents[task_id]:
+                indegree[child] -= 1
+                if indegree[child] == 0 and child not in unsatisfied:
+                    heapq.heappush(ready, (order[child], child))
+
+        def skip_dependents(task_id: str) -> None:
+            stack = list(dependents[task_id])
+            while stack:
+                child = stack.pop()
+                if child in skipped:
+                    continue
+                skipped.add(child)
+                stack.extend(dependents[child])
+
+        def finish(task_id: str, error: Optional[BaseException]) -> None:
+            nonlocal first_error
+            task = task_map[task_id]
+            if error is None:
+                task.status = "completed"
+                completed.add(task_id)
+                release(task_id)
+                return
+            task.status = "failed"
+            failed[task_id] = error
+            if first_error is None:
+                first_error = error
+            skip_dependents(task_id)
+
+        def stopping() -> bool:
+            return first_error is not None and self.on_error == "fail_fast"
+
+        if self.max_workers == 1:
+            while ready and not stopping():
+                _, task_id = heapq.heappop(ready)
+                task_map[task_id].status = "in_progress"
+                try:
+                    runner(task_map[task_id])
+                except Exception as e:
+                    finish(task_id, e)
+                else:
+                    finish(task_id, None)
+        else:
+            inflight: Dict[Future, str] = {}
+            with ThreadPoolExecutor(max_workers=self.max_workers) as ex:
+                while ready or inflight:
+                    while ready and len(inflight) < self.max_workers and not stopping():
+                        _, task_id = heapq.heappop(ready)
+                        task_map[task_id].status = "in_progress"
+                        inflight[ex.submit(runner, task_map[task_id])] = task_id
+                    if not inflight:
+                        break
+                    done, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        finish(inflight.pop(fut), fut.exception())
+
+        if first_error is not None and self.on_error == "fail_fast":
+            raise first_error
 
-        while pending:
-            progress_made = False
-            for task_id in list(pending):
-                task = task_map[task_id]
-                if all(dep in completed for dep in task.depends_on):
-                    runner(task)
-                    completed.add(task_id)
-                    pending.remove(task_id)
-                    progress_made = True
-            if not progress_made:
-                raise RuntimeError(
-                    f"Circular or unsatisfied dependencies detected: {sorted(pending)}"
-                )
+        pending = sorted(set(task_map) - completed - set(failed) - skipped)
+        if pending:
+            raise RuntimeError(f"Circular or unsatisfied dependencies detected: {pending}")
+        if failed:
+            raise RuntimeError(
+                f"Tasks failed: {sorted(failed)}; skipped dependents: {sorted(skipped)}"
+            )
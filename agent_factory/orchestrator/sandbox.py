@@ -1,32 +1,231 @@
 from __future__ import annotations
 
+import os
 import shutil
+import subprocess
 import tempfile
 from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Type, Union
 
+SANDBOX_IGNORE = (".git", ".venv", "__pycache__", "runs")
 
-def create_sandbox(repo_root: Path, project: str, task_id: str) -> Path:
+# Linux FICLONE ioctl (_IOW(0x94, 9, int)): share extents on btrfs/xfs/overlayfs-with-reflink.
+_FICLONE = 0x40049409
+
+
+class SandboxBackend:
+    """
+    Materializes a working copy of a tree. The base backend is a plain deep copy;
+    subclasses override how individual files (or the whole tree) are produced.
+    """
+
+    name = "copy"
+
+    def materialize(self, src: Path, dst: Path, ignore: Sequence[str] = SANDBOX_IGNORE) -> None:
+        shutil.copytree(
+            src,
+            dst,
+            dirs_exist_ok=True,
+            ignore=shutil.ignore_patterns(*ignore) if ignore else None,
+            copy_function=self.copy_file,
+        )
+
+    def remove(self, path: Path) -> None:
+        if path.exists():
+            shutil.rmtree(path)
+
+    def copy_file(self, src: str, dst: str) -> None:
+        shutil.copy2(src, dst)
+
+    def snapshot_backend(self) -> "SandboxBackend":
+        """Backend used by patching.snapshot/rollback for trees made by this backend."""
+        return self
+
+
+class HardlinkBackend(SandboxBackend):
+    """
+    Hardlink farm: files share inodes with the source. Safe as long as writers
+    replace files (patch(1) writes a temp file and renames) instead of editing
+    them in place. Falls back to copying across filesystems.
+    """
+
+    name = "hardlink"
+
+    def copy_file(self, src: str, dst: str) -> None:
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+
+class ReflinkBackend(SandboxBackend):
+    """Copy-on-write clones (cp --reflink); falls back to a regular copy when unsupported."""
+
+    name = "reflink"
+
+    def copy_file(self, src: str, dst: str) -> None:
+        try:
+            import fcntl
+
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+            shutil.copystat(src, dst)
+        except (ImportError, OSError):
+            shutil.copy2(src, dst)
+
+
+class GitWorktreeBackend(SandboxBackend):
+    """
+    `git worktree add --detach` at HEAD, then overlays uncommitted changes from the
+    source working tree so the sandbox matches what a copy would produce:
+    modified and untracked files, including gitignored ones (e.g. knowledge/),
+    minus the `ignore` dirs. Falls back to a plain copy when the source is not
+    a git checkout.
+    """
+
+    name = "worktree"
+
+    def materialize(self, src: Path, dst: Path, ignore: Sequence[str] = SANDBOX_IGNORE) -> None:
+        if _git(src, "rev-parse", "--is-inside-work-tree") is None:
+            super().materialize(src, dst, ignore)
+            return
+        self.remove(dst)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        if _git(src, "worktree", "add", "--detach", "--force", str(dst), "HEAD") is None:
+            super().materialize(src, dst, ignore)
+            return
+
+        ignored = set(ignore)
+        # No --exclude-standard: the copy backend takes gitignored files too.
+        changed = _git(src, "ls-files", "-z", "--modified", "--others") or ""
+        for rel in filter(None, changed.split("\0")):
+            if ignored.intersection(Path(rel).parts):
+                continue
+            s = src / rel
+            if not s.is_file():
+                continue
+            d = dst / rel
+            d.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(s, d)
+        deleted = _git(src, "ls-files", "-z", "--deleted") or ""
+        for rel in filter(None, deleted.split("\0")):
+            (dst / rel).unlink(missing_ok=True)
+
+    def remove(self, path: Path) -> None:
+        if not path.exists():
+            return
+        common = _git(path, "rev-parse", "--path-format=absolute", "--git-common-dir")
+        shutil.rmtree(path)
+        if common:
+            _git(Path(common.strip()), "worktree", "prune")
+
+    def snapshot_backend(self) -> SandboxBackend:
+        return ReflinkBackend()
+
+
+def _git(cwd: Path, *args: str) -> Optional[str]:
+    try:
+        r = subprocess.run(["git", *args], cwd=str(cwd), capture_output=True, text=True)
+    except OSError:
+        return None
+    return r.stdout if r.returncode == 0 else None
+
+
+BACKENDS: Dict[str, Type[SandboxBackend]] = {
+    "copy": SandboxBackend,
+    "hardlink": HardlinkBackend,
+    "reflink": ReflinkBackend,
+    "worktree": GitWorktreeBackend,
+}
+
+
+def get_backend(backend: Union[str, SandboxBackend, None] = None) -> SandboxBackend:
+    if isinstance(backend, SandboxBackend):
+        return backend
+    name = backend or "copy"
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown sandbox backend: {name} (expected one of {sorted(BACKENDS)})")
+    return BACKENDS[name]()
+
+
+def create_sandbox(
+    repo_root: Path,
+    project: str,
+    task_id: str,
+    backend: Union[str, SandboxBackend, None] = None,
+) -> Path:
     base = repo_root / "runs" / project / "sandboxes"
     base.mkdir(parents=True, exist_ok=True)
 
+    impl = get_backend(backend)
     sandbox = base / task_id
-    if sandbox.exists():
-        shutil.rmtree(sandbox)
-
-    shutil.copytree(
-        repo_root,
-        sandbox,
-        dirs_exist_ok=True,
-        ignore=shutil.ignore_patterns(".git", ".venv", "__pycache__", "runs"),
-    )
+    impl.remove(sandbox)
+    impl.materialize(repo_root, sandbox)
     return sandbox
 
 
-def merge_sandbox(repo_root: Path, sandbox: Path) -> None:
-    for src in sandbox.rglob("*"):
-        if src.is_dir():
-            continue
-        rel = src.relative_to(sandbox)
-        dst = repo_root / rel
-        dst.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(src, dst)
+def make_snapshot_dir(near: Path, backend: SandboxBackend, base: Optional[Path] = None) -> Path:
+    """
+    Temp dir for snapshots; kept on the same filesystem when links/clones are
+    used. With base (e.g. runs/<project>/snapshots) it is created there.
+    """
+    if base is not None:
+        base.mkdir(parents=True, exist_ok=True)
+        return Path(tempfile.mkdtemp(prefix="snap-", dir=str(base)))
+    if type(backend) is SandboxBackend:
+        return Path(tempfile.mkdtemp(prefix="agent-factory-snap-"))
+    return Path(tempfile.mkdtemp(prefix=".agent-factory-snap-", dir=str(near.parent)))
+
+
+def merge_sandbox(repo_root: Path, sandbox: Path, changes: Optional[Dict[str, List[str]]] = None) -> Dict[str, int]:
+    """
+    Fan-in a sandbox into repo_root.
+
+    With a change manifest (diff_hashes output) only created/modified files are
+    copied and deleted files removed. Every file is staged to a temp file next to
+    its destination first, then all renames and deletions happen together, so a
+    failed copy leaves repo_root untouched. Without a manifest the whole sandbox
+    is copied back (legacy behaviour). Returns counts and bytes moved.
+    """
+    if changes is None:
+        copy = [
+            src.relative_to(sandbox)
+            for src in sandbox.rglob("*")
+            if not src.is_dir() and ".git" not in src.relative_to(sandbox).parts
+        ]
+        delete: List[Path] = []
+    else:
+        copy = [Path(rel) for rel in list(changes.get("created", [])) + list(changes.get("modified", []))]
+        delete = [Path(rel) for rel in changes.get("deleted", [])]
+    for rel in copy + delete:
+        if rel.is_absolute() or ".." in rel.parts:
+            raise ValueError(f"Refusing to merge path outside repo: {rel}")
+
+    staged: List[Tuple[Path, Path]] = []
+    moved = 0
+    try:
+        for rel in copy:
+            src = sandbox / rel
+            dst = repo_root / rel
+            if dst.exists() and os.path.samefile(src, dst):
+                continue
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            tmp = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+            shutil.copy2(src, tmp)
+            staged.append((tmp, dst))
+            moved += tmp.stat().st_size
+    except BaseException:
+        for tmp, _ in staged:
+            tmp.unlink(missing_ok=True)
+        raise
+
+    for tmp, dst in staged:
+        os.replace(tmp, dst)
+    deleted = 0
+    for rel in delete:
+        target = repo_root / rel
+        if target.exists():
+            target.unlink()
+            deleted += 1
+    return {"copied": len(staged), "deleted": deleted, "bytes": moved}
+
@@ -1,22 +1,117 @@
 from __future__ import annotations
 
 import json
+import time
+import weakref
 from dataclasses import asdict
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, List
+import os
 import platform
 import sys
+import threading
 
 from agent_factory.orchestrator.task_graph import Task
 
+_LIVE_STORES: "weakref.WeakSet[StateStore]" = weakref.WeakSet()
+
+
+def _flush_live_stores() -> None:
+    for store in list(_LIVE_STORES):
+        store.flush()
+
+
+def _open_log(path: Path) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+
+
+def _write_all(fd: int, data: bytes, fsync: bool) -> None:
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+    if fsync:
+        os.fsync(fd)
+
+
+def _release_logs(fds: Dict[Path, int], buffers: Dict[Path, List[bytes]], fsync: bool) -> None:
+    """Finalizer for a store that was never closed: write out pending lines and close its fds."""
+    for path, buf in list(buffers.items()):
+        if buf:
+            fd = fds.get(path)
+            if fd is None:
+                fd = fds[path] = _open_log(path)
+            _write_all(fd, b"".join(buf), fsync)
+    buffers.clear()
+    for fd in fds.values():
+        os.close(fd)
+    fds.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    # Buffered lines must not be duplicated into forked pool workers.
+    os.register_at_fork(before=_flush_live_stores)
+
 
 class StateStore:
-    """Manage state and artifacts for a run."""
+    """
+    Manage state and artifacts for a run.
+
+    JSONL logs are append-only: each file is opened once with O_APPEND and every
+    record is emitted with a single write(), so concurrent pool workers never
+    lose lines. Optional buffering:
+      - log_buffer_bytes: flush a file once this many bytes are pending (0 = unbuffered)
+      - log_flush_interval_s: flush a file once its oldest pending line is this
+        old (a timer fires even if no further line arrives)
+      - log_fsync: fsync after every flush
+
+    Use the store as a context manager or call close(); a store that is
+    garbage collected, or still open at interpreter exit, is flushed and
+    closed by a finalizer. Cached fds follow the inode, not the name: a log
+    that is rotated or deleted mid-run keeps receiving writes to the old
+    (possibly unlinked) file until the store is closed.
+    """
 
-    def __init__(self, base_path: Path) -> None:
+    def __init__(
+        self,
+        base_path: Path,
+        *,
+        log_buffer_bytes: int = 0,
+        log_flush_interval_s: float = 0.0,
+        log_fsync: bool = False,
+    ) -> None:
         self.base_path = base_path
         self.base_path.mkdir(parents=True, exist_ok=True)
+        self._state_lock = threading.RLock()
+        self.log_buffer_bytes = int(log_buffer_bytes)
+        self.log_flush_interval_s = float(log_flush_interval_s)
+        self.log_fsync = bool(log_fsync)
+        self._log_lock = threading.Lock()
+        self._log_fds: Dict[Path, int] = {}
+        self._log_buffers: Dict[Path, List[bytes]] = {}
+        self._log_pending: Dict[Path, int] = {}
+        self._log_first_ts: Dict[Path, float] = {}
+        # Holds the dicts, not self; they are only ever mutated in place.
+        weakref.finalize(self, _release_logs, self._log_fds, self._log_buffers, self.log_fsync)
+        _LIVE_STORES.add(self)
+
+    def __enter__(self) -> "StateStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    @classmethod
+    def from_config(cls, base_path: Path, config: Dict[str, Any]) -> "StateStore":
+        jsonl_cfg = ((config.get("logging") or {}).get("jsonl") or {})
+        return cls(
+            base_path,
+            log_buffer_bytes=int(jsonl_cfg.get("buffer_bytes", 0)),
+            log_flush_interval_s=float(jsonl_cfg.get("flush_interval_s", 0.0)),
+            log_fsync=bool(jsonl_cfg.get("fsync", False)),
+        )
 
     def init_run(self, project_name: str, prompt: str, stack: str, config: Dict[str, Any]) -> Path:
         run_dir = self.base_path / project_name
@@ -55,17 +150,19 @@ class StateStore:
             "kind": kind,
             "message": message,
         }
-        log_path = run_dir / "logs" / "events.jsonl"
-        log_path.write_text(
-            (log_path.read_text(encoding="utf-8") if log_path.exists() else "")
-            + json.dumps(log_entry)
-            + "\n",
-            encoding="utf-8",
-        )
+        self._append_line(run_dir / "logs" / "events.jsonl", json.dumps(log_entry))
 
     def save_state(self, run_dir: Path, state: Dict[str, Any]) -> None:
         self._write_json(run_dir / "state.json", state)
 
+    def update_state(self, run_dir: Path, **fields: Any) -> Dict[str, Any]:
+        """Read-modify-write state.json atomically w.r.t. other router stages."""
+        with self._state_lock:
+            state = self.read_state(run_dir)
+            state.update(fields)
+            self.save_state(run_dir, state)
+            return state
+
     def read_state(self, run_dir: Path) -> Dict[str, Any]:
         state_path = run_dir / "state.json"
         if state_path.exists():
@@ -95,13 +192,7 @@ class StateStore:
         return path
 
     def append_fixer_log(self, run_dir: Path, payload: Dict[str, Any]) -> None:
-        fixer_log = run_dir / "logs" / "fixer.jsonl"
-        fixer_log.write_text(
-            (fixer_log.read_text(encoding="utf-8") if fixer_log.exists() else "")
-            + json.dumps(payload)
-            + "\n",
-            encoding="utf-8",
-        )
+        self._append_line(run_dir / "logs" / "fixer.jsonl", json.dumps(payload))
 
     def create_incident(self, run_dir: Path, title: str, body: str) -> Path:
         incidents = list((run_dir / "incidents").glob("INC-*.md"))
@@ -118,7 +209,10 @@ class StateStore:
         return path
 
     def _write_json(self, path: Path, payload: Dict[str, Any]) -> None:
-        path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        # Write-then-rename so pool workers never observe a half-written file.
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        os.replace(tmp, path)
 
     def _write_env_snapshot(self, run_dir: Path, stack: str, config: Dict[str, Any]) -> None:
         snapshot = {
@@ -131,10 +225,65 @@ class StateStore:
         self._write_json(run_dir / "env_snapshot.json", snapshot)
 
     def append_jsonl(self, run_dir: Path, rel_path: str, payload: Dict[str, Any]) -> None:
-        target = run_dir / rel_path
-        target.parent.mkdir(parents=True, exist_ok=True)
-        existing = target.read_text(encoding="utf-8") if target.exists() else ""
-        target.write_text(existing + json.dumps(payload) + "\n", encoding="utf-8")
+        self._append_line(run_dir / rel_path, json.dumps(payload))
+
+    def flush(self) -> None:
+        """Write out all buffered log lines."""
+        with self._log_lock:
+            for path in list(self._log_buffers):
+                self._flush_path(path)
+
+    def close(self) -> None:
+        """Flush buffered log lines and release cached file handles."""
+        with self._log_lock:
+            for path in list(self._log_buffers):
+                self._flush_path(path)
+            for fd in self._log_fds.values():
+                os.close(fd)
+            self._log_fds.clear()
+
+    def _append_line(self, path: Path, line: str) -> None:
+        data = (line + "\n").encode("utf-8")
+        with self._log_lock:
+            if self.log_buffer_bytes <= 0 and self.log_flush_interval_s <= 0:
+                self._write_fd(path, data)
+                return
+            buf = self._log_buffers.setdefault(path, [])
+            if not buf:
+                self._log_first_ts[path] = time.monotonic()
+                if self.log_flush_interval_s > 0:
+                    timer = threading.Timer(self.log_flush_interval_s, self._flush_due, args=(path,))
+                    timer.daemon = True
+                    timer.start()
+            buf.append(data)
+            self._log_pending[path] = self._log_pending.get(path, 0) + len(data)
+            too_big = self.log_buffer_bytes > 0 and self._log_pending[path] >= self.log_buffer_bytes
+            too_old = (
+                self.log_flush_interval_s > 0
+                and time.monotonic() - self._log_first_ts[path] >= self.log_flush_interval_s
+            )
+            if too_big or too_old:
+                self._flush_path(path)
+
+    def _flush_due(self, path: Path) -> None:
+        # Timer callback: flush a buffer whose oldest line has waited long enough.
+        with self._log_lock:
+            first = self._log_first_ts.get(path)
+            if first is not None and time.monotonic() - first >= self.log_flush_interval_s:
+                self._flush_path(path)
+
+    def _flush_path(self, path: Path) -> None:
+        buf = self._log_buffers.pop(path, None)
+        self._log_pending.pop(path, None)
+        self._log_first_ts.pop(path, None)
+        if buf:
+            self._write_fd(path, b"".join(buf))
+
+    def _write_fd(self, path: Path, data: bytes) -> None:
+        fd = self._log_fds.get(path)
+        if fd is None:
+            fd = self._log_fds[path] = _open_log(path)
+        _write_all(fd, data, self.log_fsync)
 
     @staticmethod
     def utc_now() -> str:
@@ -122,7 +122,9 @@ def build_default_tasks(project_name: str) -> List[Task]:
             description="Generate quickstart documentation",
             owner="Docs Agent",
             expected_output="README or quickstart updated",
-            depends_on=["qa"],
+            # QA checks the scaffold alongside the fan-out; docs and release
+            # (which tags and publishes) must see the fully merged tree.
+            depends_on=["qa", "implement"],
         ),
         Task(
             id="release",
@@ -1,31 +1,50 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 import json
 
 from agent_factory.agents.implementer import ImplementerAgent
 from agent_factory.orchestrator.state_store import StateStore
 
+# Warm implementer owned by this worker process (set by init_implementer_worker).
+_AGENT: Optional[ImplementerAgent] = None
+
+
+def init_implementer_worker(repo_root: str, runs_dir: str, project: str, stack: str) -> None:
+    """
+    ProcessPool initializer: builds one ImplementerAgent per worker process and
+    warms it (config, adapter, prompts, hash cache, vault index) so tasks only
+    need to carry the task itself.
+    """
+    global _AGENT
+    # Lives as long as the worker process; its finalizer closes the log fds at exit.
+    store = StateStore(base_path=Path(runs_dir))
+    _AGENT = ImplementerAgent(
+        run_dir=Path(runs_dir) / project, stack=stack, state_store=store, repo_root=Path(repo_root)
+    ).warm_up()
+
 
 def implement_task_worker(args: Dict[str, Any]) -> Dict[str, Any]:
     """
     Picklable worker for ProcessPool.
     args:
-      - repo_root
-      - runs_dir
-      - project
-      - stack
       - task
+      - stack (optional; owner stack for this task)
+    With no warm agent in this process (no initializer), args must also carry
+    repo_root, runs_dir and project, and a cold agent is built per task.
     """
+    task = args["task"]
+    if _AGENT is not None and "repo_root" not in args:
+        _AGENT.stack = args.get("stack", _AGENT.stack)
+        return _AGENT.run(task)
+
     repo_root = Path(args["repo_root"])
     runs_dir = Path(args["runs_dir"])
     project = args["project"]
     stack_name = args["stack"]
-    task = args["task"]
 
-    store = StateStore(base_path=runs_dir)
     run_dir = runs_dir / project
-
-    implementer = ImplementerAgent(run_dir=run_dir, stack=stack_name, state_store=store, repo_root=repo_root)
-    return implementer.run(task)
+    with StateStore(base_path=runs_dir) as store:
+        implementer = ImplementerAgent(run_dir=run_dir, stack=stack_name, state_store=store, repo_root=repo_root)
+        return implementer.run(task)
@@ -0,0 +1 @@
+from agent_factory.orchestrator.impact import *  # noqa: F401,F403
@@ -0,0 +1 @@
+from agent_factory.orchestrator.llm.cache import *  # noqa: F401,F403
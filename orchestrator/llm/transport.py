@@ -0,0 +1 @@
+from agent_factory.orchestrator.llm.transport import *  # noqa: F401,F403
@@ -0,0 +1 @@
+from agent_factory.orchestrator.merge_queue import *  # noqa: F401,F403
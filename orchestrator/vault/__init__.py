@@ -1,16 +1,20 @@
 """Lightweight knowledge vault for ingest, indexing, retrieval, and citations."""
 
 from orchestrator.vault.vault import Vault
-from orchestrator.vault.ingest import add_local_file, add_note
-from orchestrator.vault.indexer import rebuild_index
+from orchestrator.vault.ingest import ManifestIndex, add_local_file, add_local_files, add_note
+from orchestrator.vault.indexer import compact_index, rebuild_index, update_index
 from orchestrator.vault.retrieval import retrieve, RetrievedDoc
 from orchestrator.vault.cite import Citation, format_citations
 
 __all__ = [
     "Vault",
     "add_local_file",
+    "add_local_files",
+    "ManifestIndex",
     "add_note",
     "rebuild_index",
+    "update_index",
+    "compact_index",
     "retrieve",
     "RetrievedDoc",
     "Citation",
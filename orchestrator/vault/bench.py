@@ -0,0 +1,302 @@
+"""
+Vault benchmark harness.
+
+Generates a synthetic corpus with a Zipfian vocabulary, then measures ingest
+throughput (single-file and batch), rebuild_index / update_index time and
+memory, and retrieve latency percentiles. Results are JSON so runs can be
+compared across commits:
+
+    python -m orchestrator.vault.bench --docs 10000 --out bench.json
+    python -m orchestrator.vault.bench --docs 10000 --compare bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from orchestrator.vault.cache import retrieval_cache
+from orchestrator.vault.indexer import rebuild_index, update_index
+from orchestrator.vault.ingest import add_local_file, add_local_files
+from orchestrator.vault.retrieval import retrieve
+from orchestrator.vault.vault import Vault
+
+_SYLLABLES = ["ka", "lo", "mi", "ter", "sun", "vo", "rex", "pa", "den", "qui", "zo", "bel", "tra", "ny", "os", "gre"]
+
+
+class ZipfSampler:
+    """Draws words from a vocabulary whose rank-frequency follows 1 / rank**s."""
+
+    def __init__(self, vocab_size: int, s: float = 1.1, seed: int = 0) -> None:
+        rng = random.Random(seed)
+        words = set()
+        while len(words) < vocab_size:
+            words.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))))
+        self.words = sorted(words, key=lambda w: (len(w), w))
+        self.cum_weights = list(itertools.accumulate(1.0 / (rank ** s) for rank in range(1, vocab_size + 1)))
+        self.rng = rng
+
+    def sample(self, k: int) -> List[str]:
+        return self.rng.choices(self.words, cum_weights=self.cum_weights, k=k)
+
+    def tail(self, fraction: float) -> List[str]:
+        """The rarest `fraction` of the vocabulary (what selective queries hit)."""
+        return self.words[int(len(self.words) * (1 - fraction)) :]
+
+
+def generate_corpus(
+    out_dir: Path,
+    n_docs: int,
+    vocab_size: int = 50000,
+    mean_tokens: int = 300,
+    zipf_s: float = 1.1,
+    seed: int = 0,
+) -> Tuple[List[Path], ZipfSampler]:
+    """Write n_docs text files (lengths ~ exponential around mean_tokens) into out_dir/<shard>/."""
+    sampler = ZipfSampler(vocab_size, zipf_s, seed)
+    rng = random.Random(seed + 1)
+    paths: List[Path] = []
+    for i in range(n_docs):
+        shard = out_dir / f"{i // 1000:04d}"
+        if i % 1000 == 0:
+            shard.mkdir(parents=True, exist_ok=True)
+        n_tokens = max(5, int(rng.expovariate(1.0 / mean_tokens)))
+        words = sampler.sample(n_tokens)
+        lines = [" ".join(words[j : j + 16]) for j in range(0, len(words), 16)]
+        p = shard / f"doc-{i:07d}.txt"
+        p.write_text(f"synthetic document {i}\n" + "\n".join(lines) + "\n", encoding="utf-8")
+        paths.append(p)
+    return paths, sampler
+
+
+def make_queries(sampler: ZipfSampler, n: int, seed: int = 2) -> List[str]:
+    """Mix of short keyword queries and long stderr-like queries (like the fixer sends)."""
+    rng = random.Random(seed)
+    rare = sampler.tail(0.5)
+    out = []
+    for i in range(n):
+        if i % 4 == 3:
+            out.append(" ".join(sampler.sample(200)))
+        else:
+            out.append(" ".join(sampler.sample(2) + [rng.choice(rare)]))
+    return out
+
+
+def percentile(samples: Sequence[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(p / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _measure(fn: Callable[[], Any], trace_memory: bool) -> Dict[str, float]:
+    if trace_memory:
+        tracemalloc.start()
+    rss_before = _max_rss_mb()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    rss_after = _max_rss_mb()
+    out = {"seconds": round(elapsed, 4), "max_rss_mb": round(rss_after, 1), "rss_growth_mb": round(rss_after - rss_before, 1)}
+    if trace_memory:
+        out["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        tracemalloc.stop()
+    return out
+
+
+def _latencies(vault: Vault, queries: List[str], top_k: int) -> Dict[str, float]:
+    samples = []
+    for q in queries:
+        start = time.perf_counter()
+        retrieve(vault, q, top_k=top_k)
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "max_ms": round(max(samples) if samples else 0.0, 3),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        r = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=str(Path(__file__).parent))
+    except OSError:
+        return None
+    return r.stdout.strip() if r.returncode == 0 else None
+
+
+def run_benchmark(
+    work_dir: Path,
+    n_docs: int = 10000,
+    vocab_size: int = 50000,
+    mean_tokens: int = 300,
+    zipf_s: float = 1.1,
+    n_queries: int = 200,
+    single_ingest: int = 200,
+    top_k: int = 8,
+    workers: int = 4,
+    trace_memory: bool = False,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Run the full suite in work_dir and return the results dict:
+    corpus generation, single-file ingest (first `single_ingest` files through
+    add_local_file), batch ingest of the rest, full rebuild, no-op and
+    incremental update_index, and cold (unique queries) / warm (repeated)
+    retrieve latency.
+    """
+    corpus_dir = work_dir / "corpus"
+    vault = Vault(work_dir / "vault")
+    results: Dict[str, Any] = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "params": {
+            "docs": n_docs,
+            "vocab_size": vocab_size,
+            "mean_tokens": mean_tokens,
+            "zipf_s": zipf_s,
+            "queries": n_queries,
+            "top_k": top_k,
+            "workers": workers,
+            "seed": seed,
+        },
+    }
+
+    start = time.perf_counter()
+    paths, sampler = generate_corpus(corpus_dir, n_docs, vocab_size, mean_tokens, zipf_s, seed)
+    results["corpus"] = {
+        "seconds": round(time.perf_counter() - start, 4),
+        "bytes": sum(p.stat().st_size for p in paths),
+    }
+
+    single = paths[: min(single_ingest, len(paths))]
+    batch = paths[len(single) :]
+    t = _measure(lambda: [add_local_file(vault, p, p.stem, ["bench"]) for p in single], trace_memory)
+    t["docs_per_s"] = round(len(single) / t["seconds"], 1) if t["seconds"] else 0.0
+    results["ingest_single"] = {"docs": len(single), **t}
+    t = _measure(lambda: add_local_files(vault, batch, tags=["bench"], workers=workers), trace_memory)
+    t["docs_per_s"] = round(len(batch) / t["seconds"], 1) if t["seconds"] else 0.0
+    results["ingest_batch"] = {"docs": len(batch), **t}
+
+    results["rebuild_index"] = _measure(lambda: rebuild_index(vault), trace_memory)
+    results["rebuild_index"]["index_bytes"] = sum(p.stat().st_size for p in vault.index_dir.rglob("*") if p.is_file())
+    results["update_index_noop"] = _measure(lambda: update_index(vault), trace_memory)
+
+    queries = make_queries(sampler, n_queries, seed + 2)
+    results["retrieve_cold"] = _latencies(vault, queries, top_k)
+    retrieval_cache(vault).clear_memory()
+    results["retrieve_warm_disk"] = _latencies(vault, queries, top_k)
+    results["retrieve_warm_memory"] = _latencies(vault, queries, top_k)
+
+    extra, _ = generate_corpus(work_dir / "corpus_extra", max(1, n_docs // 100), vocab_size, mean_tokens, zipf_s, seed + 7)
+    add_local_files(vault, extra, tags=["bench"], workers=workers)
+    results["update_index_1pct"] = _measure(lambda: update_index(vault, compact=False), trace_memory)
+    results["update_index_1pct"]["docs"] = len(extra)
+    results["retrieve_after_update"] = _latencies(vault, queries[: max(1, n_queries // 4)], top_k)
+    return results
+
+
+# Lower is better for these keys; a run is flagged when it is slower than the
+# baseline by more than the tolerance.
+_COMPARE_KEYS = ["seconds", "p50_ms", "p99_ms", "max_rss_mb", "peak_traced_mb", "index_bytes"]
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.10) -> List[Dict[str, Any]]:
+    """Per-metric ratios current/baseline; `regression` is set when a ratio exceeds 1 + tolerance."""
+    rows: List[Dict[str, Any]] = []
+    for section, metrics in current.items():
+        if section in ("meta", "params") or not isinstance(metrics, dict):
+            continue
+        for key in _COMPARE_KEYS:
+            cur = metrics.get(key)
+            base = (baseline.get(section) or {}).get(key)
+            if not isinstance(cur, (int, float)) or not isinstance(base, (int, float)) or base <= 0:
+                continue
+            ratio = cur / base
+            rows.append(
+                {
+                    "metric": f"{section}.{key}",
+                    "baseline": base,
+                    "current": cur,
+                    "ratio": round(ratio, 3),
+                    "regression": ratio > 1.0 + tolerance,
+                }
+            )
+    return rows
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark vault ingest, indexing and retrieval")
+    parser.add_argument("--docs", type=int, default=10000, help="Synthetic corpus size (10k-1M)")
+    parser.add_argument("--vocab", type=int, default=50000)
+    parser.add_argument("--mean-tokens", type=int, default=300)
+    parser.add_argument("--zipf-s", type=float, default=1.1)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--single-ingest", type=int, default=200, help="Files ingested one by one before the batch")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace-memory", action="store_true", help="Report tracemalloc peaks (slower)")
+    parser.add_argument("--work-dir", type=Path, help="Keep the corpus and vault here instead of a temp dir")
+    parser.add_argument("--out", type=Path, help="Write results JSON to this file")
+    parser.add_argument("--compare", type=Path, help="Baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix="vault-bench-"))
+    try:
+        results = run_benchmark(
+            work_dir,
+            n_docs=args.docs,
+            vocab_size=args.vocab,
+            mean_tokens=args.mean_tokens,
+            zipf_s=args.zipf_s,
+            n_queries=args.queries,
+            single_ingest=args.single_ingest,
+            workers=args.workers,
+            trace_memory=args.trace_memory,
+            seed=args.seed,
+        )
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    regressions = 0
+    if args.compare:
+        rows = compare(results, json.loads(args.compare.read_text(encoding="utf-8")), args.tolerance)
+        results["comparison"] = {"baseline": str(args.compare), "rows": rows}
+        regressions = sum(1 for r in rows if r["regression"])
+    text = json.dumps(results, indent=2)
+    if args.out:
+        args.out.write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from orchestrator.vault.vault import Vault
+
+Rows = List[Dict[str, Any]]
+
+
+class RetrievalCache:
+    """
+    Two-level cache of retrieve() results.
+
+    - In-process LRU of max_memory_entries results.
+    - One SQLite file on disk shared by all processes, bounded by max_bytes
+      (least recently used entries go first) and ttl_s (older entries are
+      ignored on read and swept on write).
+
+    Keys are computed by the caller and must include the index generation, so
+    rebuilding or updating the index invalidates every cached result.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_memory_entries: int = 256,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_s: Optional[float] = 7 * 24 * 3600,
+        sweep_every: int = 64,
+    ) -> None:
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.sweep_every = sweep_every
+        self.stats: Dict[str, int] = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._memory: "OrderedDict[str, Rows]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._schema_pid = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per operation: safe across threads and forked workers.
+        # The schema and WAL mode are set up once per process, and again if the
+        # vault directory was wiped underneath us.
+        fresh = self._schema_pid != os.getpid() or not self.path.exists()
+        if fresh:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(self.path), timeout=10)
+        if fresh:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, payload TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, used REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS results_used ON results(used)")
+            self._schema_pid = os.getpid()
+        return db
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def get(self, key: str) -> Optional[Rows]:
+        with self._lock:
+            rows = self._memory.get(key)
+            if rows is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return rows
+
+        now = time.time()
+        db = self._connect()
+        try:
+            with db:
+                hit = db.execute("SELECT payload, created FROM results WHERE key = ?", (key,)).fetchone()
+                if hit is not None and self.ttl_s is not None and now - hit[1] > self.ttl_s:
+                    db.execute("DELETE FROM results WHERE key = ?", (key,))
+                    hit = None
+                if hit is not None:
+                    db.execute("UPDATE results SET used = ? WHERE key = ?", (now, key))
+        finally:
+            db.close()
+        if hit is None:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        rows = json.loads(hit[0])
+        with self._lock:
+            self.stats["disk_hits"] += 1
+            self._remember(key, rows)
+        return rows
+
+    def put(self, key: str, rows: Rows) -> None:
+        payload = json.dumps(rows, ensure_ascii=False)
+        now = time.time()
+        db = self._connect()
+        try:
+            with db:
+                db.execute(
+                    "INSERT OR REPLACE INTO results (key, payload, size, created, used) VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, len(payload), now, now),
+                )
+        finally:
+            db.close()
+        with self._lock:
+            self.stats["writes"] += 1
+            self._remember(key, rows)
+            self._puts += 1
+            sweep = self._puts % self.sweep_every == 0
+        if sweep:
+            self.sweep()
+
+    def sweep(self) -> int:
+        """Drop expired entries, then least recently used ones until under max_bytes."""
+        removed = 0
+        db = self._connect()
+        try:
+            with db:
+                if self.ttl_s is not None:
+                    removed += db.execute("DELETE FROM results WHERE created < ?", (time.time() - self.ttl_s,)).rowcount
+                total = db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+                if total > self.max_bytes:
+                    victims = []
+                    for key, size in db.execute("SELECT key, size FROM results ORDER BY used"):
+                        if total <= self.max_bytes:
+                            break
+                        victims.append((key,))
+                        total -= size
+                    db.executemany("DELETE FROM results WHERE key = ?", victims)
+                    removed += len(victims)
+        finally:
+            db.close()
+        with self._lock:
+            self.stats["evictions"] += removed
+        return removed
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def _remember(self, key: str, rows: Rows) -> None:
+        self._memory[key] = rows
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+
+_caches: Dict[str, RetrievalCache] = {}
+_caches_lock = threading.Lock()
+
+
+def retrieval_cache(vault: Vault) -> RetrievalCache:
+    """
+    Shared cache for a vault. VAULT_CACHE_MAX_MB and VAULT_CACHE_TTL_S bound
+    the disk store. Per-query JSON files from the old cache layout are removed
+    the first time the cache is opened.
+    """
+    path = vault.cache_dir / "retrieval.sqlite3"
+    with _caches_lock:
+        cache = _caches.get(str(path))
+        if cache is None:
+            max_mb = os.getenv("VAULT_CACHE_MAX_MB")
+            ttl = os.getenv("VAULT_CACHE_TTL_S")
+            kwargs: Dict[str, Any] = {}
+            if max_mb:
+                kwargs["max_bytes"] = int(float(max_mb) * 1024 * 1024)
+            if ttl:
+                kwargs["ttl_s"] = float(ttl)
+            cache = _caches[str(path)] = RetrievalCache(path, **kwargs)
+            for legacy in vault.cache_dir.glob("*.json"):
+                legacy.unlink(missing_ok=True)
+        return cache
@@ -1,39 +1,231 @@
 from __future__ import annotations
 
+import threading
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Any, Dict, List, Tuple
 import re
 
+from agent_factory.orchestrator.merge_lock import MergeLock
+from orchestrator.vault.segments import (
+    CATALOG_FORMAT,
+    IndexReader,
+    Segment,
+    empty_catalog,
+    passage_id,
+    segment_path,
+)
 from orchestrator.vault.vault import Vault
 
 TOKEN_RE = re.compile(r"[a-zA-Z0-9_]{2,}")
+_TOKEN_BYTES_RE = re.compile(rb"[a-zA-Z0-9_]{2,}")
+# Passages are the unit of ranking: a 3 MB run artifact becomes many small
+# units instead of one huge document competing with short notes.
+PASSAGE_TOKENS = 200
+PASSAGE_OVERLAP = 50
+BINARY_SUFFIXES = [".png", ".jpg", ".jpeg", ".webp", ".zip", ".exe", ".dll"]
 
 
 def tokenize(text: str) -> List[str]:
     return [t.lower() for t in TOKEN_RE.findall(text)]
 
 
-def read_doc_text(vault: Vault, doc: Dict[str, str]) -> str:
+def tokenize_with_offsets(data: bytes) -> Tuple[List[str], List[int]]:
+    """Same tokens as tokenize(), plus each token's byte offset in the source."""
+    tokens: List[str] = []
+    offsets: List[int] = []
+    for m in _TOKEN_BYTES_RE.finditer(data):
+        tokens.append(m.group().decode("ascii").lower())
+        offsets.append(m.start())
+    return tokens, offsets
+
+
+def read_doc_bytes(vault: Vault, doc: Dict[str, str]) -> bytes:
     p = vault.root / doc["path"]
-    if not p.exists():
-        return ""
-    if p.suffix.lower() in [".png", ".jpg", ".jpeg", ".webp", ".zip", ".exe", ".dll"]:
-        return ""
+    if p.suffix.lower() in BINARY_SUFFIXES:
+        return b""
     try:
-        return p.read_text(encoding="utf-8", errors="ignore")
-    except Exception:
-        return ""
+        return p.read_bytes()
+    except OSError:
+        return b""
 
 
-def rebuild_index(vault: Vault) -> None:
+def read_doc_text(vault: Vault, doc: Dict[str, str]) -> str:
+    return read_doc_bytes(vault, doc).decode("utf-8", errors="ignore")
+
+
+def passages(tokens: List[str], size: int = PASSAGE_TOKENS, overlap: int = PASSAGE_OVERLAP) -> List[Tuple[int, int]]:
+    """[start, end) token ranges of fixed-size passages overlapping by `overlap` tokens."""
+    step = max(1, size - overlap)
+    out = [(0, min(size, len(tokens)))]
+    start = step
+    while start + overlap < len(tokens):
+        out.append((start, min(start + size, len(tokens))))
+        start += step
+    return out
+
+
+def _index_doc(vault: Vault, seg: Segment, doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Chunk a document into passages, index each as its own unit and return its catalog entry."""
+    tokens, offsets = tokenize_with_offsets(read_doc_bytes(vault, doc))
+    spans = passages(tokens)
+    for n, (start, end) in enumerate(spans):
+        seg.add(passage_id(doc["id"], n), tokens[start:end], offsets[start:end])
+    length = sum(end - start for start, end in spans)
+    return {
+        "sha256": doc.get("sha256", ""),
+        "segment": seg.name,
+        "len": length,
+        "passages": len(spans),
+        "tags": doc.get("tags", []),
+    }
+
+
+def _index_lock(vault: Vault) -> MergeLock:
+    return MergeLock(vault.index_dir / ".index.lock", timeout_s=None)
+
+
+def _load_catalog(vault: Vault) -> Dict[str, Any]:
+    catalog = vault.load_inverted()
+    if catalog.get("format") != CATALOG_FORMAT:
+        # Pre-segment index: start over, keeping the generation monotonic.
+        fresh = empty_catalog()
+        fresh["generation"] = int(catalog.get("generation", 0))
+        return fresh
+    return catalog
+
+
+def _drop_segments(vault: Vault, names: List[str]) -> None:
+    for name in names:
+        segment_path(vault, name).unlink(missing_ok=True)
+
+
+def _prune_dead_segments(vault: Vault, catalog: Dict[str, Any]) -> None:
+    live = {d["segment"] for d in catalog["docs"].values()}
+    dead = [name for name in catalog["segments"] if name not in live]
+    catalog["segments"] = [name for name in catalog["segments"] if name in live]
+    _drop_segments(vault, dead)
+
+
+def update_index(
+    vault: Vault,
+    compact: bool = True,
+    max_segments: int = 8,
+    max_dead_ratio: float = 0.3,
+) -> Dict[str, int]:
+    """
+    Incrementally index the manifest:
+    - docs whose sha256 is new or changed are tokenized into one new segment
+    - docs gone from the manifest are tombstoned (dropped from the catalog)
+    - tag-only changes update the catalog without re-reading the source
+    Segments without live docs are deleted; when there are more than
+    max_segments or too many tombstoned entries, segments are compacted.
+    """
+    vault.ensure()
+    with _index_lock(vault):
+        catalog = _load_catalog(vault)
+        docs: Dict[str, Dict[str, Any]] = catalog["docs"]
+        manifest = {doc["id"]: doc for doc in vault.load_manifest()}
+
+        removed = [did for did in docs if did not in manifest]
+        for did in removed:
+            del docs[did]
+
+        changed = [doc for did, doc in manifest.items() if docs.get(did, {}).get("sha256") != doc.get("sha256")]
+        added = sum(1 for doc in changed if doc["id"] not in docs)
+        retagged = 0
+        for did, doc in manifest.items():
+            entry = docs.get(did)
+            if entry is not None and entry.get("sha256") == doc.get("sha256") and entry.get("tags") != doc.get("tags", []):
+                entry["tags"] = doc.get("tags", [])
+                retagged += 1
+
+        stats = {"added": added, "updated": len(changed) - added, "removed": len(removed), "retagged": retagged}
+        if changed or removed or retagged:
+            catalog["generation"] = int(catalog.get("generation", 0)) + 1
+            if changed:
+                seg = Segment(f"seg-{catalog['generation']:06d}")
+                entries = {doc["id"]: _index_doc(vault, seg, doc) for doc in changed}
+                seg.save(segment_path(vault, seg.name))
+                catalog["segments"].append(seg.name)
+                docs.update(entries)
+            _prune_dead_segments(vault, catalog)
+            vault.save_inverted(catalog)
+
+        if compact and needs_compaction(IndexReader.open(vault), max_segments, max_dead_ratio):
+            _compact_locked(vault)
+        stats["segments"] = len(vault.load_inverted().get("segments", []))
+        return stats
+
+
+def needs_compaction(reader: IndexReader, max_segments: int = 8, max_dead_ratio: float = 0.3) -> bool:
+    counts = reader.live_counts()
+    total = sum(n for _, _, n in counts)
+    dead = total - sum(live for _, live, _ in counts)
+    return len(counts) > max_segments or (total > 0 and dead / total > max_dead_ratio)
+
+
+def _compact_locked(vault: Vault) -> None:
+    catalog = vault.load_inverted()
+    if catalog.get("format") != CATALOG_FORMAT:
+        return
+    reader = IndexReader.open(vault)
+    catalog["generation"] = int(catalog.get("generation", 0)) + 1
+    merged = Segment(f"seg-{catalog['generation']:06d}")
+    for seg in reader.segments:
+        for did, n in seg.doc_lens().items():
+            if reader.is_live(did, seg.name):
+                merged.docs[did] = n
+        for tk, plist, offsets in seg.iter_postings():
+            for did, tf in plist.items():
+                if reader.is_live(did, seg.name):
+                    merged.terms.setdefault(tk, {})[did] = tf
+                    if did in offsets:
+                        merged.offsets.setdefault(tk, {})[did] = offsets[did]
+    merged.save(segment_path(vault, merged.name))
+    old = list(catalog["segments"])
+    catalog["segments"] = [merged.name]
+    for entry in catalog["docs"].values():
+        entry["segment"] = merged.name
+    vault.save_inverted(catalog)
+    _drop_segments(vault, old)
+
+
+def compact_index(vault: Vault) -> None:
+    """Merge all live postings into a single segment (no source re-reads)."""
     vault.ensure()
-    inv: Dict[str, Set[str]] = {}
-    manifest = vault.load_manifest()
+    with _index_lock(vault):
+        _compact_locked(vault)
+
+
+def compact_in_background(vault: Vault, max_segments: int = 8, max_dead_ratio: float = 0.3) -> threading.Thread:
+    """
+    Compact on a worker thread if the index needs it. Readers keep working: the
+    catalog is swapped atomically and IndexReader retries if a segment vanishes.
+    """
 
-    for doc in manifest:
-        text = read_doc_text(vault, doc)
-        toks = set(tokenize(text))
-        for tk in toks:
-            inv.setdefault(tk, set()).add(doc["id"])
+    def _run() -> None:
+        with _index_lock(vault):
+            if needs_compaction(IndexReader.open(vault), max_segments, max_dead_ratio):
+                _compact_locked(vault)
 
-    vault.save_inverted({k: sorted(list(v)) for k, v in inv.items()})
+    t = threading.Thread(target=_run, name="vault-compaction")
+    t.start()
+    return t
+
+
+def rebuild_index(vault: Vault) -> None:
+    """Re-index every document in the manifest into a single fresh segment."""
+    vault.ensure()
+    with _index_lock(vault):
+        catalog = _load_catalog(vault)
+        old = list(catalog["segments"])
+        catalog["generation"] = int(catalog.get("generation", 0)) + 1
+        seg = Segment(f"seg-{catalog['generation']:06d}")
+        docs: Dict[str, Dict[str, Any]] = {}
+        for doc in vault.load_manifest():
+            docs[doc["id"]] = _index_doc(vault, seg, doc)
+        seg.save(segment_path(vault, seg.name))
+        catalog["segments"] = [seg.name]
+        catalog["docs"] = docs
+        vault.save_inverted(catalog)
+        _drop_segments(vault, [name for name in old if name != seg.name])
@@ -2,18 +2,24 @@ from __future__ import annotations
 
 import datetime
 import hashlib
-import json
 import re
 import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar, Union
 
+from agent_factory.orchestrator.changes import HashCache
 from orchestrator.vault.vault import Vault
 
+_CHUNK = 1 << 20
+
 
 def sha256_file(p: Path) -> str:
     h = hashlib.sha256()
-    h.update(p.read_bytes())
+    with open(p, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
     return h.hexdigest()
 
 
@@ -23,18 +29,54 @@ def slug(s: str) -> str:
     return s[:80] if s else "doc"
 
 
-def add_local_file(vault: Vault, file_path: Path, title: str, tags: List[str]) -> Dict[str, Any]:
-    vault.ensure()
-    file_path = file_path.resolve()
-    digest = sha256_file(file_path)
+class ManifestIndex:
+    """
+    The manifest loaded once with a sha256 -> doc map, so dedup is a dict
+    lookup. Changes are written back in a single save; used as a context
+    manager it saves on exit (only if something was added).
+    """
+
+    def __init__(self, vault: Vault) -> None:
+        vault.ensure()
+        self.vault = vault
+        self.rows: List[Dict[str, Any]] = vault.load_manifest()
+        self.by_sha: Dict[str, Dict[str, Any]] = {}
+        for row in self.rows:
+            self.by_sha.setdefault(row.get("sha256", ""), row)
+        self.dirty = False
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        return self.by_sha.get(digest)
+
+    def add(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        existing = self.by_sha.get(doc["sha256"])
+        if existing is not None:
+            return existing
+        self.rows.append(doc)
+        self.by_sha[doc["sha256"]] = doc
+        self.dirty = True
+        return doc
+
+    def save(self) -> None:
+        if self.dirty:
+            self.vault.save_manifest(self.rows)
+            self.dirty = False
+
+    def __enter__(self) -> "ManifestIndex":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.save()
+
 
+def _now() -> str:
+    return datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+
+
+def _local_doc(vault: Vault, file_path: Path, digest: str, title: str, tags: List[str]) -> Tuple[Dict[str, Any], Path]:
     doc_id = digest[:12]
     dest = vault.sources / f"{doc_id}-{slug(title)}{file_path.suffix.lower()}"
-    if not dest.exists():
-        dest.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(file_path, dest)
-
-    now = datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+    now = _now()
     doc = {
         "id": doc_id,
         "title": title,
@@ -46,41 +88,115 @@ def add_local_file(vault: Vault, file_path: Path, title: str, tags: List[str]) -
         "updated_at": now,
         "meta": {"original_path": str(file_path)},
     }
+    return doc, dest
+
+
+def _copy_source(src: Path, dest: Path) -> None:
+    if dest.exists():
+        return
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.tmp")
+    shutil.copy2(src, tmp)
+    tmp.replace(dest)
+
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+
+def _map(fn: Callable[[_T], _R], items: List[_T], workers: int) -> List[_R]:
+    if workers > 1 and len(items) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            return list(ex.map(fn, items))
+    return [fn(item) for item in items]
 
-    manifest = vault.load_manifest()
-    for m in manifest:
-        if m.get("sha256") == digest:
-            return m
-    manifest.append(doc)
-    vault.save_manifest(manifest)
-    return doc
+
+def _hash_all(paths: List[Path], cache: Optional[HashCache], workers: int) -> List[str]:
+    """sha256 per path; a HashCache (keyed by absolute path) skips files whose stat is unchanged."""
+    scan_started = time.time_ns()
+    stats = [p.stat() for p in paths]
+    digests: List[Optional[str]] = [cache.lookup(str(p), st) if cache else None for p, st in zip(paths, stats)]
+    todo = [i for i, d in enumerate(digests) if d is None]
+    for i, digest in zip(todo, _map(lambda i: sha256_file(paths[i]), todo, workers)):
+        digests[i] = digest
+        if cache is not None and stats[i].st_mtime_ns < scan_started:
+            cache.store(str(paths[i]), stats[i], digest)
+    if cache is not None:
+        cache.hits += len(paths) - len(todo)
+        cache.misses += len(todo)
+    return [d for d in digests if d is not None]
+
+
+def add_local_file(vault: Vault, file_path: Path, title: str, tags: List[str]) -> Dict[str, Any]:
+    return add_local_files(vault, [(file_path, title, tags)])[0]
+
+
+def add_local_files(
+    vault: Vault,
+    paths: Iterable[Union[Path, Tuple[Path, str, List[str]]]],
+    tags: Optional[List[str]] = None,
+    workers: int = 1,
+    hash_cache: Optional[HashCache] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Batch ingest with one manifest load and one manifest write.
+
+    Each item is either a path (titled by its file name and tagged with `tags`)
+    or a (path, title, tags) tuple. Files are hashed in 1 MiB chunks; with
+    workers > 1 hashing and copying of new sources run in a thread pool, and a
+    hash_cache skips re-hashing files whose size/mtime/inode are unchanged.
+    Returns the manifest row for every item, existing rows for content already
+    in the vault.
+    """
+    items: List[Tuple[Path, str, List[str]]] = []
+    for item in paths:
+        if isinstance(item, tuple):
+            file_path, title, item_tags = item
+        else:
+            file_path, title, item_tags = Path(item), Path(item).name, list(tags or [])
+        items.append((Path(file_path).resolve(), title, item_tags))
+
+    digests = _hash_all([p for p, _, _ in items], hash_cache, workers)
+    with ManifestIndex(vault) as index:
+        out: List[Dict[str, Any]] = []
+        copies: Dict[Path, Path] = {}
+        new_docs: Dict[str, Dict[str, Any]] = {}
+        for (file_path, title, item_tags), digest in zip(items, digests):
+            doc = index.get(digest) or new_docs.get(digest)
+            if doc is None:
+                doc, dest = _local_doc(vault, file_path, digest, title, item_tags)
+                new_docs[digest] = doc
+                copies[dest] = file_path
+            out.append(doc)
+        _map(lambda pair: _copy_source(pair[1], pair[0]), list(copies.items()), workers)
+        for doc in new_docs.values():
+            index.add(doc)
+    return out
 
 
 def add_note(vault: Vault, title: str, content: str, tags: List[str]) -> Dict[str, Any]:
-    vault.ensure()
     digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
-    doc_id = digest[:12]
-    dest = vault.sources / f"{doc_id}-{slug(title)}.md"
-    if not dest.exists():
-        dest.parent.mkdir(parents=True, exist_ok=True)
-        dest.write_text(content, encoding="utf-8")
+    with ManifestIndex(vault) as index:
+        existing = index.get(digest)
+        if existing is not None:
+            return existing
+        doc_id = digest[:12]
+        dest = vault.sources / f"{doc_id}-{slug(title)}.md"
+        if not dest.exists():
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            dest.write_text(content, encoding="utf-8")
 
-    now = datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
-    doc = {
-        "id": doc_id,
-        "title": title,
-        "source_type": "note",
-        "path": str(dest.relative_to(vault.root)),
-        "sha256": digest,
-        "tags": sorted(list(set([t.lower() for t in tags]))),
-        "created_at": now,
-        "updated_at": now,
-        "meta": {},
-    }
-    manifest = vault.load_manifest()
-    for m in manifest:
-        if m.get("sha256") == digest:
-            return m
-    manifest.append(doc)
-    vault.save_manifest(manifest)
-    return doc
+        now = _now()
+        return index.add(
+            {
+                "id": doc_id,
+                "title": title,
+                "source_type": "note",
+                "path": str(dest.relative_to(vault.root)),
+                "sha256": digest,
+                "tags": sorted(list(set([t.lower() for t in tags]))),
+                "created_at": now,
+                "updated_at": now,
+                "meta": {},
+            }
+        )
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
 import hashlib
+import heapq
 import json
+import math
+import os
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
 
+from orchestrator.vault.cache import retrieval_cache
 from orchestrator.vault.indexer import read_doc_text, tokenize
+from orchestrator.vault.segments import IndexReader, doc_of
 from orchestrator.vault.vault import Vault
 
 
@@ -20,6 +27,32 @@ class RetrievedDoc:
     tags: List[str]
 
 
+_MAX_MANIFESTS = 4
+_manifests: "OrderedDict[Tuple[str, int, int, int], Dict[str, Dict[str, Any]]]" = OrderedDict()
+_manifests_lock = threading.Lock()
+
+
+def manifest_by_id(vault: Vault) -> Dict[str, Dict[str, Any]]:
+    """
+    Parsed manifest keyed by doc id, cached per process on the manifest's
+    stat signature. save_manifest swaps the file atomically, so any write
+    changes the inode and invalidates the entry. Callers must not mutate it.
+    """
+    st = vault.manifest_path.stat()
+    key = (str(vault.manifest_path), st.st_ino, st.st_mtime_ns, st.st_size)
+    with _manifests_lock:
+        by_id = _manifests.get(key)
+        if by_id is not None:
+            _manifests.move_to_end(key)
+            return by_id
+    by_id = {m["id"]: m for m in vault.load_manifest()}
+    with _manifests_lock:
+        _manifests[key] = by_id
+        while len(_manifests) > _MAX_MANIFESTS:
+            _manifests.popitem(last=False)
+    return by_id
+
+
 def _cache_key(q: Dict[str, Any]) -> str:
     s = json.dumps(q, sort_keys=True, ensure_ascii=False)
     return hashlib.sha256(s.encode("utf-8")).hexdigest()[:16]
@@ -41,6 +74,85 @@ def _snippet(text: str, query_tokens: List[str], max_len: int = 600) -> str:
     return out + ("..." if end < len(text) else "")
 
 
+def _best_window(pairs: List[Tuple[int, str]], width: int = 400) -> int:
+    """Start offset of the width-byte window covering the most distinct query terms (then most hits)."""
+    best, best_key = pairs[0][0], (0, 0)
+    counts: Dict[str, int] = {}
+    lo = 0
+    for hi, (off, term) in enumerate(pairs):
+        counts[term] = counts.get(term, 0) + 1
+        while off - pairs[lo][0] >= width:
+            t = pairs[lo][1]
+            counts[t] -= 1
+            if not counts[t]:
+                del counts[t]
+            lo += 1
+        key = (len(counts), hi - lo + 1)
+        if key > best_key:
+            best, best_key = pairs[lo][0], key
+    return best
+
+
+def _read_window(path: Path, start: int, end: int) -> Tuple[str, bool]:
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            f.seek(start)
+            data = f.read(max(0, end - start))
+    except OSError:
+        return "", False
+    return data.decode("utf-8", errors="ignore"), start + len(data) < size
+
+
+def _indexed_snippet(path: Path, pairs: List[Tuple[int, str]], max_len: int = 600) -> str:
+    """Windowed read around the densest cluster of query-term offsets; no full-file read."""
+    if not pairs:
+        text, more = _read_window(path, 0, max_len)
+        return text + ("..." if more else "")
+    pos = _best_window(pairs)
+    text, more = _read_window(path, max(0, pos - 200), pos + max_len - 200)
+    return text + ("..." if more else "")
+
+
+def bm25_scores(
+    index: IndexReader,
+    q_tokens: List[str],
+    allowed: Optional[Set[str]] = None,
+    k1: float = 1.2,
+    b: float = 0.75,
+) -> Dict[str, float]:
+    """
+    Okapi BM25 over the passage postings, keyed by passage id; `allowed`
+    restricts the documents passages may come from. Query tokens are
+    de-duplicated so long queries (stderr dumps) do not over-weight repeated
+    words; rare terms dominate through IDF and passages are normalized by
+    their token count.
+    """
+    n_units, avg_len = index.doc_count, index.avg_len
+    scores: Dict[str, float] = {}
+    for tk in dict.fromkeys(q_tokens):
+        plist = index.postings(tk)
+        if not plist:
+            continue
+        idf = math.log(1.0 + (n_units - len(plist) + 0.5) / (len(plist) + 0.5))
+        for uid, tf in plist.items():
+            if allowed is not None and doc_of(uid) not in allowed:
+                continue
+            norm = 1.0 - b + b * (index.unit_len(uid) / avg_len) if avg_len else 1.0
+            scores[uid] = scores.get(uid, 0.0) + idf * tf * (k1 + 1.0) / (tf + k1 * norm)
+    return scores
+
+
+def collapse_passages(scores: Dict[str, float]) -> Dict[str, Tuple[float, str]]:
+    """Best passage per document: doc_id -> (score, passage id)."""
+    best: Dict[str, Tuple[float, str]] = {}
+    for uid, sc in scores.items():
+        did = doc_of(uid)
+        if did not in best or (sc, uid) > best[did]:
+            best[did] = (sc, uid)
+    return best
+
+
 def retrieve(
     vault: Vault,
     query: str,
@@ -49,46 +161,50 @@ def retrieve(
     min_score: float = 0.1,
 ) -> List[RetrievedDoc]:
     vault.ensure()
-    q = {"query": query, "tags": sorted([t.lower() for t in (tags or [])]), "top_k": top_k, "min_score": min_score}
+    index = IndexReader.open(vault)
+    q = {
+        "query": query,
+        "tags": sorted([t.lower() for t in (tags or [])]),
+        "top_k": top_k,
+        "min_score": min_score,
+        "generation": index.generation,
+    }
     key = _cache_key(q)
-    cache_file = vault.cache_dir / f"{key}.json"
-    if cache_file.exists():
-        raw = json.loads(cache_file.read_text(encoding="utf-8"))
-        return [RetrievedDoc(**r) for r in raw]
+    cache = retrieval_cache(vault)
+    cached = cache.get(key)
+    if cached is not None:
+        return [RetrievedDoc(**r) for r in cached]
 
-    inv = vault.load_inverted()
-    manifest = vault.load_manifest()
-    by_id = {m["id"]: m for m in manifest}
+    by_id = manifest_by_id(vault)
 
     q_tokens = tokenize(query)
-    scores: Dict[str, float] = {}
-
-    for tk in q_tokens:
-        for doc_id in inv.get(tk, []):
-            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0
-
-    if q["tags"]:
-        want = set(q["tags"])
-        scores = {did: sc for did, sc in scores.items() if want.issubset(set(by_id[did].get("tags", [])))}
-
-    ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
+    allowed = index.docs_with_tags(q["tags"]) if q["tags"] else None
+    scores = bm25_scores(index, q_tokens, allowed) if allowed is None or allowed else {}
+    candidates = (
+        (did, sc, uid) for did, (sc, uid) in collapse_passages(scores).items() if sc >= min_score and did in by_id
+    )
+    ranked = heapq.nlargest(top_k, candidates, key=lambda x: (x[1], x[0]))
+
+    # Snippets come from each document's best passage only.
+    offsets = index.offsets_for(q_tokens, [uid for _, _, uid in ranked])
     out: List[RetrievedDoc] = []
-    for did, sc in ranked:
+    for did, sc, uid in ranked:
         doc = by_id[did]
-        text = read_doc_text(vault, doc)
-        snip = _snippet(text, q_tokens)
-        if sc >= min_score:
-            out.append(
-                RetrievedDoc(
-                    id=did,
-                    title=doc["title"],
-                    score=float(sc),
-                    snippet=snip,
-                    path=doc["path"],
-                    tags=doc.get("tags", []),
-                )
+        pairs = offsets.get(uid)
+        if pairs is None:
+            snippet = _snippet(read_doc_text(vault, doc), q_tokens)
+        else:
+            snippet = _indexed_snippet(vault.root / doc["path"], pairs)
+        out.append(
+            RetrievedDoc(
+                id=did,
+                title=doc["title"],
+                score=float(sc),
+                snippet=snippet,
+                path=doc["path"],
+                tags=doc.get("tags", []),
             )
+        )
 
-    cache_file.parent.mkdir(parents=True, exist_ok=True)
-    cache_file.write_text(json.dumps([r.__dict__ for r in out], indent=2, ensure_ascii=False), encoding="utf-8")
+    cache.put(key, [dict(r.__dict__) for r in out])
     return out
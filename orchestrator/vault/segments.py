@@ -0,0 +1,404 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from orchestrator.vault.vault import Vault
+
+CATALOG_FORMAT = 3
+PASSAGE_SEP = "#"
+
+
+def passage_id(doc_id: str, n: int) -> str:
+    return f"{doc_id}{PASSAGE_SEP}{n}"
+
+
+def doc_of(unit_id: str) -> str:
+    """Document id of an index unit (a passage id, or a whole-doc id in older segments)."""
+    return unit_id.split(PASSAGE_SEP, 1)[0]
+
+
+SEGMENT_MAGIC = b"AFVSEG02"
+_SEGMENT_MAGIC_V1 = b"AFVSEG01"  # no token offsets
+MAX_POSITIONS = 64  # token byte offsets kept per (term, doc); enough to place snippets
+_HEADER = struct.Struct("<8sIIQQ")  # magic, n_docs, n_terms, doc index offset, term index offset
+_DOC_SLOT = struct.Struct("<Q")  # offset of (varint id length, id, varint doc length)
+_TERM_SLOT = struct.Struct("<QQII")  # term offset, postings offset, postings bytes, doc frequency
+
+
+def encode_varint(n: int, out: bytearray) -> None:
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def decode_varint(buf: Any, pos: int) -> Tuple[int, int]:
+    n = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+@dataclass
+class Segment:
+    """
+    In-memory slice of the inverted index: postings (term -> {unit_id: tf}),
+    the first MAX_POSITIONS byte offsets of each term in each unit, and unit
+    lengths for the documents indexed in one batch. Units are passages
+    ("<doc_id>#<n>"); segments written before passages used whole doc ids. Whether a doc entry is
+    still live is decided by the catalog, never by the segment itself.
+    Written once as a binary .seg file and read back through SegmentReader.
+    """
+
+    name: str
+    docs: Dict[str, int] = field(default_factory=dict)
+    terms: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    offsets: Dict[str, Dict[str, List[int]]] = field(default_factory=dict)
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.docs)
+
+    @property
+    def has_offsets(self) -> bool:
+        return bool(self.offsets)
+
+    def add(self, doc_id: str, tokens: List[str], offsets: Optional[List[int]] = None) -> None:
+        self.docs[doc_id] = len(tokens)
+        for tk, tf in Counter(tokens).items():
+            self.terms.setdefault(tk, {})[doc_id] = tf
+        if offsets is not None:
+            for tk, off in zip(tokens, offsets):
+                pos = self.offsets.setdefault(tk, {}).setdefault(doc_id, [])
+                if len(pos) < MAX_POSITIONS:
+                    pos.append(off)
+
+    def postings(self, term: str) -> Dict[str, int]:
+        return self.terms.get(term, {})
+
+    def doc_lens(self) -> Dict[str, int]:
+        return dict(self.docs)
+
+    def positions(self, term: str) -> Dict[str, List[int]]:
+        return self.offsets.get(term, {})
+
+    def unit_len(self, unit_id: str) -> int:
+        return self.docs.get(unit_id, 0)
+
+    def iter_postings(self) -> Iterator[Tuple[str, Dict[str, int], Dict[str, List[int]]]]:
+        for term, plist in self.terms.items():
+            yield term, plist, self.offsets.get(term, {})
+
+    def save(self, path: Path) -> None:
+        """
+        Layout (little endian): header | doc records | term records + postings |
+        doc index | term index. Doc ids are interned as ordinals (sorted by id);
+        postings are (ordinal delta, tf) varint pairs; both indexes are fixed-size
+        slots so readers binary-search the mmap without decoding anything else.
+        Each posting is followed by its offset count and delta-encoded offsets.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        doc_ids = sorted(self.docs)
+        ordinal = {did: i for i, did in enumerate(doc_ids)}
+        body = bytearray(_HEADER.size)
+        doc_slots: List[int] = []
+        for did in doc_ids:
+            raw = did.encode("utf-8")
+            doc_slots.append(len(body))
+            encode_varint(len(raw), body)
+            body += raw
+            encode_varint(self.docs[did], body)
+
+        term_slots: List[Tuple[int, int, int, int]] = []
+        for raw, term in sorted((t.encode("utf-8"), t) for t in self.terms):
+            term_off = len(body)
+            encode_varint(len(raw), body)
+            body += raw
+            post_off = len(body)
+            prev = 0
+            plist = sorted((ordinal[did], did, tf) for did, tf in self.terms[term].items())
+            term_offsets = self.offsets.get(term, {})
+            for o, did, tf in plist:
+                encode_varint(o - prev, body)
+                encode_varint(tf, body)
+                prev = o
+                last = 0
+                pos = term_offsets.get(did, [])
+                encode_varint(len(pos), body)
+                for off in pos:
+                    encode_varint(off - last, body)
+                    last = off
+            term_slots.append((term_off, post_off, len(body) - post_off, len(plist)))
+
+        doc_index = len(body)
+        for off in doc_slots:
+            body += _DOC_SLOT.pack(off)
+        term_index = len(body)
+        for slot in term_slots:
+            body += _TERM_SLOT.pack(*slot)
+        _HEADER.pack_into(body, 0, SEGMENT_MAGIC, len(doc_ids), len(term_slots), doc_index, term_index)
+
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(bytes(body))
+        os.replace(tmp, path)
+
+
+class SegmentReader:
+    """mmap view of a .seg file; a term lookup touches only its slot and postings."""
+
+    def __init__(self, name: str, path: Path) -> None:
+        self.name = name
+        with open(path, "rb") as f:
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.n_docs, self.n_terms, self._doc_index, self._term_index = _HEADER.unpack_from(self._buf, 0)
+        if magic not in (SEGMENT_MAGIC, _SEGMENT_MAGIC_V1):
+            raise ValueError(f"Not a vault segment: {path}")
+        self.has_offsets = magic == SEGMENT_MAGIC
+        self._doc_ids: Dict[int, str] = {}
+        self._lens: Dict[str, int] = {}
+
+    def _string(self, off: int) -> Tuple[bytes, int]:
+        n, pos = decode_varint(self._buf, off)
+        return self._buf[pos : pos + n], pos + n
+
+    def _doc(self, ordinal: int) -> Tuple[str, int]:
+        (off,) = _DOC_SLOT.unpack_from(self._buf, self._doc_index + ordinal * _DOC_SLOT.size)
+        raw, pos = self._string(off)
+        length, _ = decode_varint(self._buf, pos)
+        return raw.decode("utf-8"), length
+
+    def _doc_id(self, ordinal: int) -> str:
+        did = self._doc_ids.get(ordinal)
+        if did is None:
+            did, length = self._doc(ordinal)
+            self._doc_ids[ordinal] = did
+            self._lens[did] = length
+        return did
+
+    def unit_len(self, unit_id: str) -> int:
+        """Length of a unit already seen in decoded postings."""
+        return self._lens.get(unit_id, 0)
+
+    def _find(self, term: bytes) -> Optional[Tuple[int, int, int, int]]:
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            slot = _TERM_SLOT.unpack_from(self._buf, self._term_index + mid * _TERM_SLOT.size)
+            key, _ = self._string(slot[0])
+            if key == term:
+                return slot
+            if key < term:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def _decode_postings(self, off: int, size: int, want_offsets: bool = False) -> Tuple[Dict[str, int], Dict[str, List[int]]]:
+        out: Dict[str, int] = {}
+        offsets: Dict[str, List[int]] = {}
+        pos, end, o = off, off + size, 0
+        while pos < end:
+            delta, pos = decode_varint(self._buf, pos)
+            tf, pos = decode_varint(self._buf, pos)
+            o += delta
+            did = self._doc_id(o)
+            out[did] = tf
+            if not self.has_offsets:
+                continue
+            n, pos = decode_varint(self._buf, pos)
+            if not want_offsets:
+                for _ in range(n):
+                    _, pos = decode_varint(self._buf, pos)
+                continue
+            doc_offsets, last = [], 0
+            for _ in range(n):
+                d, pos = decode_varint(self._buf, pos)
+                last += d
+                doc_offsets.append(last)
+            offsets[did] = doc_offsets
+        return out, offsets
+
+    def postings(self, term: str) -> Dict[str, int]:
+        slot = self._find(term.encode("utf-8"))
+        return self._decode_postings(slot[1], slot[2])[0] if slot else {}
+
+    def positions(self, term: str) -> Dict[str, List[int]]:
+        slot = self._find(term.encode("utf-8"))
+        return self._decode_postings(slot[1], slot[2], want_offsets=True)[1] if slot else {}
+
+    def doc_lens(self) -> Dict[str, int]:
+        return dict(self._doc(i) for i in range(self.n_docs))
+
+    def iter_postings(self) -> Iterator[Tuple[str, Dict[str, int], Dict[str, List[int]]]]:
+        for i in range(self.n_terms):
+            slot = _TERM_SLOT.unpack_from(self._buf, self._term_index + i * _TERM_SLOT.size)
+            raw, _ = self._string(slot[0])
+            yield (raw.decode("utf-8"), *self._decode_postings(slot[1], slot[2], want_offsets=True))
+
+
+def segment_path(vault: Vault, name: str) -> Path:
+    return vault.segments_dir / f"{name}.seg"
+
+
+def empty_catalog() -> Dict[str, Any]:
+    return {"format": CATALOG_FORMAT, "generation": 0, "segments": [], "docs": {}}
+
+
+class IndexReader:
+    """
+    Read view over the catalog (inverted.json) and its segments.
+
+    catalog["docs"][doc_id] = {"sha256", "segment", "len", "passages", "tags"}:
+    a posting for one of doc_id's passages is live only in the segment the
+    catalog points at, so removed and re-indexed documents are tombstoned
+    without rewriting old segments. BM25 statistics are per passage ("len" is
+    the summed passage length). Indexes written before segments existed are
+    read as a single segment.
+
+    Readers are immutable snapshots; open() reuses the one already built for
+    an unchanged catalog file, so a process parses the catalog once per index
+    generation and query terms are looked up in the mmapped segments.
+    """
+
+    def __init__(self, catalog: Dict[str, Any], segments: List[Union[Segment, SegmentReader]]) -> None:
+        self.catalog = catalog
+        self.segments = segments
+        self.docs: Dict[str, Dict[str, Any]] = catalog.get("docs", {})
+        self.generation = int(catalog.get("generation", 0))
+        self.doc_count = sum(int(d.get("passages", 1)) for d in self.docs.values())
+        total = sum(int(d.get("len", 0)) for d in self.docs.values())
+        self.avg_len = total / self.doc_count if self.doc_count else 0.0
+        self._by_name = {seg.name: seg for seg in segments}
+        self._tags: Optional[Dict[str, Set[str]]] = None
+
+    @classmethod
+    def open(cls, vault: Vault, retries: int = 3) -> "IndexReader":
+        # A concurrent compaction may delete segments between reading the
+        # catalog and opening them; re-read the (already swapped) catalog.
+        for attempt in range(retries):
+            try:
+                st = vault.inverted_path.stat()
+            except FileNotFoundError:
+                return cls(empty_catalog(), [])
+            key = (str(vault.inverted_path), st.st_ino, st.st_mtime_ns, st.st_size)
+            with _readers_lock:
+                reader = _readers.get(key)
+                if reader is not None:
+                    _readers.move_to_end(key)
+                    return reader
+            catalog = vault.load_inverted()
+            try:
+                if "segments" not in catalog:
+                    reader = cls._from_legacy(catalog)
+                else:
+                    reader = cls(catalog, [SegmentReader(n, segment_path(vault, n)) for n in catalog["segments"]])
+            except FileNotFoundError:
+                if attempt == retries - 1:
+                    raise
+                continue
+            with _readers_lock:
+                _readers[key] = reader
+                while len(_readers) > _MAX_READERS:
+                    _readers.popitem(last=False)
+            return reader
+        raise RuntimeError("unreachable")
+
+    @classmethod
+    def _from_legacy(cls, inv: Dict[str, Any]) -> "IndexReader":
+        if "postings" in inv:
+            postings, lens = inv["postings"], inv.get("docs", {})
+        else:
+            postings = {tk: {did: 1 for did in ids} for tk, ids in inv.items() if isinstance(ids, list)}
+            lens = {did: 1 for plist in postings.values() for did in plist}
+        doc_tags: Dict[str, List[str]] = {}
+        for tag, ids in inv.get("tags", {}).items():
+            for did in ids:
+                doc_tags.setdefault(did, []).append(tag)
+        docs = {did: {"segment": "legacy", "len": n, "tags": doc_tags.get(did, [])} for did, n in lens.items()}
+        return cls({"generation": 0, "segments": ["legacy"], "docs": docs}, [Segment("legacy", lens, postings)])
+
+    def is_live(self, unit_id: str, segment: str) -> bool:
+        d = self.docs.get(doc_of(unit_id))
+        return d is not None and d.get("segment") == segment
+
+    def postings(self, term: str) -> Dict[str, int]:
+        """Live units (passages) containing term -> term frequency."""
+        out: Dict[str, int] = {}
+        for seg in self.segments:
+            for uid, tf in seg.postings(term).items():
+                if self.is_live(uid, seg.name):
+                    out[uid] = tf
+        return out
+
+    def unit_len(self, unit_id: str) -> int:
+        seg = self._by_name.get(self.docs.get(doc_of(unit_id), {}).get("segment"))
+        return seg.unit_len(unit_id) if seg is not None else 0
+
+    def offsets_for(self, terms: Iterable[str], unit_ids: Iterable[str]) -> Dict[str, Optional[List[Tuple[int, str]]]]:
+        """
+        Sorted (byte offset, term) pairs per unit for the given terms, decoding
+        each term's postings once per segment. None for units whose segment
+        was written without offsets.
+        """
+        wanted: Dict[str, List[str]] = {}
+        out: Dict[str, Optional[List[Tuple[int, str]]]] = {}
+        for did in unit_ids:
+            segment = self.docs.get(doc_of(did), {}).get("segment")
+            wanted.setdefault(segment, []).append(did)
+            out[did] = []
+        for seg in self.segments:
+            dids = wanted.get(seg.name)
+            if not dids:
+                continue
+            if not seg.has_offsets:
+                for did in dids:
+                    out[did] = None
+                continue
+            for term in dict.fromkeys(terms):
+                positions = seg.positions(term)
+                for did in dids:
+                    out[did].extend((off, term) for off in positions.get(did, []))
+        for pairs in out.values():
+            if pairs:
+                pairs.sort()
+        return out
+
+    def doc_len(self, doc_id: str) -> int:
+        return int(self.docs.get(doc_id, {}).get("len", 0))
+
+    def docs_with_tags(self, tags: Iterable[str]) -> Set[str]:
+        if self._tags is None:
+            self._tags = {}
+            for did, d in self.docs.items():
+                for tag in d.get("tags", []):
+                    self._tags.setdefault(tag, set()).add(did)
+        allowed: Optional[Set[str]] = None
+        for tag in sorted(tags, key=lambda t: len(self._tags.get(t, ()))):
+            ids = self._tags.get(tag, set())
+            allowed = set(ids) if allowed is None else allowed & ids
+            if not allowed:
+                return set()
+        return allowed if allowed is not None else set(self.docs)
+
+    def live_counts(self) -> List[Tuple[str, int, int]]:
+        """(segment, live units, total units) per segment, for compaction decisions."""
+        live: Counter = Counter()
+        for d in self.docs.values():
+            live[d.get("segment")] += int(d.get("passages", 1))
+        return [(seg.name, live.get(seg.name, 0), seg.n_docs) for seg in self.segments]
+
+
+_MAX_READERS = 4
+_readers: "OrderedDict[Tuple[str, int, int, int], IndexReader]" = OrderedDict()
+_readers_lock = threading.Lock()
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import json
+import os
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List
@@ -30,6 +31,10 @@ class Vault:
     def inverted_path(self) -> Path:
         return self.index_dir / "inverted.json"
 
+    @property
+    def segments_dir(self) -> Path:
+        return self.index_dir / "segments"
+
     @property
     def cache_dir(self) -> Path:
         return self.root / "cache" / "retrieval"
@@ -53,10 +58,15 @@ class Vault:
         return json.loads(self.manifest_path.read_text(encoding="utf-8"))
 
     def save_manifest(self, rows: List[Dict[str, Any]]) -> None:
-        self.manifest_path.write_text(json.dumps(rows, indent=2, ensure_ascii=False), encoding="utf-8")
+        tmp = self.manifest_path.with_name(f".{self.manifest_path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(rows, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.manifest_path)
 
-    def load_inverted(self) -> Dict[str, List[str]]:
+    def load_inverted(self) -> Dict[str, Any]:
         return json.loads(self.inverted_path.read_text(encoding="utf-8"))
 
-    def save_inverted(self, inv: Dict[str, List[str]]) -> None:
-        self.inverted_path.write_text(json.dumps(inv, indent=2, ensure_ascii=False), encoding="utf-8")
+    def save_inverted(self, inv: Dict[str, Any]) -> None:
+        # Atomic swap: readers never see a half-written catalog.
+        tmp = self.inverted_path.with_name(f".{self.inverted_path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(inv, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.inverted_path)
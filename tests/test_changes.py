@@ -0,0 +1,29 @@
+from pathlib import Path
+
+from agent_factory.orchestrator.changes import HashCache, diff_hashes, snapshot_hashes
+
+
+def test_snapshot_hashes_reuses_cache_and_detects_changes(tmp_path: Path) -> None:
+    root = tmp_path / "tree"
+    (root / "pkg").mkdir(parents=True)
+    (root / "runs" / "p").mkdir(parents=True)
+    (root / "pkg" / "a.py").write_text("a = 1\n", encoding="utf-8")
+    (root / "pkg" / "b.py").write_text("b = 1\n", encoding="utf-8")
+    (root / "runs" / "p" / "log.txt").write_text("ignored", encoding="utf-8")
+
+    cache = HashCache(tmp_path / "hashes.json")
+    before = snapshot_hashes(root, cache=cache, workers=2)
+    assert sorted(before) == [str(Path("pkg/a.py")), str(Path("pkg/b.py"))]
+    cache.save()
+
+    (root / "pkg" / "b.py").write_text("b = 2\n", encoding="utf-8")
+    (root / "pkg" / "c.py").write_text("c = 1\n", encoding="utf-8")
+    reloaded = HashCache(tmp_path / "hashes.json")
+    after = snapshot_hashes(root, cache=reloaded)
+
+    assert reloaded.hits == 1
+    assert diff_hashes(before, after) == {
+        "created": [str(Path("pkg/c.py"))],
+        "deleted": [],
+        "modified": [str(Path("pkg/b.py"))],
+    }
@@ -0,0 +1,57 @@
+import random
+import time
+
+import pytest
+
+from agent_factory.orchestrator.dag import DagError, critical_path, find_cycle, levels, topo_sort
+
+
+def _ids(tasks):
+    return [t["id"] for t in tasks]
+
+
+def test_topo_sort_is_deterministic_and_respects_dependencies() -> None:
+    tasks = [
+        {"id": "d", "depends_on": ["b", "c"]},
+        {"id": "c", "depends_on": ["a"]},
+        {"id": "b", "depends_on": ["a"]},
+        {"id": "a"},
+        {"id": "e"},
+    ]
+    assert _ids(topo_sort(tasks)) == ["a", "b", "c", "d", "e"]
+    assert levels(tasks) == {"a": 0, "b": 1, "c": 1, "d": 2, "e": 0}
+    assert critical_path(tasks) == (3.0, ["a", "b", "d"])
+    weights = {"a": 1, "b": 1, "c": 5, "d": 1, "e": 1}
+    assert critical_path(tasks, weight=lambda t: weights[t["id"]]) == (7.0, ["a", "c", "d"])
+
+
+def test_topo_sort_reports_missing_dependency_and_cycle_path() -> None:
+    with pytest.raises(DagError, match="missing task z"):
+        topo_sort([{"id": "a", "depends_on": ["z"]}])
+
+    tasks = [
+        {"id": "a"},
+        {"id": "b", "depends_on": ["a", "d"]},
+        {"id": "c", "depends_on": ["b"]},
+        {"id": "d", "depends_on": ["c"]},
+        {"id": "e", "depends_on": ["d"]},
+    ]
+    with pytest.raises(DagError) as exc:
+        topo_sort(tasks)
+    assert exc.value.cycle == ["b", "d", "c", "b"]
+    assert "b -> d -> c -> b" in str(exc.value)
+    assert find_cycle(tasks[:1]) == []
+
+
+def test_topo_sort_scales_to_large_backlogs() -> None:
+    rng = random.Random(7)
+    n = 5000
+    tasks = [
+        {"id": f"T{i:05d}", "depends_on": [f"T{j:05d}" for j in rng.sample(range(i), min(i, 3))]} for i in range(n)
+    ]
+    rng.shuffle(tasks)
+    start = time.perf_counter()
+    order = _ids(topo_sort(tasks))
+    assert time.perf_counter() - start < 2.0
+    pos = {tid: i for i, tid in enumerate(order)}
+    assert all(pos[d] < pos[t["id"]] for t in tasks for d in t["depends_on"])
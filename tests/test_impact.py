@@ -0,0 +1,127 @@
+from pathlib import Path
+
+from agent_factory.orchestrator.impact import ImpactMap, parse_imports, run_impacted_tests
+
+
+def _write(root: Path, rel: str, text: str) -> None:
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def _tree(root: Path) -> None:
+    _write(root, "pkg/__init__.py", "")
+    _write(root, "pkg/core.py", "VALUE = 1\n")
+    _write(root, "pkg/api.py", "from .core import VALUE\n\ndef get():\n    return VALUE\n")
+    _write(root, "pkg/other.py", "OTHER = 2\n")
+    _write(root, "tests/test_api.py", "from pkg import api\n\ndef test_get():\n    assert api.get() == 1\n")
+    _write(root, "tests/test_other.py", "import pkg.other\n\ndef test_other():\n    assert pkg.other.OTHER == 2\n")
+    _write(root, "README.md", "# demo\n")
+    _write(root, "conftest.py", "")  # puts the tree root on sys.path
+
+
+def _changes(*modified: str, deleted=()) -> dict:
+    return {"created": [], "deleted": list(deleted), "modified": list(modified)}
+
+
+def test_parse_imports_resolves_relative_and_parent_packages() -> None:
+    src = "import os.path\nfrom . import sibling\nfrom ..util import helper\n"
+    assert parse_imports(src, "pkg.sub.mod", is_package=False) == [
+        "os",
+        "os.path",
+        "pkg",
+        "pkg.sub",
+        "pkg.sub.sibling",
+        "pkg.util",
+        "pkg.util.helper",
+    ]
+
+
+def test_select_follows_transitive_imports_and_falls_back_on_misses(tmp_path: Path) -> None:
+    _tree(tmp_path)
+    impact = ImpactMap()
+    impact.refresh(tmp_path)
+
+    assert impact.select(_changes("pkg/core.py")) == ["tests/test_api.py"]
+    assert impact.select(_changes("pkg/other.py", "README.md")) == ["tests/test_other.py"]
+    assert sorted(impact.select(_changes("pkg/__init__.py"))) == ["tests/test_api.py", "tests/test_other.py"]
+    assert impact.select(_changes("tests/test_api.py")) == ["tests/test_api.py"]
+    assert impact.select(_changes("README.md")) == []
+
+    assert impact.select(_changes("conftest.py")) is None
+    assert impact.select(_changes("pkg/data.json")) is None
+    assert impact.select(_changes(deleted=["pkg/gone.py"])) is None
+
+
+def test_impact_map_persists_and_orders_slowest_first(tmp_path: Path) -> None:
+    _tree(tmp_path)
+    path = tmp_path / "cache" / "test_impact.json"
+    impact = ImpactMap(path)
+    impact.refresh(tmp_path)
+    junit = tmp_path / "junit.xml"
+    junit.write_text(
+        "<testsuites><testsuite>"
+        '<testcase classname="tests.test_api" name="test_get" time="0.5"/>'
+        '<testcase classname="tests.test_other.TestX" name="test_a" time="1.0"/>'
+        '<testcase classname="tests.test_other.TestX" name="test_b" time="1.5"/>'
+        "</testsuite></testsuites>",
+        encoding="utf-8",
+    )
+    impact.record_junit(junit, impact.tests)
+    impact.save()
+
+    again = ImpactMap(path)
+    assert again.durations == {"tests/test_api.py": 0.5, "tests/test_other.py": 2.5}
+    assert again.order(["tests/test_api.py", "tests/test_new.py", "tests/test_other.py"]) == [
+        "tests/test_new.py",
+        "tests/test_other.py",
+        "tests/test_api.py",
+    ]
+    assert set(again.files) >= {"pkg/core.py", "tests/test_api.py"}
+
+
+def test_run_impacted_tests_runs_selection_and_records_durations(tmp_path: Path) -> None:
+    _tree(tmp_path)
+    impact = ImpactMap(tmp_path / "cache" / "test_impact.json")
+
+    gate = run_impacted_tests(tmp_path, _changes("pkg/core.py"), impact)
+    assert gate == {"ok": True, "mode": "selected", "tests": ["tests/test_api.py"]}
+    assert set(impact.durations) == {"tests/test_api.py"}
+
+    assert run_impacted_tests(tmp_path, _changes("README.md"), impact)["mode"] == "none"
+
+    _write(tmp_path, "conftest.py", "# changed\n")
+    gate = run_impacted_tests(tmp_path, _changes("conftest.py"), impact)
+    assert gate["ok"] and gate["mode"] == "full"
+    assert set(impact.durations) == {"tests/test_api.py", "tests/test_other.py"}
+
+
+def test_tests_are_what_pytest_collects_including_colocated_ones(tmp_path: Path) -> None:
+    _tree(tmp_path)
+    _write(tmp_path, "pkg/local.py", "LOCAL = 3\n")
+    _write(tmp_path, "pkg/test_local.py", "from pkg.local import LOCAL\n\ndef test_local():\n    assert LOCAL == 3\n")
+    _write(tmp_path, "runs/demo/tests/test_copy.py", "import pkg.core\n")
+    _write(tmp_path, "pyproject.toml", '[tool.pytest.ini_options]\nnorecursedirs = ["runs"]\n')
+    impact = ImpactMap(tmp_path / "cache" / "test_impact.json")
+    impact.refresh(tmp_path)
+
+    assert impact.tests == ["pkg/test_local.py", "tests/test_api.py", "tests/test_other.py"]
+    assert impact.select(_changes("pkg/core.py")) == ["tests/test_api.py"]
+    gate = run_impacted_tests(tmp_path, _changes("pkg/local.py"), impact)
+    assert gate == {"ok": True, "mode": "selected", "tests": ["pkg/test_local.py"]}
+    assert "pkg/test_local.py" in impact.durations
+
+    _write(tmp_path, "pytest.ini", "[pytest]\ntestpaths = pkg\npython_files = test_*.py check_*.py\n")
+    _write(tmp_path, "pkg/check_core.py", "import pkg.core\n")
+    impact.refresh(tmp_path)
+    assert impact.tests == ["pkg/check_core.py", "pkg/test_local.py"]
+
+
+def test_selection_without_collected_tests_passes(tmp_path: Path) -> None:
+    _tree(tmp_path)
+    _write(tmp_path, "pytest.ini", "[pytest]\ntestpaths = pkg\n")
+    _write(tmp_path, "pkg/test_helpers.py", "import pkg.core\n\nclass TestHelper:\n    __test__ = False\n")
+    impact = ImpactMap()
+
+    gate = run_impacted_tests(tmp_path, _changes("pkg/core.py"), impact)
+    assert gate == {"ok": True, "mode": "selected", "tests": ["pkg/test_helpers.py"]}
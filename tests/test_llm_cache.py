@@ -0,0 +1,124 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from agent_factory.orchestrator.llm.adapter import OpenAICompatibleAdapter
+from agent_factory.orchestrator.llm.cache import ResponseCache
+from agent_factory.orchestrator.llm.transport import CallTiming
+
+
+class _FakeTransport:
+    def __init__(self) -> None:
+        self.calls: List[bytes] = []
+
+    def post(self, url: str, body: bytes, headers: Dict[str, str]):
+        self.calls.append(body)
+        content = json.dumps({"n": len(self.calls)})
+        data = json.dumps({"choices": [{"message": {"content": content}}]}).encode("utf-8")
+        return 200, data, CallTiming(url=url, status=200, attempts=1)
+
+
+def test_adapter_serves_repeated_calls_from_cache(tmp_path: Path) -> None:
+    transport = _FakeTransport()
+    cache = ResponseCache(tmp_path / "llm")
+    adapter = OpenAICompatibleAdapter("k", "http://x/v1", "m", transport=transport, cache=cache)
+
+    assert adapter.generate_json("sys", "user") == {"n": 1}
+    assert adapter.generate_json("sys", "user") == {"n": 1}
+    assert adapter.generate_text("sys", "other") == '{"n": 2}'
+    assert len(transport.calls) == 2
+    assert cache.stats["hits"] == 1
+
+    uncached = OpenAICompatibleAdapter("k", "http://x/v1", "m", transport=transport)
+    assert uncached.generate_json("sys", "user") == {"n": 3}
+
+
+def test_cache_ttl_and_size_eviction(tmp_path: Path) -> None:
+    cache = ResponseCache(tmp_path / "llm", ttl_s=60, max_bytes=200)
+    keys = [ResponseCache.key("u", "m", "s", str(i), {}) for i in range(4)]
+    for i, key in enumerate(keys):
+        cache.put(key, "x" * 60)
+        path = tmp_path / "llm" / key[:2] / f"{key}.json"
+        os.utime(path, (time.time() - 10 + i, time.time() - 10 + i))
+
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[-1]) == "x" * 60
+    assert cache.stats["evictions"] >= 2
+
+    # TTL counts from creation: an entry that keeps getting hits still expires.
+    old = tmp_path / "llm" / keys[-1][:2] / f"{keys[-1]}.json"
+    entry = json.loads(old.read_text(encoding="utf-8"))
+    entry["created_at"] = time.time() - 120
+    old.write_text(json.dumps(entry), encoding="utf-8")
+    assert cache.get(keys[-1]) is None
+
+
+def test_generate_json_many_keeps_request_order(tmp_path: Path) -> None:
+    class _EchoTransport(_FakeTransport):
+        def post(self, url: str, body: bytes, headers: Dict[str, str]):
+            user = json.loads(body)["messages"][1]["content"]
+            if user == "boom":
+                return 500, b"err", CallTiming(url=url, status=500, attempts=1)
+            data = json.dumps({"choices": [{"message": {"content": json.dumps({"echo": user})}}]}).encode("utf-8")
+            return 200, data, CallTiming(url=url, status=200, attempts=1)
+
+    adapter = OpenAICompatibleAdapter("k", "http://x/v1", "m", transport=_EchoTransport())
+    results = adapter.generate_json_many([("s", str(i)) for i in range(5)] + [("s", "boom")], max_concurrency=3)
+
+    assert results[:5] == [{"echo": str(i)} for i in range(5)]
+    assert isinstance(results[5], Exception)
+
+
+def test_worker_llm_cache_counters_reach_parent_stats(tmp_path: Path, monkeypatch) -> None:
+    from agent_factory.orchestrator import main
+    from agent_factory.orchestrator.llm import cache as cache_mod
+
+    monkeypatch.delenv("LLM_CACHE_BYPASS", raising=False)
+    monkeypatch.setattr(cache_mod, "_default_cache", ResponseCache(tmp_path / "llm"))
+    main._fold_cache_stats({"llm": {"hits": 4, "misses": 1}})
+    assert cache_mod.default_cache().stats["hits"] == 4
+    assert cache_mod.default_cache().stats["misses"] == 1
+
+
+def test_eviction_uses_an_index_instead_of_rescanning(tmp_path: Path, monkeypatch) -> None:
+    root = tmp_path / "llm"
+    keys = [ResponseCache.key("u", "m", "s", str(i), {}) for i in range(5)]
+    seed = ResponseCache(root)
+    for i, key in enumerate(keys[:2]):
+        seed.put(key, "x" * 60)
+        os.utime(root / key[:2] / f"{key}.json", (time.time() - 10 + i, time.time() - 10 + i))
+
+    scans = []
+    real_glob = Path.glob
+    monkeypatch.setattr(Path, "glob", lambda self, pat: scans.append(pat) or real_glob(self, pat))
+    size = (root / keys[0][:2] / f"{keys[0]}.json").stat().st_size
+    cache = ResponseCache(root, max_bytes=3 * size + 10)  # room for three entries
+    cache.put(keys[2], "x" * 60)  # seeds the index from the two existing entries
+    assert cache.get(keys[0]) is not None  # now most recently used
+    cache.put(keys[3], "x" * 60)
+    cache.put(keys[4], "x" * 60)
+
+    assert len(scans) == 1
+    assert cache.get(keys[1]) is None and cache.get(keys[2]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[4]) is not None
+
+
+def test_default_cache_is_bounded_and_failed_patches_can_be_forgotten(tmp_path: Path, monkeypatch) -> None:
+    from agent_factory.orchestrator.llm import cache as cache_mod
+
+    monkeypatch.delenv("LLM_CACHE_BYPASS", raising=False)
+    monkeypatch.delenv("LLM_CACHE_TTL_S", raising=False)
+    monkeypatch.delenv("LLM_CACHE_MAX_MB", raising=False)
+    monkeypatch.setenv("LLM_CACHE_DIR", str(tmp_path / "llm"))
+    monkeypatch.setattr(cache_mod, "_default_cache", None)
+    cache = cache_mod.default_cache()
+    assert cache.ttl_s == cache_mod.DEFAULT_TTL_S
+    assert cache.max_bytes == cache_mod.DEFAULT_MAX_MB * 1024 * 1024
+
+    transport = _FakeTransport()
+    adapter = OpenAICompatibleAdapter("k", "http://x/v1", "m", transport=transport, cache=cache)
+    assert adapter.generate_text("sys", "patch please") == '{"n": 1}'
+    adapter.forget("sys", "patch please")
+    assert adapter.generate_text("sys", "patch please") == '{"n": 2}'
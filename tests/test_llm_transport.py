@@ -0,0 +1,102 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List
+
+import pytest
+
+from agent_factory.orchestrator.llm.adapter import LLMError, OpenAICompatibleAdapter
+from agent_factory.orchestrator.llm.transport import HTTPTransport, retry_after_s
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    script: List[int] = []
+    ports: List[int] = []
+
+    def do_POST(self) -> None:  # noqa: N802
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.ports.append(self.client_address[1])
+        status = self.script.pop(0) if self.script else 200
+        if status == 0:  # slow server: answer after the client has timed out
+            time.sleep(0.5)
+            status = 200
+        body = json.dumps({"choices": [{"message": {"content": '{"ok": true}'}}]}).encode("utf-8")
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture()
+def server() -> Iterator[ThreadingHTTPServer]:
+    _Handler.script = []
+    _Handler.ports = []
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    srv.handle_error = lambda *args: None  # clients that timed out leave broken pipes behind
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _adapter(srv: ThreadingHTTPServer, **kw) -> OpenAICompatibleAdapter:
+    transport = HTTPTransport(backoff_base_s=0.001, **kw)
+    return OpenAICompatibleAdapter("k", f"http://127.0.0.1:{srv.server_address[1]}/v1", "m", transport=transport)
+
+
+def test_adapter_reuses_connection_across_calls(server: ThreadingHTTPServer) -> None:
+    adapter = _adapter(server)
+    assert adapter.generate_json("s", "u") == {"ok": True}
+    assert adapter.generate_text("s", "u") == '{"ok": true}'
+    assert len(set(_Handler.ports)) == 1
+    assert adapter.last_timing is not None and adapter.last_timing.reused_connection
+
+
+def test_adapter_retries_429_and_5xx(server: ThreadingHTTPServer) -> None:
+    _Handler.script = [429, 503]
+    adapter = _adapter(server)
+    assert adapter.generate_json("s", "u") == {"ok": True}
+    assert adapter.last_timing.attempts == 3
+
+
+def test_adapter_gives_up_after_max_retries(server: ThreadingHTTPServer) -> None:
+    _Handler.script = [500, 500]
+    adapter = _adapter(server, max_retries=1)
+    with pytest.raises(LLMError, match="HTTP 500"):
+        adapter.generate_text("s", "u")
+
+
+def test_retry_after_parses_seconds_and_dates() -> None:
+    assert retry_after_s("3") == 3.0
+    assert retry_after_s("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert retry_after_s(None) is None
+
+
+def test_timeout_on_reused_connection_is_a_counted_attempt(server: ThreadingHTTPServer) -> None:
+    adapter = _adapter(server, timeout_s=0.2, max_retries=0)
+    assert adapter.generate_json("s", "u") == {"ok": True}
+    _Handler.script = [0]
+    with pytest.raises(LLMError):
+        adapter.generate_text("s", "u")
+    # The slow request reached the server once and was not silently resent.
+    assert len(_Handler.ports) == 2
+
+
+def test_server_closed_keepalive_is_retried_for_free(server: ThreadingHTTPServer) -> None:
+    adapter = _adapter(server, max_retries=0)
+    assert adapter.generate_json("s", "u") == {"ok": True}
+    for conns in list(adapter.transport._pools.values()):
+        for conn in conns.idle:
+            conn.sock.shutdown(socket.SHUT_RDWR)  # what a keep-alive close looks like client side
+    assert adapter.generate_json("s", "u") == {"ok": True}
+    assert adapter.last_timing.attempts == 1
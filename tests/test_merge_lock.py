@@ -0,0 +1,55 @@
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from agent_factory.orchestrator.merge_lock import MergeLock
+
+
+def test_merge_lock_is_exclusive_and_records_metrics(tmp_path: Path) -> None:
+    events = []
+    lockfile = tmp_path / "locks" / "merge.lock"
+    lock = MergeLock(lockfile=lockfile, on_metrics=events.append)
+    inside = []
+
+    def worker() -> None:
+        for _ in range(20):
+            with lock:
+                inside.append(1)
+                assert len(inside) == 1
+                assert lock.holder()["pid"] == os.getpid()
+                inside.pop()
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert lock.stats["acquisitions"] == 60
+    assert len(events) == 60
+    assert {"wait_s", "hold_s"} <= set(events[0])
+    assert lock.holder() == {}
+
+
+def test_merge_lock_times_out_against_other_holder(tmp_path: Path) -> None:
+    lockfile = tmp_path / "merge.lock"
+    with MergeLock(lockfile=lockfile, fair=True):
+        other = MergeLock(lockfile=lockfile, timeout_s=0.05)
+        with pytest.raises(TimeoutError, match="held by pid"):
+            other.acquire()
+    with MergeLock(lockfile=lockfile, timeout_s=0.05, fair=True):
+        pass
+    assert not any((tmp_path / "merge.lock.queue").iterdir())
+
+
+def test_merge_lock_without_deadline_blocks_in_the_kernel(tmp_path: Path, monkeypatch) -> None:
+    from agent_factory.orchestrator import merge_lock
+
+    calls = []
+    real_flock = merge_lock.fcntl.flock
+    monkeypatch.setattr(merge_lock.fcntl, "flock", lambda fd, op: calls.append(op) or real_flock(fd, op))
+    with MergeLock(lockfile=tmp_path / "merge.lock", timeout_s=None):
+        pass
+    assert calls[0] == merge_lock.fcntl.LOCK_EX
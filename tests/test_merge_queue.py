@@ -0,0 +1,175 @@
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
+
+from agent_factory.orchestrator import rebase
+from agent_factory.orchestrator.merge_queue import MergeQueue
+
+
+def _res(*paths: str) -> Dict[str, Any]:
+    return {"changes": {"created": [], "deleted": [], "modified": list(paths)}}
+
+
+def _queue(rebase_fn, **kwargs) -> tuple:
+    merged: List[str] = []
+    done: Dict[str, str] = {}
+    events: List[Dict[str, Any]] = []
+    q = MergeQueue(
+        lambda t, r: merged.append(t["id"]),
+        rebase_fn,
+        on_done=lambda t, outcome: done.__setitem__(t["id"], outcome),
+        on_event=events.append,
+        **kwargs,
+    )
+    return q, merged, done, events
+
+
+def test_non_overlapping_results_merge_optimistically() -> None:
+    q, merged, done, _ = _queue(lambda t, r: True)
+    q.begin("a")
+    q.begin("b")
+    assert q.offer({"id": "a"}, _res("src/a.py"))
+    assert q.offer({"id": "b"}, _res("src/b.py"))
+    # c started after a merged, so a's changes are already in its base tree.
+    q.begin("c")
+    assert q.offer({"id": "c"}, _res("src/a.py"))
+    q.close()
+    assert merged == ["a", "b", "c"]
+    assert done == {"a": "merged", "b": "merged", "c": "merged"}
+    assert q.stats["rebased"] == 0
+
+
+def test_conflicting_result_is_rebased_in_background() -> None:
+    rebased = threading.Event()
+
+    def _rebase(task, res):
+        rebased.set()
+        return True
+
+    q, merged, done, events = _queue(_rebase)
+    q.begin("a")
+    q.begin("b")
+    assert q.offer({"id": "a"}, _res("src/x.py"))
+    assert not q.offer({"id": "b"}, _res("src/x.py"))
+    assert q.wait_progress()
+    q.close()
+    assert rebased.is_set()
+    assert merged == ["a", "b"]
+    assert done["b"] == "merged"
+    assert [e["event"] for e in events] == ["rebase_attempt"]
+
+
+def test_failed_rebase_is_requeued_until_retries_run_out() -> None:
+    attempts: List[str] = []
+
+    def _rebase(task, res):
+        attempts.append(task["id"])
+        if len(attempts) == 1:
+            # The tree moves on while the first rebase runs, so a retry is worthwhile.
+            q.begin("c")
+            q.offer({"id": "c"}, _res("src/other.py"))
+            return False
+        raise RuntimeError("gates failed")
+
+    q, merged, done, events = _queue(_rebase, max_retries=2)
+    q.begin("a")
+    q.begin("b")
+    q.offer({"id": "a"}, _res("src/x.py"))
+    q.offer({"id": "b"}, _res("src/x.py"))
+    q.close()
+    assert attempts == ["b", "b"]
+    assert done == {"a": "merged", "c": "merged", "b": "blocked"}
+    kinds = [e["event"] for e in events]
+    assert kinds == ["rebase_attempt", "merge_requeued", "rebase_attempt", "merge_blocked_overlap"]
+    assert events[2]["error"] == "gates failed"
+
+
+def test_stalled_result_is_blocked_when_nothing_can_change_the_tree() -> None:
+    q, merged, done, events = _queue(lambda t, r: False, max_retries=5)
+    q.begin("a")
+    q.begin("b")
+    q.offer({"id": "a"}, _res("src/x.py"))
+    q.offer({"id": "b"}, _res("src/x.py"))
+    assert q.wait_progress()
+    assert not q.wait_progress()
+    q.close()
+    assert done["b"] == "blocked"
+    assert q.stats["rebased"] == 1
+
+
+def test_rebase_reads_patches_before_recreating_sandbox(tmp_path: Path, monkeypatch) -> None:
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "app.py").write_text("x = 1\n", encoding="utf-8")
+    sandbox = tmp_path / "sandbox"
+    art = sandbox / "artifacts"
+    art.mkdir(parents=True)
+    (art / "tests.diff").write_text("", encoding="utf-8")
+    (art / "code.diff").write_text(
+        "--- a/app.py\n+++ b/app.py\n@@ -1 +1 @@\n-x = 1\n+x = 2\n", encoding="utf-8"
+    )
+    applied: List[str] = []
+    monkeypatch.setattr(rebase, "apply_patch", lambda root, text: applied.append(text))
+    monkeypatch.setattr(rebase, "rerun_gates_in_sandbox", lambda sb, *rest: True)
+
+    assert rebase.rebase_and_reapply(repo, sandbox, str(art / "tests.diff"), str(art / "code.diff"))
+    assert (sandbox / "app.py").exists()
+    assert not art.exists()
+    assert applied[1].endswith("+x = 2\n")
+
+
+def test_callback_errors_do_not_stop_the_worker() -> None:
+    def _boom(*args):
+        raise RuntimeError("log sink down")
+
+    q = MergeQueue(lambda t, r: None, lambda t, r: True, on_done=_boom, on_event=_boom)
+    q.begin("a")
+    q.begin("b")
+    q.offer({"id": "a"}, _res("src/x.py"))
+    q.offer({"id": "b"}, _res("src/x.py"))
+    assert q.wait_progress()
+    q.close()
+    assert q.stats["merged"] == 2
+    assert q.stats["callback_errors"] >= 3
+
+
+def test_rebase_recreates_sandbox_under_merge_lock(tmp_path: Path, monkeypatch) -> None:
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    sandbox = tmp_path / "sandbox"
+    sandbox.mkdir()
+    diff = tmp_path / "empty.diff"
+    diff.write_text("", encoding="utf-8")
+    lock = threading.Lock()
+    held = []
+    real_recreate = rebase.recreate_sandbox_from_repo
+
+    def recreate(*args, **kwargs):
+        held.append(lock.locked())
+        real_recreate(*args, **kwargs)
+
+    monkeypatch.setattr(rebase, "recreate_sandbox_from_repo", recreate)
+    monkeypatch.setattr(rebase, "apply_patch", lambda root, text: None)
+    monkeypatch.setattr(rebase, "rerun_gates_in_sandbox", lambda sb, *rest: not lock.locked())
+
+    assert rebase.rebase_and_reapply(repo, sandbox, str(diff), str(diff), lock=lock)
+    assert held == [True]
+
+
+def test_failed_fast_path_merge_is_reported_as_blocked() -> None:
+    done: Dict[str, str] = {}
+    events: List[Dict[str, Any]] = []
+
+    def merge(task: Dict[str, Any], res: Dict[str, Any]) -> None:
+        if task["id"] == "a":
+            raise OSError("disk full")
+
+    q = MergeQueue(merge, lambda t, r: True, on_done=lambda t, o: done.__setitem__(t["id"], o), on_event=events.append)
+    q.begin("a")
+    q.begin("b")
+    assert not q.offer({"id": "a"}, _res("src/a.py"))
+    assert q.offer({"id": "b"}, _res("src/a.py"))  # a never merged, so b does not overlap
+    q.close()
+    assert done == {"a": "blocked", "b": "merged"}
+    assert q.stats["blocked"] == 1 and q.stats["merged"] == 1
+    assert events == [{"task": "a", "event": "merge_blocked_overlap", "attempt": 0, "note": "Merge failed: disk full"}]
@@ -0,0 +1,196 @@
+import os
+from typing import Any, Dict
+
+from agent_factory.orchestrator.pool_process import PathTrie, run_batches, schedule_batches
+
+
+def _echo(args: Dict[str, Any]) -> Dict[str, Any]:
+    return {"task": args["id"], "status": "done"}
+
+
+def test_run_batches_serializes_results_and_respects_admission() -> None:
+    a = {"id": "a"}
+    b = {"id": "b", "depends_on": ["a"]}
+    c = {"id": "c"}
+    finished = []
+
+    def admit(task: Dict[str, Any]) -> bool:
+        return all(dep in finished for dep in task.get("depends_on", []))
+
+    results = run_batches(
+        [[b, c], [a]],
+        _echo,
+        lambda t: {"id": t["id"]},
+        max_workers=2,
+        admit=admit,
+        on_result=lambda t, res: finished.append(res["task"]),
+    )
+
+    assert sorted(r.task_id for r in results) == ["a", "b", "c"]
+    assert finished.index("a") < finished.index("b")
+
+
+_INIT_CALLS = []
+
+
+def _init(tag: str) -> None:
+    _INIT_CALLS.append(tag)
+
+
+def _report_init(args: Dict[str, Any]) -> Dict[str, Any]:
+    return {"task": args["id"], "pid": os.getpid(), "inits": list(_INIT_CALLS)}
+
+
+def test_run_batches_initializer_runs_once_per_worker() -> None:
+    tasks = [{"id": str(i)} for i in range(6)]
+    seen = {}
+
+    run_batches(
+        [tasks],
+        _report_init,
+        lambda t: {"id": t["id"]},
+        max_workers=2,
+        initializer=_init,
+        initargs=("warm",),
+        on_result=lambda t, res: seen.setdefault(res["pid"], []).append(res["inits"]),
+    )
+
+    assert sum(len(v) for v in seen.values()) == 6
+    for inits in seen.values():
+        assert all(i == ["warm"] for i in inits)
+
+
+def test_warm_worker_runs_lightweight_messages(tmp_path, monkeypatch) -> None:
+    from agent_factory.orchestrator import worker
+    from agent_factory.orchestrator.state_store import StateStore
+
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    runs_dir = tmp_path / "runs"
+    StateStore(base_path=runs_dir).init_run("demo", "prompt", "web_fullstack", {"sandbox": {"backend": "copy"}})
+    monkeypatch.setattr(worker, "_AGENT", None)
+
+    worker.init_implementer_worker(str(tmp_path), str(runs_dir), "demo", "web_fullstack")
+    agent = worker._AGENT
+    assert agent is not None and agent._project == "demo"
+
+    res = worker.implement_task_worker({"task": {"id": "T1", "description": "x"}, "stack": "docs"})
+    assert res["status"] == "skipped" and res["task"] == "T1"
+    assert set(res["cache_stats"]) == {"llm", "retrieval"}
+    assert worker._AGENT is agent and agent.stack == "docs"
+
+
+def test_path_trie_treats_prefixes_as_overlaps() -> None:
+    trie = PathTrie()
+    trie.add("tests/")
+    assert trie.overlaps("tests/unit/x.py")
+    assert trie.overlaps("tests")
+    assert not trie.overlaps("test_utils.py")
+
+    trie = PathTrie()
+    trie.add("src/app/models.py")
+    assert trie.overlaps("src/")
+    assert not trie.overlaps("src/app/views.py")
+
+    trie.add(".")
+    assert trie.overlaps("anything")
+
+
+def test_schedule_batches_separates_overlapping_paths_and_respects_dependencies() -> None:
+    tasks = [
+        {"id": "a", "touch_hints": ["tests/"]},
+        {"id": "b", "touch_hints": ["tests/unit/x.py"]},
+        {"id": "c", "touch_hints": ["docs/"]},
+        {"id": "d", "touch_hints": ["src/"], "depends_on": ["c"]},
+        {"id": "e"},
+        {"id": "f", "touch_hints": ["src/lib.py"], "depends_on": ["missing"]},
+    ]
+    batches = [[t["id"] for t in b] for b in schedule_batches(tasks)]
+    assert batches == [["a", "c", "e", "f"], ["b", "d"]]
+
+
+def test_run_batches_waits_on_idle_hook_for_admission() -> None:
+    a = {"id": "a"}
+    b = {"id": "b", "depends_on": ["a"]}
+    merged = []
+    queued = []
+
+    def on_idle() -> bool:
+        # Stands in for a merge queue finishing "a" in the background.
+        if not queued:
+            return False
+        merged.append(queued.pop())
+        return True
+
+    results = run_batches(
+        [[a, b]],
+        _echo,
+        lambda t: {"id": t["id"]},
+        max_workers=2,
+        admit=lambda t: all(d in merged for d in t.get("depends_on", [])),
+        on_result=lambda t, res: queued.append(res["task"]) if t is a else merged.append(res["task"]),
+        on_idle=on_idle,
+    )
+
+    assert [r.task_id for r in results] == ["a", "b"]
+    assert merged == ["a", "b"]
+
+
+def test_worker_cache_stats_are_folded_into_parent_counters() -> None:
+    from pathlib import Path
+
+    from agent_factory.orchestrator import main
+    from orchestrator.vault.cache import retrieval_cache
+    from orchestrator.vault.vault import Vault
+
+    cache = retrieval_cache(Vault(Path(main.__file__).resolve().parents[2] / "knowledge"))
+    before = dict(cache.stats)
+    main._fold_cache_stats({"retrieval": {"disk_hits": 3, "misses": 1}, "llm": {"hits": 2}})
+    assert cache.stats["disk_hits"] == before["disk_hits"] + 3
+    assert cache.stats["misses"] == before["misses"] + 1
+
+
+def test_dependents_of_failed_tasks_get_an_explicit_status() -> None:
+    from agent_factory.orchestrator import main
+
+    tasks = [
+        {"id": "a"},
+        {"id": "b"},
+        {"id": "c", "depends_on": ["a"]},
+        {"id": "d", "depends_on": ["c", "b"]},
+        {"id": "e", "depends_on": ["b"]},
+        {"id": "f"},
+    ]
+    status_by_id = {"a": "failed", "b": "done", "e": "done"}
+    records = main._skip_failed_dependents(tasks, status_by_id)
+
+    assert records == [
+        {"task": "c", "failed_dependencies": ["a"]},
+        {"task": "d", "failed_dependencies": ["c"]},
+    ]
+    assert [t.get("status") for t in tasks] == [None, None, "dependency_failed", "dependency_failed", None, None]
+
+
+def test_carried_task_is_repartitioned_against_the_next_batch() -> None:
+    a = {"id": "a", "touch_hints": ["src/a.py"]}
+    b = {"id": "b", "touch_hints": ["src/shared/"]}
+    c = {"id": "c", "touch_hints": ["src/shared/x.py"]}
+    allow_b = []
+    log = []
+
+    def on_idle() -> bool:
+        allow_b.append(True)  # b becomes admissible only after its batch gave up on it
+        return False
+
+    run_batches(
+        [[a, b], [c]],
+        _echo,
+        lambda t: {"id": t["id"]},
+        max_workers=2,
+        admit=lambda t: t is not b or bool(allow_b),
+        on_submit=lambda t: log.append(("start", t["id"])),
+        on_result=lambda t, res: log.append(("end", t["id"])),
+        on_idle=on_idle,
+    )
+
+    assert log.index(("end", "b")) < log.index(("start", "c"))  # b and c overlap, so never together
+    assert {entry[1] for entry in log} == {"a", "b", "c"}
@@ -0,0 +1,83 @@
+import json
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from agent_factory.agents.qa_agent import QAAgent
+from agent_factory.orchestrator.state_store import StateStore
+
+
+def _agent(tmp_path: Path, checks, max_workers: int = 4) -> QAAgent:
+    store = StateStore(base_path=tmp_path / "runs")
+    config = {"stack_root": str(tmp_path / "stacks"), "qa": {"max_workers": max_workers}}
+    run_dir = store.init_run("demo", "prompt", "demo", config)
+    agent = QAAgent(run_dir, "demo", store, dry_run=False)
+    agent._load_checks = lambda: checks  # type: ignore[method-assign]
+    return agent
+
+
+def _report(agent: QAAgent) -> dict:
+    results = json.loads((agent.run_dir / "reports" / "qa_report.json").read_text(encoding="utf-8"))["results"]
+    return {r["name"]: r for r in results}
+
+
+def _timed(path: Path, seconds: float = 0.0) -> list:
+    """A gate that sleeps and writes its start and end time to path."""
+    code = (
+        "import pathlib, sys, time; start = time.time(); time.sleep(float(sys.argv[2])); "
+        "pathlib.Path(sys.argv[1]).write_text(f'{start} {time.time()}')"
+    )
+    return [sys.executable, "-c", code, str(path), str(seconds)]
+
+
+def _span(path: Path) -> tuple:
+    start, end = path.read_text(encoding="utf-8").split()
+    return float(start), float(end)
+
+
+def test_independent_gates_run_concurrently_and_dependencies_are_respected(tmp_path: Path) -> None:
+    checks = [
+        {"name": "a", "cmd": _timed(tmp_path / "a.txt", 0.5), "max_attempts": 1},
+        {"name": "b", "cmd": _timed(tmp_path / "b.txt", 0.5), "max_attempts": 1},
+        {"name": "fails", "cmd": [sys.executable, "-c", "raise SystemExit(1)"], "max_attempts": 1},
+        {"name": "after_ab", "cmd": _timed(tmp_path / "after_ab.txt"), "depends_on": ["a", "b"]},
+        {"name": "after_fail", "cmd": [sys.executable, "-c", "pass"], "depends_on": ["fails"]},
+    ]
+    agent = _agent(tmp_path, checks)
+    agent.run_suite()
+    a, b, after = _span(tmp_path / "a.txt"), _span(tmp_path / "b.txt"), _span(tmp_path / "after_ab.txt")
+    assert a[0] < b[1] and b[0] < a[1]  # a and b overlapped
+    assert after[0] >= max(a[1], b[1])
+
+    results = _report(agent)
+    assert list(results) == ["a", "b", "fails", "after_ab", "after_fail"]
+    assert results["after_ab"]["status"] == "pass"
+    assert results["fails"]["status"] == "failed"
+    assert results["after_fail"]["status"] == "skipped"
+    assert "fails" in results["after_fail"]["details"]
+
+
+def test_pytest_gate_is_sharded_by_file_with_merged_report(tmp_path: Path) -> None:
+    project = tmp_path / "project"
+    (project / "tests").mkdir(parents=True)
+    (project / "conftest.py").write_text("", encoding="utf-8")
+    for name in ["a", "b", "c"]:
+        (project / "tests" / f"test_{name}.py").write_text(f"def test_{name}():\n    assert True\n", encoding="utf-8")
+    (project / "tools").mkdir()
+    (project / "tools" / "test_runner.py").write_text("class TestRunner:\n    __test__ = False\n", encoding="utf-8")
+    (project / "pkg").mkdir()
+    (project / "pkg" / "test_local.py").write_text("def test_local():\n    assert True\n", encoding="utf-8")
+    checks = [{"name": "pytest", "cmd": ["pytest", "-q"], "cwd": str(project), "max_attempts": 1, "shards": 2}]
+    agent = _agent(tmp_path, checks)
+    agent.run_suite()
+
+    result = _report(agent)["pytest"]
+    assert result["status"] == "pass"
+    assert [sh["name"] for sh in result["shards"]] == ["pytest[1/2]", "pytest[2/2]"]
+    sharded = [c for sh in result["shards"] for c in sh["command"].split() if c.endswith(".py")]
+    assert sorted(sharded) == ["pkg/test_local.py", "tests/test_a.py", "tests/test_b.py", "tests/test_c.py"]
+
+    merged = ET.parse(result["junit"]).getroot()
+    assert len(list(merged.iter("testcase"))) == 4
+    durations = json.loads((agent.run_dir / "cache" / "test_impact.json").read_text(encoding="utf-8"))["durations"]
+    assert set(durations) == {"pkg/test_local.py", "tests/test_a.py", "tests/test_b.py", "tests/test_c.py"}
@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from agent_factory.orchestrator.router import TaskRouter
+from agent_factory.orchestrator.task_graph import Task
+
+
+def _task(tid: str, *deps: str) -> Task:
+    return Task(id=tid, description=tid, owner="test", expected_output="", depends_on=list(deps))
+
+
+def test_concurrent_router_runs_independent_stages_together() -> None:
+    tasks = [_task("scaffold"), _task("implement", "scaffold"), _task("qa", "scaffold"), _task("docs", "qa")]
+    barrier = threading.Barrier(2, timeout=5)
+    order = []
+
+    def runner(task: Task) -> None:
+        if task.id in ("implement", "qa"):
+            barrier.wait()
+        order.append(task.id)
+
+    TaskRouter(tasks, max_workers=2).run(runner)
+    assert order[0] == "scaffold"
+    assert order.index("docs") > order.index("qa")
+    assert all(t.status == "completed" for t in tasks)
+
+
+def test_continue_policy_skips_dependents_of_failed_task() -> None:
+    tasks = [_task("a"), _task("b", "a"), _task("c")]
+    ran = []
+
+    def runner(task: Task) -> None:
+        if task.id == "a":
+            raise ValueError("boom")
+        ran.append(task.id)
+
+    with pytest.raises(RuntimeError, match="skipped dependents: \\['b'\\]"):
+        TaskRouter(tasks, max_workers=2, on_error="continue").run(runner)
+    assert ran == ["c"]
+
+
+def test_router_reports_cycles() -> None:
+    with pytest.raises(RuntimeError, match="Circular"):
+        TaskRouter([_task("a", "b"), _task("b", "a")]).run(lambda t: None)
+
+
+def test_default_release_chain_waits_for_implementation() -> None:
+    from agent_factory.orchestrator.task_graph import build_default_tasks
+
+    deps = {t.id: set(t.depends_on) for t in build_default_tasks("demo")}
+
+    def upstream(tid: str) -> set:
+        out = set()
+        for d in deps[tid]:
+            out |= {d} | upstream(d)
+        return out
+
+    for stage in ("docs", "release"):
+        assert "implement" in upstream(stage)
+    assert "implement" not in upstream("qa")
+
+
+def test_default_pipeline_runs_qa_alongside_implementation() -> None:
+    from pathlib import Path
+
+    import yaml
+
+    from agent_factory.orchestrator.task_graph import build_default_tasks
+
+    config = yaml.safe_load((Path(__file__).resolve().parents[1] / "config.yaml").read_text(encoding="utf-8"))
+    barrier = threading.Barrier(2, timeout=5)
+    ran = []
+
+    def runner(task: Task) -> None:
+        if task.id in ("implement", "qa"):
+            barrier.wait()  # both must be running at once, or this times out
+        ran.append(task.id)
+
+    TaskRouter(build_default_tasks("demo"), max_workers=int(config["router"]["max_workers"])).run(runner)
+    assert ran.index("docs") > max(ran.index("implement"), ran.index("qa"))
@@ -0,0 +1,102 @@
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from agent_factory.orchestrator.patching import discard, rollback, snapshot
+from agent_factory.orchestrator.sandbox import create_sandbox, get_backend, merge_sandbox
+
+
+def _repo(tmp_path: Path) -> Path:
+    repo = tmp_path / "repo"
+    (repo / "src").mkdir(parents=True)
+    (repo / "src" / "app.py").write_text("x = 1\n", encoding="utf-8")
+    (repo / "README.md").write_text("hi\n", encoding="utf-8")
+    return repo
+
+
+@pytest.mark.parametrize("backend", ["copy", "hardlink", "reflink"])
+def test_backends_materialize_and_merge_without_touching_shared_inodes(tmp_path: Path, backend: str) -> None:
+    repo = _repo(tmp_path)
+    first = create_sandbox(repo, "p", "T1", backend=backend)
+    second = create_sandbox(repo, "p", "T2", backend=backend)
+    assert (first / "src" / "app.py").read_text(encoding="utf-8") == "x = 1\n"
+    assert not (first / "runs").exists()
+
+    edited = first / "src" / "app.py"
+    edited.unlink()
+    edited.write_text("x = 2\n", encoding="utf-8")
+    merge_sandbox(repo, first)
+
+    assert (repo / "src" / "app.py").read_text(encoding="utf-8") == "x = 2\n"
+    assert (second / "src" / "app.py").read_text(encoding="utf-8") == "x = 1\n"
+
+
+def test_snapshot_rollback_with_hardlinks(tmp_path: Path) -> None:
+    repo = _repo(tmp_path)
+    snap = snapshot(repo, "hardlink")
+    (repo / "README.md").unlink()
+    (repo / "new.txt").write_text("n", encoding="utf-8")
+    rollback(snap, repo, "hardlink")
+    assert (repo / "README.md").read_text(encoding="utf-8") == "hi\n"
+    assert not (repo / "new.txt").exists()
+
+
+def test_worktree_backend_includes_uncommitted_changes(tmp_path: Path) -> None:
+    repo = _repo(tmp_path)
+    git = ["git", "-c", "user.name=t", "-c", "user.email=t@t"]
+    subprocess.run(git + ["init", "-q"], cwd=repo, check=True)
+    subprocess.run(git + ["add", "-A"], cwd=repo, check=True)
+    subprocess.run(git + ["commit", "-qm", "init"], cwd=repo, check=True)
+    (repo / "src" / "app.py").write_text("x = 3\n", encoding="utf-8")
+    (repo / "README.md").unlink()
+    (repo / ".gitignore").write_text("knowledge/\nruns/\n", encoding="utf-8")
+    (repo / "knowledge").mkdir()
+    (repo / "knowledge" / "note.md").write_text("vault\n", encoding="utf-8")
+
+    sandbox = create_sandbox(repo, "p", "T1", backend="worktree")
+    assert (sandbox / "src" / "app.py").read_text(encoding="utf-8") == "x = 3\n"
+    assert not (sandbox / "README.md").exists()
+    # Gitignored files are there as with the copy backend; ignored dirs are not.
+    assert (sandbox / "knowledge" / "note.md").read_text(encoding="utf-8") == "vault\n"
+    assert not (sandbox / "runs").exists()
+
+    get_backend("worktree").remove(sandbox)
+    assert not sandbox.exists()
+
+
+def test_unknown_backend_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        get_backend("overlay")
+
+
+def test_manifest_merge_copies_only_changes_and_applies_deletions(tmp_path: Path) -> None:
+    repo = _repo(tmp_path)
+    sandbox = create_sandbox(repo, "p", "T1", backend="copy")
+    (sandbox / "src" / "app.py").write_text("x = 5\n", encoding="utf-8")
+    (sandbox / "src" / "new.py").write_text("y = 1\n", encoding="utf-8")
+    (sandbox / "README.md").unlink()
+    (sandbox / "stray.txt").write_text("not in manifest", encoding="utf-8")
+
+    changes = {"created": ["src/new.py"], "modified": ["src/app.py"], "deleted": ["README.md"]}
+    stats = merge_sandbox(repo, sandbox, changes)
+
+    assert stats == {"copied": 2, "deleted": 1, "bytes": 12}
+    assert (repo / "src" / "app.py").read_text(encoding="utf-8") == "x = 5\n"
+    assert (repo / "src" / "new.py").exists()
+    assert not (repo / "README.md").exists()
+    assert not (repo / "stray.txt").exists()
+    assert not list(repo.rglob("*.tmp"))
+
+
+def test_snapshot_under_base_dir_is_discarded(tmp_path: Path) -> None:
+    repo = _repo(tmp_path)
+    base = tmp_path / "runs" / "demo" / "snapshots"
+    snap = snapshot(repo, "hardlink", base=base)
+    assert snap.parent == base
+    assert (snap / "repo" / "README.md").exists()
+
+    discard(snap, "hardlink")
+    assert not snap.exists()
+    assert not list(base.iterdir())
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith(".agent-factory-snap-")] == []
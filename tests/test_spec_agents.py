@@ -0,0 +1,113 @@
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from agent_factory.agents.director_agent import DirectorAgent
+from agent_factory.agents.spec_agent import SpecAgent
+from agent_factory.orchestrator.llm.adapter import OpenAICompatibleAdapter
+from agent_factory.orchestrator.llm.transport import CallTiming
+from agent_factory.orchestrator.state_store import StateStore
+
+
+class _StubTransport:
+    """
+    Answers with reply(user_prompt), or a 500 when it returns None. Later
+    requests finish first, and the peak number of calls in flight is recorded.
+    """
+
+    def __init__(self, reply, delays: List[float]) -> None:
+        self.reply = reply
+        self.delays = list(delays)
+        self.inflight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def post(self, url: str, body: bytes, headers: Dict[str, str]):
+        with self._lock:
+            self.inflight += 1
+            self.peak = max(self.peak, self.inflight)
+            delay = self.delays.pop(0) if self.delays else 0.0
+        try:
+            time.sleep(delay)
+            content = self.reply(json.loads(body)["messages"][1]["content"])
+        finally:
+            with self._lock:
+                self.inflight -= 1
+        if content is None:
+            return 500, b"err", CallTiming(url=url, status=500, attempts=1)
+        data = json.dumps({"choices": [{"message": {"content": json.dumps(content)}}]}).encode("utf-8")
+        return 200, data, CallTiming(url=url, status=200, attempts=1)
+
+
+def _use_stub(monkeypatch, transport: _StubTransport) -> None:
+    monkeypatch.setenv("OPENAI_API_KEY", "k")
+    monkeypatch.setenv("OPENAI_MAX_CONCURRENCY", "2")
+    monkeypatch.setattr(
+        OpenAICompatibleAdapter,
+        "from_env",
+        classmethod(lambda cls: cls("k", "http://x/v1", "m", transport=transport)),
+    )
+
+
+def _run_dir(tmp_path: Path) -> tuple:
+    store = StateStore(base_path=tmp_path / "runs")
+    return store.init_run("demo", "prompt", "demo", {}), store
+
+
+def test_generate_json_many_bounds_concurrency(tmp_path: Path) -> None:
+    transport = _StubTransport(lambda user: {"echo": user}, delays=[0.2, 0.15, 0.1, 0.05, 0.0])
+    adapter = OpenAICompatibleAdapter("k", "http://x/v1", "m", transport=transport)
+
+    results = adapter.generate_json_many([("s", str(i)) for i in range(5)], max_concurrency=2)
+
+    assert results == [{"echo": str(i)} for i in range(5)]
+    assert transport.peak == 2
+
+
+def test_director_run_many_keeps_spec_order_and_falls_back_per_item(tmp_path: Path, monkeypatch) -> None:
+    def reply(user: str):
+        spec = json.loads(user)["spec"]
+        if spec["module"] == "bad":
+            return None
+        return {"domain": spec["domain"], "module": f"{spec['module']}-llm"}
+
+    transport = _StubTransport(reply, delays=[0.15, 0.1, 0.05, 0.0])
+    _use_stub(monkeypatch, transport)
+    run_dir, store = _run_dir(tmp_path)
+    specs = [{"domain": "core", "module": m} for m in ["a", "b", "bad", "c"]]
+
+    outs = DirectorAgent(run_dir, Path(__file__).resolve().parents[1], store).run_many({"title": "x"}, specs)
+
+    assert [o["module"] for o in outs] == ["a-llm", "b-llm", "bad", "c-llm"]
+    assert outs[2] == DirectorAgent._default(specs[2])
+    assert transport.peak == 2
+
+
+def test_spec_agent_keeps_module_order_and_falls_back_per_item(tmp_path: Path, monkeypatch) -> None:
+    def reply(user: str):
+        req = json.loads(user)
+        if req["module"] == "bad":
+            return None
+        return {
+            "domain": req["domain"],
+            "module": req["module"],
+            "overview": f"llm {req['module']}",
+            "interfaces": [],
+            "data_models": [],
+            "constraints": [],
+            "acceptance_tests": ["passes"],
+        }
+
+    transport = _StubTransport(reply, delays=[0.15, 0.1, 0.05, 0.0])
+    _use_stub(monkeypatch, transport)
+    run_dir, store = _run_dir(tmp_path)
+    modules = [("core", "a"), ("core", "bad"), ("ui", "b"), ("ui", "c")]
+
+    specs = SpecAgent(run_dir, "web_fullstack", store, {}).run({"title": "x"}, modules)
+
+    assert [(s["domain"], s["module"]) for s in specs] == modules
+    assert [s["overview"] for s in specs] == ["llm a", "core.bad module.", "llm b", "llm c"]
+    assert json.loads((run_dir / "specs" / "ui" / "c.json").read_text(encoding="utf-8"))["overview"] == "llm c"
+    assert transport.peak == 2
@@ -0,0 +1,68 @@
+import gc
+import json
+import threading
+import time
+from pathlib import Path
+
+from agent_factory.orchestrator.state_store import StateStore
+
+
+def test_append_jsonl_keeps_every_line_under_concurrency(tmp_path: Path) -> None:
+    store = StateStore(tmp_path)
+    run_dir = tmp_path / "run"
+
+    def writer(n: int) -> None:
+        for i in range(200):
+            store.append_jsonl(run_dir, "logs/dispatch.jsonl", {"writer": n, "i": i})
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    store.close()
+
+    lines = (run_dir / "logs" / "dispatch.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 800
+    assert all(json.loads(line)["i"] >= 0 for line in lines)
+
+
+def test_buffered_log_flushes_on_size_and_close(tmp_path: Path) -> None:
+    store = StateStore(tmp_path, log_buffer_bytes=64)
+    run_dir = tmp_path / "run"
+    log_path = run_dir / "logs" / "fixer.jsonl"
+
+    store.append_fixer_log(run_dir, {"n": 1})
+    assert not log_path.exists()
+    store.append_fixer_log(run_dir, {"pad": "x" * 64})
+    assert len(log_path.read_text(encoding="utf-8").splitlines()) == 2
+
+    store.append_fixer_log(run_dir, {"n": 3})
+    store.close()
+    assert len(log_path.read_text(encoding="utf-8").splitlines()) == 3
+
+
+def test_quiet_buffered_log_is_flushed_by_timer(tmp_path: Path) -> None:
+    store = StateStore(tmp_path, log_buffer_bytes=1 << 20, log_flush_interval_s=0.05)
+    log_path = tmp_path / "run" / "logs" / "pool.jsonl"
+    store.append_jsonl(tmp_path / "run", "logs/pool.jsonl", {"n": 1})
+    assert not log_path.exists()
+
+    deadline = time.monotonic() + 5
+    while not log_path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert log_path.read_text(encoding="utf-8").splitlines() == ['{"n": 1}']
+    store.close()
+
+
+def test_unclosed_store_releases_logs_when_collected(tmp_path: Path) -> None:
+    log_path = tmp_path / "run" / "logs" / "pool.jsonl"
+    with StateStore(tmp_path) as store:
+        store.append_jsonl(tmp_path / "run", "logs/pool.jsonl", {"n": 1})
+    assert store._log_fds == {}
+
+    store = StateStore(tmp_path, log_buffer_bytes=1 << 20)
+    store.append_jsonl(tmp_path / "run", "logs/pool.jsonl", {"n": 2})
+    del store
+    gc.collect()
+    assert len(log_path.read_text(encoding="utf-8").splitlines()) == 2
@@ -1,6 +1,17 @@
 from pathlib import Path
 
-from orchestrator.vault import RetrievedDoc, Vault, add_local_file, add_note, rebuild_index, retrieve
+from orchestrator.vault import (
+    RetrievedDoc,
+    Vault,
+    add_local_file,
+    add_local_files,
+    add_note,
+    compact_index,
+    rebuild_index,
+    retrieve,
+    update_index,
+)
+from orchestrator.vault.segments import IndexReader
 
 
 def test_ingest_and_retrieve_builds_index(tmp_path: Path) -> None:
@@ -27,7 +38,10 @@ def test_ingest_and_retrieve_builds_index(tmp_path: Path) -> None:
     assert any(r.id == note["id"] for r in tag_results)
 
 
-def test_retrieve_uses_cache_when_available(tmp_path: Path) -> None:
+def test_retrieve_uses_cache_when_available(tmp_path: Path, monkeypatch) -> None:
+    from orchestrator.vault import retrieval
+    from orchestrator.vault.cache import retrieval_cache
+
     vault = Vault(tmp_path / "vault")
     add_note(vault, "Cache Test", "Caching retrieval responses for later reuse.", ["cache"])
     rebuild_index(vault)
@@ -36,11 +50,86 @@ def test_retrieve_uses_cache_when_available(tmp_path: Path) -> None:
     assert first
     assert isinstance(first[0], RetrievedDoc)
 
-    inverted = vault.inverted_path
-    inverted.write_text("{}", encoding="utf-8")
+    def _no_scoring(*args, **kwargs):
+        raise AssertionError("cache miss")
+
+    monkeypatch.setattr(retrieval, "bm25_scores", _no_scoring)
     cached = retrieve(vault, "caching", tags=["cache"])
     assert [r.id for r in cached] == [r.id for r in first]
-    assert any(vault.cache_dir.glob("*.json"))
+    cache = retrieval_cache(vault)
+    cache.clear_memory()
+    from_disk = retrieve(vault, "caching", tags=["cache"])
+    assert [r.id for r in from_disk] == [r.id for r in first]
+    assert cache.stats["memory_hits"] == 1 and cache.stats["disk_hits"] == 1
+    assert cache.hit_rate == 2 / 3
+    assert (vault.cache_dir / "retrieval.sqlite3").exists()
+
+    # A new index generation invalidates cached results.
+    monkeypatch.undo()
+    newer = add_note(vault, "Cache Test 2", "Caching caching caching.", ["cache"])
+    update_index(vault)
+    assert newer["id"] in {r.id for r in retrieve(vault, "caching", tags=["cache"])}
+
+
+def test_retrieve_parses_manifest_once_per_version(tmp_path: Path, monkeypatch) -> None:
+    vault = Vault(tmp_path / "vault")
+    add_note(vault, "Manifest", "Parsing the manifest once per version.", ["m"])
+    rebuild_index(vault)
+    loads = []
+    real_load = Vault.load_manifest
+    monkeypatch.setattr(Vault, "load_manifest", lambda self: loads.append(1) or real_load(self))
+
+    for q in ["parsing", "manifest", "version"]:
+        assert retrieve(vault, q)
+    assert len(loads) == 1
+
+    newer = add_note(vault, "Manifest 2", "Parsing again after an update.", ["m"])
+    update_index(vault)
+    loads.clear()
+    assert newer["id"] in {r.id for r in retrieve(vault, "again")}
+    assert len(loads) == 1
+
+
+def test_retrieval_cache_evicts_by_size_and_age(tmp_path: Path) -> None:
+    from orchestrator.vault.cache import RetrievalCache
+
+    cache = RetrievalCache(tmp_path / "r.sqlite3", max_memory_entries=1, max_bytes=200, ttl_s=None, sweep_every=1000)
+    for i in range(5):
+        cache.put(f"k{i}", [{"id": str(i), "snippet": "x" * 50}])
+    assert cache.sweep() >= 3
+    cache.clear_memory()
+    assert cache.get("k0") is None and cache.get("k4") is not None
+
+    cache.ttl_s = 0.0
+    assert cache.sweep() >= 1
+    cache.clear_memory()
+    assert cache.get("k4") is None
+
+
+def test_retrieval_cache_sets_up_schema_once_per_process(tmp_path: Path, monkeypatch) -> None:
+    import sqlite3
+
+    from orchestrator.vault.cache import RetrievalCache
+
+    statements = []
+    real_connect = sqlite3.connect
+
+    def traced(*args, **kwargs):
+        db = real_connect(*args, **kwargs)
+        db.set_trace_callback(statements.append)
+        return db
+
+    monkeypatch.setattr(sqlite3, "connect", traced)
+    cache = RetrievalCache(tmp_path / "r.sqlite3")
+    for i in range(3):
+        cache.put(f"k{i}", [{"id": str(i)}])
+        cache.clear_memory()
+        assert cache.get(f"k{i}") == [{"id": str(i)}]
+    assert sum("CREATE TABLE" in st for st in statements) == 1
+
+    (tmp_path / "r.sqlite3").unlink()
+    cache.put("k", [])
+    assert sum("CREATE TABLE" in st for st in statements) == 2
 
 
 def test_vault_ingest_index_retrieve(tmp_path: Path) -> None:
@@ -51,3 +140,169 @@ def test_vault_ingest_index_retrieve(tmp_path: Path) -> None:
     hits = retrieve(vault, "scene graph renderer", top_k=3)
     assert len(hits) >= 1
     assert hits[0].id
+
+
+def test_bm25_ranks_rare_terms_and_filters_tags(tmp_path: Path) -> None:
+    vault = Vault(tmp_path / "vault")
+    common = "error traceback failed " * 20
+    a = add_note(vault, "A", common + "segfault in renderer", ["crash"])
+    b = add_note(vault, "B", common + "unrelated words here", ["crash"])
+    c = add_note(vault, "C", "segfault segfault segfault", ["misc"])
+    rebuild_index(vault)
+
+    index = IndexReader.open(vault)
+    assert index.postings("segfault")[f"{c['id']}#0"] == 3
+    assert index.doc_len(b["id"]) == 63
+
+    hits = retrieve(vault, "error traceback failed segfault", top_k=2, min_score=0.0)
+    assert hits[0].id == a["id"]
+    assert hits[0].score > hits[1].score
+
+    short_and_dense = retrieve(vault, "segfault", min_score=0.0)
+    assert [h.id for h in short_and_dense] == [c["id"], a["id"]]
+
+    crash_only = retrieve(vault, "segfault", tags=["crash"], min_score=0.0)
+    assert [h.id for h in crash_only] == [a["id"]]
+    assert retrieve(vault, "segfault", tags=["crash", "misc"]) == []
+
+
+def test_update_index_is_incremental_and_compacts(tmp_path: Path) -> None:
+    vault = Vault(tmp_path / "vault")
+    a = add_note(vault, "A", "alpha shared", ["x"])
+    assert update_index(vault)["added"] == 1
+    assert update_index(vault) == {"added": 0, "updated": 0, "removed": 0, "retagged": 0, "segments": 1}
+
+    b = add_note(vault, "B", "beta shared", ["y"])
+    assert update_index(vault, compact=False)["added"] == 1
+    assert len(IndexReader.open(vault).segments) == 2
+
+    vault.save_manifest([m for m in vault.load_manifest() if m["id"] != a["id"]])
+    stats = update_index(vault, compact=False)
+    assert stats["removed"] == 1 and stats["segments"] == 1
+    index = IndexReader.open(vault)
+    assert set(index.postings("shared")) == {f"{b['id']}#0"}
+    assert index.postings("alpha") == {}
+
+    add_note(vault, "C", "gamma shared", ["z"])
+    update_index(vault, compact=False)
+    generation = IndexReader.open(vault).generation
+    compact_index(vault)
+    index = IndexReader.open(vault)
+    assert len(index.segments) == 1 and index.generation == generation + 1
+    assert len(index.postings("shared")) == 2
+    assert sorted(p.name for p in vault.segments_dir.iterdir()) == [f"{index.segments[0].name}.seg"]
+    assert [h.id for h in retrieve(vault, "beta", tags=["y"])] == [b["id"]]
+
+
+def test_binary_segment_roundtrip(tmp_path: Path) -> None:
+    from orchestrator.vault.segments import Segment, SegmentReader
+
+    seg = Segment("seg-000001")
+    seg.add("doc-b", ["zeta", "alpha", "alpha"] * 100)
+    seg.add("doc-a", ["alpha", "omega"], [0, 6])
+    path = tmp_path / "seg-000001.seg"
+    seg.save(path)
+
+    reader = SegmentReader("seg-000001", path)
+    assert reader.n_docs == 2 and reader.n_terms == 3
+    assert reader.postings("alpha") == {"doc-a": 1, "doc-b": 200}
+    assert reader.postings("omega") == {"doc-a": 1}
+    assert reader.postings("missing") == {}
+    assert reader.doc_lens() == {"doc-a": 2, "doc-b": 300}
+    assert {t: plist for t, plist, _ in reader.iter_postings()} == seg.terms
+    assert reader.positions("alpha") == {"doc-a": [0], "doc-b": []}
+    assert reader.positions("omega") == {"doc-a": [6]}
+
+
+def test_snippet_is_windowed_read_around_best_passage(tmp_path: Path) -> None:
+    vault = Vault(tmp_path / "vault")
+    filler = "lorem ipsum dolor " * 200
+    body = "renderer mention early. " + filler + "the renderer crashed with a segfault here. " + filler
+    doc = add_note(vault, "Long", body, ["logs"])
+    rebuild_index(vault)
+
+    index = IndexReader.open(vault)
+    assert index.docs[doc["id"]]["passages"] > 1
+    best = max(index.postings("segfault"))
+    pairs = index.offsets_for(["renderer", "segfault"], [best])[best]
+    assert [t for _, t in pairs] == ["renderer", "segfault"]
+    assert body.encode()[pairs[1][0] :].startswith(b"segfault")
+
+    hit = retrieve(vault, "renderer segfault")[0]
+    assert "renderer crashed with a segfault" in hit.snippet
+    assert len(hit.snippet) <= 603 and hit.snippet.endswith("...")
+
+
+def test_add_local_files_dedups_and_writes_manifest_once(tmp_path: Path, monkeypatch) -> None:
+    vault = Vault(tmp_path / "vault")
+    existing = add_note(vault, "Existing", "same body", ["notes"])
+    files = []
+    for i, body in enumerate(["one", "two", "one", "same body"]):
+        f = tmp_path / f"f{i}.txt"
+        f.write_text(body, encoding="utf-8")
+        files.append(f)
+
+    saves = []
+    original = Vault.save_manifest
+    monkeypatch.setattr(Vault, "save_manifest", lambda self, rows: saves.append(len(rows)) or original(self, rows))
+    docs = add_local_files(vault, files[:3] + [(files[3], "Dup", ["x"])], tags=["Batch"])
+
+    assert saves == [3]
+    assert docs[2] is docs[0]
+    assert docs[3]["id"] == existing["id"]
+    assert docs[0]["tags"] == ["batch"] and docs[0]["title"] == "f0.txt"
+    assert [m["id"] for m in vault.load_manifest()] == [existing["id"], docs[0]["id"], docs[1]["id"]]
+
+
+def test_harvest_walk_excludes_and_hash_cache_skips_unchanged(tmp_path: Path) -> None:
+    from agent_factory.agents.knowledge_harvester import iter_harvest_files
+    from agent_factory.orchestrator.changes import HashCache
+
+    repo = tmp_path / "repo"
+    (repo / "runs" / "p" / "sandboxes" / "t1").mkdir(parents=True)
+    (repo / "runs" / "p" / "sandboxes" / "t1" / "copy.md").write_text("sandbox copy", encoding="utf-8")
+    (repo / "runs" / "p" / "notes.md").write_text("keep me", encoding="utf-8")
+    (repo / "runs" / "p" / "big.json").write_text("x" * 100, encoding="utf-8")
+    (repo / "runs" / "p" / "image.png").write_bytes(b"png")
+
+    skipped: list = []
+    files = list(iter_harvest_files(repo, repo / "runs", ["runs/*/sandboxes/*"], 50, skipped))
+    assert [f.name for f in files] == ["notes.md"]
+    assert skipped == ["runs/p/big.json"]
+
+    vault = Vault(tmp_path / "vault")
+    cache = HashCache(tmp_path / "hashes.json")
+    first = add_local_files(vault, files, workers=2, hash_cache=cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+    again = add_local_files(vault, files, workers=2, hash_cache=cache)
+    assert cache.hits == 1 and again[0]["id"] == first[0]["id"]
+
+
+def test_long_documents_are_ranked_by_passage(tmp_path: Path) -> None:
+    from orchestrator.vault.indexer import PASSAGE_OVERLAP, PASSAGE_TOKENS, passages
+
+    spans = passages(["t"] * 500)
+    assert spans[0] == (0, PASSAGE_TOKENS)
+    assert all(b[0] == a[1] - PASSAGE_OVERLAP for a, b in zip(spans, spans[1:]))
+    assert spans[-1][1] == 500
+
+    vault = Vault(tmp_path / "vault")
+    artifact = add_note(vault, "Artifact", "noise " * 3000 + "timeout in scheduler " + "noise " * 3000, ["runs"])
+    note = add_note(vault, "Note", "scheduler timeout fix: raise the limit", ["notes"])
+    rebuild_index(vault)
+
+    hits = retrieve(vault, "scheduler timeout")
+    assert {h.id for h in hits} == {artifact["id"], note["id"]}
+    assert len(hits) == 2
+    big = next(h for h in hits if h.id == artifact["id"])
+    assert "timeout in scheduler" in big.snippet
+
+
+def test_noop_update_does_not_compact_multi_passage_docs(tmp_path: Path) -> None:
+    vault = Vault(tmp_path / "vault")
+    long_doc = add_note(vault, "Long", "word " * 1000, ["x"])
+    update_index(vault)
+    index = IndexReader.open(vault)
+    assert index.docs[long_doc["id"]]["passages"] > 1
+    update_index(vault)
+    assert IndexReader.open(vault).generation == index.generation
@@ -0,0 +1,34 @@
+import json
+from pathlib import Path
+
+from orchestrator.vault.bench import ZipfSampler, compare, main, percentile, run_benchmark
+
+
+def test_zipf_sampler_is_skewed_and_deterministic() -> None:
+    a = ZipfSampler(1000, seed=3).sample(5000)
+    assert a == ZipfSampler(1000, seed=3).sample(5000)
+    top = ZipfSampler(1000, seed=3).words[0]
+    assert a.count(top) > 5000 // 20
+
+
+def test_run_benchmark_small_corpus(tmp_path: Path) -> None:
+    results = run_benchmark(tmp_path, n_docs=60, vocab_size=500, mean_tokens=400, n_queries=8, single_ingest=10)
+    assert results["ingest_single"]["docs"] == 10 and results["ingest_batch"]["docs"] == 50
+    assert results["rebuild_index"]["index_bytes"] > 0
+    assert results["retrieve_cold"]["count"] == 8
+    assert results["retrieve_cold"]["p99_ms"] >= results["retrieve_cold"]["p50_ms"]
+    json.dumps(results)
+
+    slower = json.loads(json.dumps(results))
+    slower["rebuild_index"]["seconds"] = results["rebuild_index"]["seconds"] * 2 + 1
+    rows = {r["metric"]: r for r in compare(slower, results)}
+    assert rows["rebuild_index.seconds"]["regression"]
+    assert not rows["retrieve_cold.p50_ms"]["regression"]
+
+
+def test_percentile_and_cli(tmp_path: Path) -> None:
+    assert percentile([5, 1, 3, 2, 4], 50) == 3
+    assert percentile(list(range(1, 101)), 99) == 99
+    out = tmp_path / "bench.json"
+    assert main(["--docs", "20", "--queries", "4", "--single-ingest", "5", "--vocab", "200", "--out", str(out)]) == 0
+    assert json.loads(out.read_text())["params"]["docs"] == 20